@@ -0,0 +1,282 @@
+"""
+Замеры сортировок из dz3 и dz4 на разных входных распределениях.
+
+Каждый случай (алгоритм, распределение, размер) прогревается, затем
+запускается несколько раз; в отчёт идут медиана, p95, стандартное отклонение
+и пиковая память (tracemalloc, отдельным прогоном; учитывается только
+память этого процесса, поэтому для сортировок пулом процессов она занижена и
+помечена в отчёте). Отчёт сохраняется в JSON и может сравниваться с
+сохранённым базовым отчётом:
+
+    python benchmark.py --sizes 1000 10000 --json report.json
+    python benchmark.py --baseline report.json --tolerance 0.15
+"""
+import argparse
+import importlib
+import json
+import math
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+import tempfile
+import tracemalloc
+import unittest
+
+import main as dz3
+
+DZ4_ROOT = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'лаба 4'))
+
+
+def load_dz4():
+    """
+    Импортирует dz4/main.py как dz4.main (оба модуля лаб называются main).
+
+    Каталог «лаба 4» добавляется в sys.path, и dz4 импортируется как пакет
+    пространства имён: процессы пула при spawn получают тот же sys.path и
+    находят функции dz4 по имени dz4.main.
+    """
+    if DZ4_ROOT not in sys.path:
+        sys.path.append(DZ4_ROOT)
+    return importlib.import_module('dz4.main')
+
+
+def make_input(distribution, size, seed=0):
+    """Генерирует входной массив заданного распределения."""
+    rng = random.Random(seed)
+    if distribution == 'random':
+        return [rng.randint(0, size * 10) for _ in range(size)]
+    if distribution == 'sorted':
+        return list(range(size))
+    if distribution == 'reversed':
+        return list(range(size, 0, -1))
+    if distribution == 'few_unique':
+        return [rng.randint(0, 9) for _ in range(size)]
+    if distribution == 'organ_pipe':
+        half = size // 2
+        return list(range(half)) + list(range(size - half, 0, -1))
+    if distribution == 'nearly_sorted':
+        data = list(range(size))
+        for _ in range(max(1, size // 100)):
+            i, j = rng.randrange(size), rng.randrange(size)
+            data[i], data[j] = data[j], data[i]
+        return data
+    raise ValueError(f"Неизвестное распределение: {distribution}")
+
+
+DISTRIBUTIONS = ['random', 'sorted', 'reversed', 'few_unique', 'organ_pipe', 'nearly_sorted']
+ALGORITHMS = ['merge_sort', 'radix_sort', 'quick_sort', 'quicksort_sequential', 'quicksort']
+PROCESS_POOL_ALGORITHMS = {'quicksort'}  # сортируют в других процессах: tracemalloc их память не видит
+
+
+def make_sorters(workers):
+    """Сортировки, приведённые к виду f(list) -> отсортированный список."""
+    dz4 = load_dz4()
+
+    def quicksort_sequential(arr):
+        dz4.quicksort_sequential(arr, 0, len(arr) - 1)
+        return arr
+
+    def quicksort(arr):
+        dz4.quicksort(arr, workers=workers)
+        return arr
+
+    return {
+        'merge_sort': dz3.merge_sort,
+        'radix_sort': dz3.radix_sort,
+        'quick_sort': dz3.quick_sort,
+        'quicksort_sequential': quicksort_sequential,
+        'quicksort': quicksort,
+    }
+
+
+def percentile(sorted_values, q):
+    """Перцентиль по методу ближайшего ранга."""
+    rank = max(1, math.ceil(q / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def measure(sorter, data, repeats=7, warmup=2):
+    """
+    Прогревает и замеряет одну сортировку; каждый прогон получает свежую копию data.
+
+    peak_kib — пик tracemalloc в текущем процессе: память процессов пула в
+    него не входит.
+    """
+    expected = sorted(data)
+    for _ in range(warmup):
+        if sorter(data[:]) != expected:
+            raise AssertionError(f"{sorter.__name__} вернула неверный результат")
+
+    times = []
+    for _ in range(repeats):
+        arr = data[:]
+        start = time.perf_counter()
+        sorter(arr)
+        times.append((time.perf_counter() - start) * 1000)
+
+    tracemalloc.start()
+    try:
+        sorter(data[:])
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    times.sort()
+    return {
+        'median_ms': statistics.median(times),
+        'p95_ms': percentile(times, 95),
+        'stddev_ms': statistics.stdev(times) if len(times) > 1 else 0.0,
+        'mean_ms': statistics.fmean(times),
+        'min_ms': times[0],
+        'peak_kib': peak / 1024,
+        'runs': len(times),
+    }
+
+
+def run_benchmarks(sizes, algorithms=None, distributions=None, repeats=7, warmup=2, workers=2, seed=0):
+    """Запускает все комбинации и возвращает отчёт в виде словаря (готового для JSON)."""
+    sorters = make_sorters(workers)
+    algorithms = algorithms or list(sorters)
+    distributions = distributions or DISTRIBUTIONS
+    results = []
+    for size in sizes:
+        for distribution in distributions:
+            data = make_input(distribution, size, seed)
+            for name in algorithms:
+                stats = measure(sorters[name], data, repeats, warmup)
+                stats.update(algorithm=name, distribution=distribution, size=size,
+                             peak_parent_only=name in PROCESS_POOL_ALGORITHMS)
+                results.append(stats)
+                note = ' (только родитель)' if stats['peak_parent_only'] else ''
+                print(f"{name:>22} | {distribution:>13} | {size:>8} | "
+                      f"медиана {stats['median_ms']:9.2f} мс | p95 {stats['p95_ms']:9.2f} мс | "
+                      f"σ {stats['stddev_ms']:7.2f} мс | пик {stats['peak_kib']:9.1f} КиБ{note}")
+    return {
+        'meta': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'numpy': dz3.np is not None,
+            'repeats': repeats,
+            'warmup': warmup,
+            'workers': workers,
+            'seed': seed,
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        },
+        'results': results,
+    }
+
+
+def compare_with_baseline(report, baseline, tolerance=0.1, min_ms=1.0):
+    """
+    Сравнивает медианы с базовым отчётом.
+
+    Возвращает список регрессий: случаи, где медиана выросла больше чем
+    на tolerance (доля) и больше чем на min_ms миллисекунд.
+    """
+    base = {(r['algorithm'], r['distribution'], r['size']): r for r in baseline['results']}
+    regressions = []
+    for result in report['results']:
+        old = base.get((result['algorithm'], result['distribution'], result['size']))
+        if old is None:
+            continue
+        limit = old['median_ms'] * (1 + tolerance)
+        if result['median_ms'] > limit and result['median_ms'] - old['median_ms'] > min_ms:
+            regressions.append({
+                'algorithm': result['algorithm'],
+                'distribution': result['distribution'],
+                'size': result['size'],
+                'baseline_ms': old['median_ms'],
+                'median_ms': result['median_ms'],
+                'ratio': result['median_ms'] / old['median_ms'],
+            })
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Замеры сортировок dz3/dz4')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 50000])
+    parser.add_argument('--algorithms', nargs='+', choices=ALGORITHMS, default=None)
+    parser.add_argument('--distributions', nargs='+', choices=DISTRIBUTIONS, default=None)
+    parser.add_argument('--repeats', type=int, default=7)
+    parser.add_argument('--warmup', type=int, default=2)
+    parser.add_argument('--workers', type=int, default=2, help='процессов для dz4.quicksort')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', help='куда сохранить отчёт')
+    parser.add_argument('--baseline', help='базовый отчёт для сравнения')
+    parser.add_argument('--tolerance', type=float, default=0.1, help='допустимый рост медианы (доля)')
+    args = parser.parse_args(argv)
+
+    report = run_benchmarks(args.sizes, args.algorithms, args.distributions,
+                            args.repeats, args.warmup, args.workers, args.seed)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare_with_baseline(report, baseline, args.tolerance)
+        for r in regressions:
+            print(f"РЕГРЕССИЯ: {r['algorithm']} / {r['distribution']} / {r['size']}: "
+                  f"{r['baseline_ms']:.2f} мс -> {r['median_ms']:.2f} мс (x{r['ratio']:.2f})",
+                  file=sys.stderr)
+        if regressions:
+            return 1
+    return 0
+
+
+class TestBenchmark(unittest.TestCase):
+    @staticmethod
+    def report(*medians):
+        return {'results': [{'algorithm': 'merge_sort', 'distribution': 'random', 'size': size, 'median_ms': median}
+                            for size, median in medians]}
+
+    def test_make_input(self):
+        for distribution in DISTRIBUTIONS:
+            with self.subTest(distribution):
+                data = make_input(distribution, 1000, seed=3)
+                self.assertEqual(len(data), 1000)
+                self.assertEqual(data, make_input(distribution, 1000, seed=3))
+        self.assertEqual(make_input('sorted', 5), [0, 1, 2, 3, 4])
+        self.assertEqual(make_input('reversed', 5), [5, 4, 3, 2, 1])
+        self.assertEqual(make_input('organ_pipe', 6), [0, 1, 2, 3, 2, 1])
+        self.assertLessEqual(set(make_input('few_unique', 500)), set(range(10)))
+        self.assertEqual(sorted(make_input('nearly_sorted', 500)), list(range(500)))
+        with self.assertRaises(ValueError):
+            make_input('gaussian', 10)
+
+    def test_compare_with_baseline(self):
+        baseline = self.report((1000, 10.0), (10000, 100.0), (50000, 0.5))
+        report = self.report((1000, 10.9), (10000, 125.0), (50000, 1.2), (99, 50.0))
+        regressions = compare_with_baseline(report, baseline, tolerance=0.1)
+        self.assertEqual([r['size'] for r in regressions], [10000])
+        self.assertAlmostEqual(regressions[0]['ratio'], 1.25)
+        self.assertEqual(compare_with_baseline(report, baseline, tolerance=0.3), [])
+        self.assertEqual(len(compare_with_baseline(report, baseline, tolerance=0.05, min_ms=0.5)), 3)
+
+    def test_main_exit_code(self):
+        global run_benchmarks
+        saved = run_benchmarks
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'baseline.json')
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(self.report((1000, 10.0)), f)
+            try:
+                run_benchmarks = lambda *args: self.report((1000, 10.5))
+                self.assertEqual(main(['--baseline', path]), 0)
+                run_benchmarks = lambda *args: self.report((1000, 20.0))
+                self.assertEqual(main(['--baseline', path]), 1)
+            finally:
+                run_benchmarks = saved
+
+    def test_measure_marks_process_pool_peak(self):
+        report = run_benchmarks([300], ['merge_sort', 'quicksort'], ['random'], repeats=1, warmup=0)
+        self.assertEqual({r['algorithm']: r['peak_parent_only'] for r in report['results']},
+                         {'merge_sort': False, 'quicksort': True})
+
+
+if __name__ == '__main__':
+    sys.exit(main())
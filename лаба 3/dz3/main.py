@@ -1,46 +1,475 @@
+import functools
+import heapq
+import mmap
+import operator
+import os
+import shutil
+import tempfile
 import unittest
 import random
 import time
+from bisect import bisect_left, bisect_right
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain, islice
 
+try:
+    import numpy as np
+except ImportError:  # NumPy необязателен: radix_sort работает и без него
+    np = None
 
-def merge_sort(arr):
-    if len(arr) <= 1:
-        return arr[:]
-    mid = len(arr) // 2
-    left = merge_sort(arr[:mid])
-    right = merge_sort(arr[mid:])
 
-    merged = []
-    i = j = 0
-    while i < len(left) and j < len(right):
-        if left[i] < right[j]:
-            merged.append(left[i])
-            i += 1
+class _ProbeKey:
+    """Обёртка элемента, считающая сравнения."""
+    __slots__ = ('value', 'probe')
+
+    def __init__(self, value, probe):
+        self.value = value
+        self.probe = probe
+
+    def __lt__(self, other):
+        self.probe.comparisons += 1
+        return self.value < other.value
+
+    def __le__(self, other):
+        self.probe.comparisons += 1
+        return self.value <= other.value
+
+
+class _ProbeList(list):
+    """Список, считающий записи элементов (перемещения)."""
+
+    def __init__(self, probe, items=()):
+        super().__init__(items)
+        self.probe = probe
+
+    def __setitem__(self, index, value):
+        if isinstance(index, slice):
+            value = list(value)
+            self.probe.moves += len(value)
         else:
-            merged.append(right[j])
+            self.probe.moves += 1
+        super().__setitem__(index, value)
+
+
+class SortProbe:
+    """
+    Инструментирование одного вызова сортировки.
+
+    Передаётся параметром probe в merge_sort, quick_sort, radix_sort и др.
+    Без него сортировки идут по обычному пути без каких-либо проверок
+    в горячих циклах; с ним элементы оборачиваются в считающие сравнения
+    ключи, массив — в считающий записи список, а ядра (partition, слияние,
+    проход radix) — в замер времени по фазам.
+    """
+
+    def __init__(self):
+        self.comparisons = 0
+        self.moves = 0
+        self.max_depth = 0
+        self.allocations = 0
+        self.allocated_items = 0
+        self.phases = {}
+
+    def allocated(self, items):
+        self.allocations += 1
+        self.allocated_items += items
+
+    def depth(self, value):
+        if value > self.max_depth:
+            self.max_depth = value
+
+    def timed(self, phase, func):
+        """Оборачивает func так, что время и число её вызовов копятся в фазе phase."""
+        stats = self.phases.setdefault(phase, [0, 0.0])
+
+        def wrapper(*args):
+            start = time.perf_counter()
+            try:
+                return func(*args)
+            finally:
+                stats[0] += 1
+                stats[1] += time.perf_counter() - start
+        return wrapper
+
+    def wrap(self, arr):
+        self.allocated(len(arr))
+        return _ProbeList(self, (_ProbeKey(x, self) for x in arr))
+
+    def report(self):
+        """Отчёт в виде словаря (готового для JSON)."""
+        return {
+            'comparisons': self.comparisons,
+            'moves': self.moves,
+            'max_depth': self.max_depth,
+            'allocations': self.allocations,
+            'allocated_items': self.allocated_items,
+            'phases': {name: {'calls': calls, 'seconds': seconds}
+                       for name, (calls, seconds) in self.phases.items()},
+        }
+
+
+MIN_RUN = 32
+MIN_GALLOP = 7
+
+
+def _count_run(arr, low, high):
+    """
+    Находит естественную серию, начинающуюся с low (high — граница, не включительно).
+
+    Строго убывающая серия разворачивается на месте, поэтому результат всегда
+    неубывающий, а устойчивость сохраняется. Возвращает конец серии.
+    """
+    run_end = low + 1
+    if run_end == high:
+        return high
+    if arr[run_end] < arr[low]:
+        while run_end + 1 < high and arr[run_end + 1] < arr[run_end]:
+            run_end += 1
+        arr[low:run_end + 1] = arr[low:run_end + 1][::-1]
+    else:
+        while run_end + 1 < high and not arr[run_end + 1] < arr[run_end]:
+            run_end += 1
+    return run_end + 1
+
+
+def _binary_insertion_sort(arr, low, high, start):
+    """Досортировывает arr[low:high], если arr[low:start] уже упорядочен."""
+    for i in range(start, high):
+        item = arr[i]
+        pos = bisect_right(arr, item, low, i)
+        arr[pos + 1:i + 1] = arr[pos:i]
+        arr[pos] = item
+
+
+def _merge_runs(arr, low, mid, high, buffer):
+    """
+    Устойчиво сливает соседние серии arr[low:mid] и arr[mid:high].
+
+    Уже стоящие на месте префикс левой и суффикс правой серии отсекаются
+    бинарным поиском, во вспомогательный буфер копируется только остаток левой
+    серии. Если одна серия выигрывает MIN_GALLOP раз подряд, следующий
+    блок её элементов находится бинарным поиском и переносится одним срезом.
+    """
+    low = bisect_right(arr, arr[mid], low, mid)
+    if low == mid:
+        return
+    high = bisect_left(arr, arr[mid - 1], mid, high)
+
+    left_len = mid - low
+    buffer[:left_len] = arr[low:mid]
+    i, j, k = 0, mid, low
+    left_wins = right_wins = 0
+    while i < left_len and j < high:
+        if arr[j] < buffer[i]:
+            arr[k] = arr[j]
             j += 1
-    merged.extend(left[i:])
-    merged.extend(right[j:])
-    return merged
+            right_wins += 1
+            left_wins = 0
+            if right_wins >= MIN_GALLOP:
+                end = bisect_left(arr, buffer[i], j, high)
+                arr[k + 1:k + 1 + end - j] = arr[j:end]
+                k += end - j
+                j = end
+                right_wins = 0
+        else:
+            arr[k] = buffer[i]
+            i += 1
+            left_wins += 1
+            right_wins = 0
+            if left_wins >= MIN_GALLOP and j < high:
+                end = bisect_right(buffer, arr[j], i, left_len)
+                arr[k + 1:k + 1 + end - i] = buffer[i:end]
+                k += end - i
+                i = end
+                left_wins = 0
+        k += 1
+    if i < left_len:
+        arr[k:k + left_len - i] = buffer[i:left_len]
 
 
-def counting_sort_for_radix(arr, exp):
-    buckets = [[] for _ in range(10)]
-    for num in arr:
-        digit = (num // exp) % 10
-        buckets[digit].append(num)
-    return [num for bucket in buckets for num in bucket]
+def merge_sort_inplace(arr, probe=None):
+    """
+    Восходящая (итеративная) сортировка слиянием на месте.
+
+    Сначала массив разбивается на естественные серии: возрастающие берутся как
+    есть, убывающие разворачиваются, короткие добиваются до MIN_RUN вставками.
+    Затем соседние серии попарно сливаются проход за проходом с одним общим
+    вспомогательным буфером. На почти отсортированных данных серий мало,
+    и время работы близко к линейному. probe — необязательный SortProbe.
+    """
+    n = len(arr)
+    if n < 2:
+        return arr
+
+    count_run, insertion_sort, merge_runs = _count_run, _binary_insertion_sort, _merge_runs
+    if probe is not None:
+        count_run = probe.timed('runs', count_run)
+        insertion_sort = probe.timed('insertion', insertion_sort)
+        merge_runs = probe.timed('merge', merge_runs)
+
+    runs = [0]
+    low = 0
+    while low < n:
+        run_end = count_run(arr, low, n)
+        if run_end - low < MIN_RUN:
+            forced_end = min(low + MIN_RUN, n)
+            insertion_sort(arr, low, forced_end, run_end)
+            run_end = forced_end
+        runs.append(run_end)
+        low = run_end
+
+    buffer = [None] * (n // 2 + 1)
+    if probe is not None:
+        probe.allocated(len(buffer))
+        buffer = _ProbeList(probe, buffer)
+    passes = 0
+    while len(runs) > 2:
+        merged = [0]
+        for r in range(0, len(runs) - 2, 2):
+            merge_runs(arr, runs[r], runs[r + 1], runs[r + 2], buffer)
+            merged.append(runs[r + 2])
+        if (len(runs) - 1) % 2:
+            merged.append(runs[-1])
+        runs = merged
+        passes += 1
+    if probe is not None:
+        probe.depth(passes)
+    return arr
+
+
+def merge_sort(arr, probe=None):
+    """Устойчивая сортировка слиянием; возвращает новый список, вход не изменяется."""
+    if probe is not None:
+        return [key.value for key in merge_sort_inplace(probe.wrap(arr), probe)]
+    return merge_sort_inplace(list(arr))
+
+
+RADIX_BITS = 8
+RADIX_SIZE = 1 << RADIX_BITS
+RADIX_MASK = RADIX_SIZE - 1
+SIGN_BIT = 1 << 63
+
+
+def counting_sort_for_radix(arr, shift):
+    """
+    Один устойчивый проход LSD-сортировки по байту ключа, начинающемуся с бита shift.
+
+    Возвращает новый список либо None, если у всех ключей этот байт одинаковый
+    и проход можно пропустить.
+    """
+    buckets = [[] for _ in range(RADIX_SIZE)]
+    appenders = [bucket.append for bucket in buckets]
+    for key in arr:
+        appenders[(key >> shift) & RADIX_MASK](key)
+    if max(map(len, buckets)) == len(arr):
+        return None
+    return list(chain.from_iterable(buckets))
+
+
+def _counting_sort_for_radix_probed(probe, arr, shift):
+    result = counting_sort_for_radix(arr, shift)
+    probe.allocated(RADIX_SIZE)
+    probe.moves += len(arr)
+    if result is not None:
+        probe.allocated(len(result))
+        probe.moves += len(result)
+    return result
+
 
+def _radix_sort_python(arr, probe=None):
+    lo = min(arr)
+    keys = [num - lo for num in arr]
+    span = max(keys)
+    counting_pass = counting_sort_for_radix
+    if probe is not None:
+        probe.allocated(len(keys))
+        counting_pass = probe.timed('radix_pass', functools.partial(_counting_sort_for_radix_probed, probe))
+    shift = 0
+    while span >> shift:
+        keys = counting_pass(keys, shift) or keys
+        shift += RADIX_BITS
+    if probe is not None:
+        probe.depth(shift // RADIX_BITS)
+    return [key + lo for key in keys]
 
-def radix_sort(arr):
+
+def _radix_passes_numpy(src, probe=None):
+    """LSD-проходы по неотрицательным ключам uint64."""
+    dst = np.empty_like(src)
+    span = int(src.max())
+    shift = 0
+    while span >> shift:
+        start = time.perf_counter() if probe is not None else 0
+        digits = ((src >> np.uint64(shift)) & np.uint64(RADIX_MASK)).astype(np.uint8)
+        counts = np.bincount(digits, minlength=RADIX_SIZE)
+        if counts.max() != len(src):
+            # Устойчивая сортировка uint8 в NumPy — это counting sort с префиксными суммами
+            order = np.argsort(digits, kind='stable')
+            np.take(src, order, out=dst)
+            src, dst = dst, src
+            if probe is not None:
+                probe.moves += len(src)
+                probe.allocated(len(order))
+        if probe is not None:
+            probe.allocated(len(digits))
+            stats = probe.phases.setdefault('radix_pass', [0, 0.0])
+            stats[0] += 1
+            stats[1] += time.perf_counter() - start
+        shift += RADIX_BITS
+    if probe is not None:
+        probe.allocated(len(dst))
+        probe.depth(shift // RADIX_BITS)
+    return src
+
+
+def _radix_sort_numpy(keys, probe=None):
+    # Знаковый бит инвертируется, чтобы порядок int64 совпал с порядком uint64,
+    # затем вычитается минимум: проходы идут только по значимым байтам диапазона.
+    ukeys = keys.astype(np.int64).view(np.uint64) ^ np.uint64(SIGN_BIT)
+    lo = ukeys.min()
+    src = _radix_passes_numpy(ukeys - lo, probe)
+    return ((src + lo) ^ np.uint64(SIGN_BIT)).view(np.int64).astype(keys.dtype, copy=False)
+
+
+def radix_sort(arr, probe=None):
+    """
+    Побайтовая LSD-сортировка целых чисел (основание 256), включая отрицательные.
+
+    Если установлен NumPy, проходы выполняются векторно над буфером int64
+    (гистограмма, префиксные суммы и один буфер для попеременной раскладки),
+    иначе — корзинами по 256 значений над списком ключей. Тип результата
+    повторяет тип входа: список, array.array или numpy.ndarray.
+    probe — необязательный SortProbe (сравнений у поразрядной сортировки нет).
+    """
+    if len(arr) == 0:
+        return [] if isinstance(arr, list) else arr[:]
+    if np is not None:
+        keys = np.asarray(arr)
+        if keys.dtype.kind in 'iu' and keys.dtype != np.uint64:
+            result = _radix_sort_numpy(keys, probe)
+            if isinstance(arr, np.ndarray):
+                return result
+            if isinstance(arr, array):
+                return array(arr.typecode, result.tobytes())
+            return result.tolist()
+    result = _radix_sort_python(arr, probe)
+    if isinstance(arr, array):
+        return array(arr.typecode, result)
+    if np is not None and isinstance(arr, np.ndarray):
+        return np.array(result, dtype=arr.dtype)
+    return result
+
+
+def _numeric_column(keys):
+    """Столбец ключей как одномерный числовой ndarray (без копии для array) или None."""
+    if np is None or not isinstance(keys, (np.ndarray, array)):
+        return None
+    column = np.asarray(keys)
+    return column if column.ndim == 1 and column.dtype.kind in 'biuf' else None
+
+
+def _descending_column(column):
+    # И -x для вещественных, и ~x для целых обращают порядок без переполнения;
+    # -0.0 и 0.0 остаются равными, так что устойчивость не нарушается.
+    return -column if column.dtype.kind == 'f' else ~column
+
+
+def argsort(keys, descending=False):
+    """
+    Устойчивая перестановка индексов, упорядочивающая keys.
+
+    Числовые столбцы (numpy.ndarray или array.array) при наличии NumPy
+    сортируются np.argsort(kind='stable'), остальные ключи — встроенной
+    сортировкой индексов. Равные ключи всегда сохраняют исходный порядок —
+    и при descending=True тоже. Возвращает ndarray, если ключи переданы как
+    ndarray, иначе список.
+    """
+    column = _numeric_column(keys)
+    if column is None:
+        return sorted(range(len(keys)), key=keys.__getitem__, reverse=descending)
+    order = np.argsort(_descending_column(column) if descending else column, kind='stable')
+    return order if isinstance(keys, np.ndarray) else order.tolist()
+
+
+def lexsort(key_columns, descending=False):
+    """
+    Устойчивая перестановка для лексикографического порядка по нескольким ключам.
+
+    key_columns — последовательность столбцов ключей, первый столбец главный.
+    descending — общий флаг или список флагов для каждого столбца.
+    Если все столбцы числовые и есть NumPy, работает np.lexsort; иначе
+    столбцы обрабатываются с последнего устойчивой встроенной сортировкой
+    индексов, которая читает ключи прямо из столбцов.
+    """
+    if isinstance(descending, bool):
+        descending = [descending] * len(key_columns)
+    columns = [_numeric_column(column) for column in key_columns]
+    if columns and all(column is not None for column in columns):
+        # У np.lexsort главный ключ — последний
+        return np.lexsort([_descending_column(column) if desc else column
+                           for column, desc in zip(reversed(columns), reversed(descending))]).tolist()
+    order = list(range(len(key_columns[0]) if key_columns else 0))
+    for column, desc in zip(reversed(key_columns), reversed(descending)):
+        order.sort(key=column.__getitem__, reverse=desc)
+    return order
+
+
+def sort_by_key(records, key, descending=False):
+    """
+    Сортирует записи по ключу, не сравнивая сами записи.
+
+    records — любая конечная последовательность или итератор, key — функция
+    или список функций для лексикографической сортировки, descending — общий
+    флаг или список флагов. Для нескольких ключей при наличии NumPy ключи
+    извлекаются один раз в столбцы array('q')/array('d'), по ним lexsort
+    строит перестановку, и записи собираются одним проходом (в 3-4 раза
+    быстрее sorted с кортежем ключей). Иначе это устойчивые проходы
+    list.sort(key=...) с последнего ключа, и кортежи составных ключей не
+    создаются.
+
+    Для одного ключа это и есть list.sort(key=...): ключ и так вычисляется
+    один раз на запись, а сравнения идут в C. Извлечение столбца и argsort
+    (в том числе через np.argsort) на замерах были не быстрее, поэтому
+    отдельного пути для одного ключа нет. Сортировка устойчивая.
+    """
+    records = list(records)
+    keys = [key] if callable(key) else list(key)
+    if isinstance(descending, bool):
+        descending = [descending] * len(keys)
+    if np is None or len(keys) == 1:
+        for k, desc in zip(reversed(keys), reversed(descending)):
+            records.sort(key=k, reverse=desc)
+        return records
+    order = lexsort([_key_column(records, k) for k in keys], descending)
+    return list(map(records.__getitem__, order))
+
+
+def _key_column(records, key):
+    column = [key(record) for record in records]
+    types = set(map(type, column))
+    if types <= {int}:
+        try:
+            return array('q', column)
+        except OverflowError:
+            return column
+    if types <= {int, float}:
+        return array('d', column)
+    return column
+
+
+def counting_sort(arr):
+    """Сортировка подсчётом для целых чисел из узкого диапазона: O(n + (max - min))."""
     if not arr:
         return []
-    result = arr[:]
-    max_num = max(result)
-    exp = 1
-    while max_num // exp > 0:
-        result = counting_sort_for_radix(result, exp)
-        exp *= 10
+    lo = min(arr)
+    counts = [0] * (max(arr) - lo + 1)
+    for num in arr:
+        counts[num - lo] += 1
+    result = []
+    for offset, count in enumerate(counts):
+        if count:
+            result.extend([offset + lo] * count)
     return result
 
 
@@ -55,20 +484,521 @@ def partition(arr, low, high):
     return i + 1
 
 
+INSERTION_SORT_CUTOFF = 16
+NINTHER_THRESHOLD = 128
+
+
+def median_of_three(arr, a, b, c):
+    """Возвращает индекс медианы из arr[a], arr[b], arr[c]."""
+    if arr[a] < arr[b]:
+        if arr[b] < arr[c]:
+            return b
+        return c if arr[a] < arr[c] else a
+    if arr[a] < arr[c]:
+        return a
+    return c if arr[b] < arr[c] else b
+
+
+def choose_pivot(arr, low, high):
+    """Индекс опорного элемента: медиана трёх, а на больших отрезках — «ниннер» (медиана медиан трёх)."""
+    mid = (low + high) // 2
+    if high - low + 1 < NINTHER_THRESHOLD:
+        return median_of_three(arr, low, mid, high)
+    step = (high - low) // 8
+    return median_of_three(arr,
+                           median_of_three(arr, low, low + step, low + 2 * step),
+                           median_of_three(arr, mid - step, mid, mid + step),
+                           median_of_three(arr, high - 2 * step, high - step, high))
+
+
+def partition_three_way(arr, low, high):
+    """
+    Трёхпутевое разбиение (задача о голландском флаге) вокруг arr[high].
+
+    Интерфейс тот же, что у partition, но возвращается пара (lt, gt):
+    arr[low:lt] < pivot, arr[lt:gt + 1] == pivot, arr[gt + 1:high + 1] > pivot.
+    Равные опорному элементы сразу оказываются на своих местах.
+    """
+    pivot = arr[high]
+    lt, i, gt = low, low, high
+    while i <= gt:
+        item = arr[i]
+        if item < pivot:
+            arr[lt], arr[i] = item, arr[lt]
+            lt += 1
+            i += 1
+        elif pivot < item:
+            arr[i], arr[gt] = arr[gt], item
+            gt -= 1
+        else:
+            i += 1
+    return lt, gt
+
+
+def heap_sort(arr, low, high):
+    """Пирамидальная сортировка отрезка arr[low:high + 1] на месте."""
+    n = high - low + 1
+
+    def sift_down(root, size):
+        item = arr[low + root]
+        child = 2 * root + 1
+        while child < size:
+            if child + 1 < size and arr[low + child] < arr[low + child + 1]:
+                child += 1
+            if not item < arr[low + child]:
+                break
+            arr[low + root] = arr[low + child]
+            root = child
+            child = 2 * root + 1
+        arr[low + root] = item
+
+    for root in range(n // 2 - 1, -1, -1):
+        sift_down(root, n)
+    for end in range(n - 1, 0, -1):
+        arr[low], arr[low + end] = arr[low + end], arr[low]
+        sift_down(0, end)
+
+
+def introsort(arr, low, high, probe=None):
+    """
+    Интроспективная сортировка отрезка arr[low:high + 1] на месте.
+
+    Быстрая сортировка без рекурсии: отрезки хранятся в явном стеке, больший
+    откладывается, меньший обрабатывается сразу, поэтому стек — O(log n).
+    Опорный элемент выбирается медианой трёх/ниннером, разбиение трёхпутевое,
+    короткие отрезки досортировываются вставками, а при глубине больше
+    2·log2(n) отрезок досортировывается пирамидальной сортировкой —
+    худший случай O(n log n). probe — необязательный SortProbe.
+    """
+    if high - low < 1:
+        return
+    partition3, insertion_sort, heapsort = partition_three_way, _binary_insertion_sort, heap_sort
+    if probe is not None:
+        partition3 = probe.timed('partition', partition3)
+        insertion_sort = probe.timed('insertion', insertion_sort)
+        heapsort = probe.timed('heap_sort', heapsort)
+    depth_limit = 2 * (high - low + 1).bit_length()
+    stack = [(low, high, depth_limit)]
+    while stack:
+        low, high, depth = stack.pop()
+        while high - low + 1 > INSERTION_SORT_CUTOFF:
+            if depth == 0:
+                heapsort(arr, low, high)
+                break
+            depth -= 1
+            p = choose_pivot(arr, low, high)
+            arr[p], arr[high] = arr[high], arr[p]
+            lt, gt = partition3(arr, low, high)
+            if probe is not None:
+                probe.depth(depth_limit - depth)
+            if lt - low < high - gt:
+                stack.append((gt + 1, high, depth))
+                high = lt - 1
+            else:
+                stack.append((low, lt - 1, depth))
+                low = gt + 1
+        else:
+            if low < high:
+                insertion_sort(arr, low, high + 1, low + 1)
+
+
 def quick_sort_recursive(arr, low, high):
-    if low < high:
+    # Рекурсия только в меньшую часть, большая обрабатывается в цикле:
+    # глубина рекурсии не превышает log2(n) даже на упорядоченных данных.
+    while low < high:
+        p = median_of_three(arr, low, (low + high) // 2, high)
+        arr[p], arr[high] = arr[high], arr[p]
         pi = partition(arr, low, high)
-        quick_sort_recursive(arr, low, pi - 1)
-        quick_sort_recursive(arr, pi + 1, high)
+        if pi - low < high - pi:
+            quick_sort_recursive(arr, low, pi - 1)
+            low = pi + 1
+        else:
+            quick_sort_recursive(arr, pi + 1, high)
+            high = pi - 1
 
 
-def quick_sort(arr):
+def quick_sort(arr, probe=None):
+    if probe is not None:
+        result = probe.wrap(arr)
+        introsort(result, 0, len(result) - 1, probe)
+        return [key.value for key in result]
     result = arr[:]
     if result:
-        quick_sort_recursive(result, 0, len(result) - 1)
+        introsort(result, 0, len(result) - 1)
     return result
 
 
+def _median_of_medians(arr, low, high):
+    """
+    Индекс опорного элемента по медиане медиан пятёрок (BFPRT).
+
+    Медианы групп по пять переносятся в начало отрезка, и среди них
+    рекурсивно выбирается медиана; такой опорный гарантирует, что каждый
+    шаг отбора отбрасывает не меньше трети элементов.
+    """
+    count = 0
+    for start in range(low, high + 1, 5):
+        end = min(start + 5, high + 1)
+        _binary_insertion_sort(arr, start, end, start + 1)
+        m = (start + end - 1) // 2
+        arr[low + count], arr[m] = arr[m], arr[low + count]
+        count += 1
+    mid = low + (count - 1) // 2
+    _select_range(arr, low, low + count - 1, mid)
+    return mid
+
+
+def _select_range(arr, low, high, k):
+    """
+    Интроспективный отбор: ставит на место k элемент, который стоял бы там после сортировки.
+
+    Сначала быстрый отбор с медианой трёх/ниннером и трёхпутевым разбиением;
+    если за 2·log2(n) шагов отрезок не сузился до ответа, опорный выбирается
+    медианой медиан, и время остаётся линейным в худшем случае.
+    """
+    budget = 2 * (high - low + 1).bit_length()
+    while high > low:
+        if high - low + 1 <= INSERTION_SORT_CUTOFF:
+            _binary_insertion_sort(arr, low, high + 1, low + 1)
+            return
+        if budget:
+            budget -= 1
+            p = choose_pivot(arr, low, high)
+        else:
+            p = _median_of_medians(arr, low, high)
+        arr[p], arr[high] = arr[high], arr[p]
+        lt, gt = partition_three_way(arr, low, high)
+        if k < lt:
+            high = lt - 1
+        elif k > gt:
+            low = gt + 1
+        else:
+            return
+
+
+def nth_element(arr, k):
+    """
+    Переставляет arr на месте так, что arr[k] — k-й по величине (с нуля) элемент,
+    слева от него не больше, справа не меньше. Возвращает arr[k]. O(n).
+    """
+    if not 0 <= k < len(arr):
+        raise IndexError(f"k={k} вне диапазона массива длины {len(arr)}")
+    _select_range(arr, 0, len(arr) - 1, k)
+    return arr[k]
+
+
+def select(arr, k):
+    """k-й по величине (с нуля) элемент; вход не изменяется. O(n)."""
+    return nth_element(list(arr), k)
+
+
+def percentile(arr, q):
+    """Перцентиль q (0..100) по методу ближайшего ранга за O(n)."""
+    if not arr:
+        raise ValueError("перцентиль пустого массива не определён")
+    rank = max(1, -(-q * len(arr) // 100))
+    return select(arr, min(len(arr), int(rank)) - 1)
+
+
+def partial_sort(arr, k):
+    """Сортирует на месте только первые k позиций: там оказываются k наименьших по порядку."""
+    k = min(k, len(arr))
+    if k <= 0:
+        return arr
+    if k < len(arr):
+        _select_range(arr, 0, len(arr) - 1, k - 1)
+    introsort(arr, 0, k - 1)
+    return arr
+
+
+def top_k(data, k, largest=False):
+    """
+    k наименьших (или наибольших при largest=True) элементов в порядке сортировки.
+
+    Для последовательностей используется отбор за O(n) и сортировка k элементов,
+    для произвольных итераторов — потоковая куча размера k (память O(k)).
+    """
+    if k <= 0:
+        return []
+    if not hasattr(data, '__len__') or not hasattr(data, '__getitem__'):
+        return heapq.nlargest(k, data) if largest else heapq.nsmallest(k, data)
+    result = list(data)
+    k = min(k, len(result))
+    if largest:
+        _select_range(result, 0, len(result) - 1, len(result) - k)
+        result = result[len(result) - k:]
+        introsort(result, 0, k - 1)
+        result.reverse()
+        return result
+    return partial_sort(result, k)[:k]
+
+
+def _partition_block(task):
+    """Раскладывает непрерывный блок входа по корзинам разделителей (в процессе пула)."""
+    block, splitters = task
+    buckets = [[] for _ in range(len(splitters) + 1)]
+    appenders = [bucket.append for bucket in buckets]
+    for num in block:
+        appenders[bisect_right(splitters, num)](num)
+    return buckets
+
+
+def _sort_bucket(pieces):
+    """Склеивает куски одной корзины из всех блоков и сортирует её (в процессе пула)."""
+    return merge_sort(list(chain.from_iterable(pieces)))
+
+
+def sample_sort(arr, workers=None, threshold=50000, oversample=32):
+    """
+    Параллельная сортировка выборкой (sample sort).
+
+    По случайным индексам берётся выборка из workers * oversample элементов,
+    по ней выбираются workers - 1 разделителей. Вход режется на workers
+    непрерывных блоков, и каждый процесс раскладывает свой блок по корзинам;
+    затем каждая корзина собирается из кусков всех блоков и сортируется в
+    своём процессе, результаты склеиваются. В родителе остаются только
+    выборка, нарезка блоков и склейка. Массивы короче threshold (или при
+    workers < 2) сортируются последовательно через merge_sort.
+    """
+    n = len(arr)
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if n <= threshold or workers < 2:
+        return merge_sort(arr)
+
+    sample = merge_sort([arr[i] for i in random.sample(range(n), min(n, workers * oversample))])
+    step = len(sample) / workers
+    splitters = merge_sort(list({sample[int(i * step)] for i in range(1, workers)}))
+    blocks = [(arr[n * i // workers:n * (i + 1) // workers], splitters) for i in range(workers)]
+
+    result = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        partitioned = list(pool.map(_partition_block, blocks))
+        buckets = [[pieces[b] for pieces in partitioned] for b in range(len(splitters) + 1)]
+        for bucket in pool.map(_sort_bucket, buckets):
+            result.extend(bucket)
+    return result
+
+
+EXTERNAL_ITEM_MEMORY = 64  # оценка байт на одно число в памяти Python (объект int + ссылка)
+EXTERNAL_MIN_BUFFER = 1024
+EXTERNAL_MAX_FAN_IN = 64
+
+
+def _read_chunks(path, input_format, chunk_items):
+    if input_format == 'binary':
+        with open(path, 'rb') as f:
+            while True:
+                chunk = array('q')
+                try:
+                    chunk.fromfile(f, chunk_items)
+                except EOFError:  # прочитано меньше chunk_items — это последний кусок
+                    pass
+                if not chunk:
+                    return
+                yield chunk
+    else:
+        with open(path, 'r', encoding='utf-8') as f:
+            while True:
+                lines = list(islice(f, chunk_items))
+                if not lines:
+                    return
+                yield array('q', [int(line) for line in lines if line.strip()])
+
+
+def _iter_run(path, buffer_items):
+    """Читает серию из файла блоками по buffer_items чисел через mmap."""
+    if os.path.getsize(path) == 0:
+        return
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        view = memoryview(mm).cast('q')
+        try:
+            for start in range(0, len(view), buffer_items):
+                yield from view[start:start + buffer_items].tolist()
+        finally:
+            view.release()
+
+
+def _write_numbers(stream, output_format, buffer_items):
+    """Возвращает функцию, которая буферизует числа и пишет их в stream блоками."""
+    block = array('q')
+
+    def flush():
+        if output_format == 'binary':
+            block.tofile(stream)
+        elif block:
+            stream.write('\n'.join(map(str, block)) + '\n')
+        del block[:]
+
+    def write(numbers):
+        for num in numbers:
+            block.append(num)
+            if len(block) >= buffer_items:
+                flush()
+        flush()
+
+    return write
+
+
+def _merge_to_file(run_paths, output_path, output_format, buffer_items):
+    mode = 'wb' if output_format == 'binary' else 'w'
+    encoding = None if output_format == 'binary' else 'utf-8'
+    with open(output_path, mode, encoding=encoding) as out:
+        write = _write_numbers(out, output_format, buffer_items)
+        write(heapq.merge(*(_iter_run(path, buffer_items) for path in run_paths)))
+
+
+def external_sort(input_path, output_path, memory_limit=256 * 1024 * 1024,
+                  input_format='binary', output_format=None, tmp_dir=None):
+    """
+    Внешняя сортировка целых чисел из файла, который не помещается в память.
+
+    Вход читается кусками, помещающимися в memory_limit байт; каждый кусок
+    сортируется radix_sort и сбрасывается во временный файл как серия int64.
+    Затем серии сливаются кучей (k-way merge) с буферизованным чтением через
+    mmap и буферизованной записью; если серий больше, чем позволяет бюджет
+    буферов, слияние идёт в несколько проходов.
+
+    Args:
+        input_path: файл с числами
+        output_path: куда записать результат
+        memory_limit: бюджет памяти в байтах
+        input_format: 'binary' (int64 в порядке байт машины) или 'text' (по числу в строке)
+        output_format: формат результата, по умолчанию как у входа
+        tmp_dir: каталог для временных серий
+
+    Returns:
+        Словарь со статистикой: items, runs, merge_passes, fan_in
+    """
+    if input_format not in ('binary', 'text'):
+        raise ValueError(f"Неизвестный формат: {input_format}")
+    output_format = output_format or input_format
+    chunk_items = max(EXTERNAL_MIN_BUFFER, memory_limit // EXTERNAL_ITEM_MEMORY)
+    fan_in = max(2, min(EXTERNAL_MAX_FAN_IN, memory_limit // (EXTERNAL_MIN_BUFFER * EXTERNAL_ITEM_MEMORY) - 1))
+    buffer_items = max(EXTERNAL_MIN_BUFFER // 4, memory_limit // ((fan_in + 1) * EXTERNAL_ITEM_MEMORY))
+
+    work_dir = tempfile.mkdtemp(prefix='external_sort_', dir=tmp_dir)
+    try:
+        runs = []
+        items = 0
+        for chunk in _read_chunks(input_path, input_format, chunk_items):
+            items += len(chunk)
+            run_path = os.path.join(work_dir, f'run_{len(runs)}.bin')
+            with open(run_path, 'wb') as f:
+                radix_sort(chunk).tofile(f)
+            runs.append(run_path)
+        stats = {'items': items, 'runs': len(runs), 'merge_passes': 0, 'fan_in': fan_in}
+
+        while len(runs) > fan_in:
+            merged = []
+            for start in range(0, len(runs), fan_in):
+                group = runs[start:start + fan_in]
+                run_path = os.path.join(work_dir, f'pass_{stats["merge_passes"]}_{len(merged)}.bin')
+                _merge_to_file(group, run_path, 'binary', buffer_items)
+                for path in group:
+                    os.remove(path)
+                merged.append(run_path)
+            runs = merged
+            stats['merge_passes'] += 1
+
+        _merge_to_file(runs, output_path, output_format, buffer_items)
+        stats['merge_passes'] += 1
+        return stats
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+DISPATCH_SAMPLE_SIZE = 1024
+DISPATCH_SMALL_SIZE = 64
+DISPATCH_MAX_RUNS_RATIO = 1 / 64
+DISPATCH_COUNTING_RANGE_RATIO = 2
+DISPATCH_DUPLICATE_RATIO = 0.75
+
+
+def analyze_input(data, sample_size=DISPATCH_SAMPLE_SIZE):
+    """
+    Быстро собирает статистику входа для выбора алгоритма.
+
+    Число серий (спусков и подъёмов) и диапазон ключей считаются точно
+    встроенными функциями без циклов на Python, доля дубликатов оценивается
+    по случайной выборке из sample_size элементов (None, если элементы
+    нехешируемые).
+    """
+    n = len(data)
+    stats = {'size': n}
+    if n < 2:
+        stats.update(is_integer=all(type(x) is int for x in data), runs=n, descending_runs=n,
+                     presortedness=1.0, duplicate_ratio=0.0)
+        return stats
+
+    descents = sum(map(operator.lt, islice(data, 1, None), data))
+    ascents = sum(map(operator.gt, islice(data, 1, None), data))
+    sample = data if n <= sample_size else [data[i] for i in random.sample(range(n), sample_size)]
+    try:
+        duplicate_ratio = 1 - len(set(sample)) / len(sample)
+    except TypeError:  # списки, словари и прочие нехешируемые элементы
+        duplicate_ratio = None
+    stats.update(
+        is_integer=all(type(x) is int for x in data),
+        runs=descents + 1,
+        descending_runs=ascents + 1,
+        presortedness=1 - min(descents, ascents) / (n - 1),
+        duplicate_ratio=duplicate_ratio,
+    )
+    if stats['is_integer']:
+        lo, hi = min(data), max(data)
+        stats.update(min=lo, max=hi, key_range=hi - lo + 1, signed=lo < 0)
+    return stats
+
+
+def choose_algorithm(stats):
+    """По статистике analyze_input возвращает пару (имя алгоритма, причина выбора)."""
+    n = stats['size']
+    if n <= DISPATCH_SMALL_SIZE:
+        return 'merge_sort', 'маленький вход: хватает вставок внутри merge_sort'
+    max_runs = max(2, int(n * DISPATCH_MAX_RUNS_RATIO))
+    if min(stats['runs'], stats['descending_runs']) <= max_runs:
+        return 'merge_sort', 'почти упорядоченный вход: мало естественных серий'
+    if stats['is_integer']:
+        if stats['key_range'] <= DISPATCH_COUNTING_RANGE_RATIO * n:
+            return 'counting_sort', 'целые ключи в узком диапазоне'
+        if np is None and (stats['duplicate_ratio'] or 0) >= DISPATCH_DUPLICATE_RATIO:
+            # Без NumPy поразрядная делает 8 проходов на Python, а трёхпутевое разбиение
+            # на немногих различных ключах заканчивается за несколько уровней
+            return 'quick_sort', 'целые ключи с частыми повторами: трёхпутевое разбиение'
+        return 'radix_sort', 'целые ключи'
+    return 'quick_sort', 'общий случай: интроспективная быстрая сортировка'
+
+
+DISPATCH_SORTERS = {
+    'merge_sort': merge_sort,
+    'counting_sort': counting_sort,
+    'radix_sort': radix_sort,
+    'quick_sort': quick_sort,
+}
+
+
+def sort_explained(data):
+    """
+    Сортирует data алгоритмом, выбранным по статистике входа.
+
+    Принимает любую конечную последовательность или итератор (массивы NumPy
+    и array.array — через tolist). Возвращает пару (результат, решение), где
+    результат — новый список, а решение — словарь с ключами algorithm,
+    reason и stats; его удобно писать в лог для аудита.
+    """
+    data = data.tolist() if hasattr(data, 'tolist') else list(data)
+    stats = analyze_input(data)
+    algorithm, reason = choose_algorithm(stats)
+    result = DISPATCH_SORTERS[algorithm](data)
+    return result, {'algorithm': algorithm, 'reason': reason, 'stats': stats}
+
+
+def sort(data):
+    """Единая точка входа: сортирует data подходящим алгоритмом и возвращает новый список."""
+    return sort_explained(data)[0]
+
+
 def get_array(length):
     array = list(range(1, length + 1))
     random.shuffle(array)
@@ -98,6 +1028,12 @@ def benchmark_sorts():
         end = time.perf_counter()
         print(f"🔺 Quick Sort: {round((end - start) * 1000, 2)} мс")
 
+        arr = get_array(n)
+        start = time.perf_counter()
+        sample_sort(arr, threshold=10000)
+        end = time.perf_counter()
+        print(f"🔹 Sample Sort: {round((end - start) * 1000, 2)} мс")
+
 
 def demonstrate_examples():
     print("\n📌 Демонстрация алгоритмов на небольшом массиве:\n")
@@ -129,6 +1065,15 @@ def demonstrate_examples():
     print(f"Выход: {result2}\n")
 
 
+class _StableKey:
+    def __init__(self, key, index):
+        self.key = key
+        self.index = index
+
+    def __lt__(self, other):
+        return self.key < other.key
+
+
 class TestSortingAlgorithms(unittest.TestCase):
     def test_merge_sort(self):
         self.assertEqual(merge_sort([5, 2, 9, 1, 5, 6]), [1, 2, 5, 5, 6, 9])
@@ -139,6 +1084,180 @@ class TestSortingAlgorithms(unittest.TestCase):
     def test_quick_sort(self):
         self.assertEqual(quick_sort([3, 2, 1]), [1, 2, 3])
 
+    def test_merge_sort_runs(self):
+        nearly_sorted = list(range(3000))
+        for _ in range(30):
+            i, j = random.randrange(3000), random.randrange(3000)
+            nearly_sorted[i], nearly_sorted[j] = nearly_sorted[j], nearly_sorted[i]
+        self.assertEqual(merge_sort(nearly_sorted), sorted(nearly_sorted))
+        self.assertEqual(merge_sort(list(range(500, 0, -1)) + list(range(500))),
+                         sorted(list(range(500, 0, -1)) + list(range(500))))
+        data = [random.randint(0, 50) for _ in range(4000)]
+        merge_sort_inplace(data)
+        self.assertEqual(data, sorted(data))
+
+    def test_merge_sort_stable(self):
+        pairs = [(random.randint(0, 9), i) for i in range(2000)]
+        keys = [_StableKey(k, i) for k, i in pairs]
+        self.assertEqual([(x.key, x.index) for x in merge_sort(keys)], sorted(pairs))
+
+    def test_radix_sort_negative(self):
+        data = [random.randint(-2 ** 40, 2 ** 40) for _ in range(2000)] + [0, -1, 1]
+        self.assertEqual(radix_sort(data), sorted(data))
+        self.assertEqual(radix_sort(array('q', [3, -7, 0])), array('q', [-7, 0, 3]))
+        self.assertEqual(radix_sort([-5, -5, -5]), [-5, -5, -5])
+        self.assertEqual(radix_sort([]), [])
+
+    def test_quick_sort_adversarial(self):
+        for data in (list(range(20000)), list(range(20000, 0, -1)),
+                     [random.randint(0, 3) for _ in range(20000)], [1] * 5000):
+            self.assertEqual(quick_sort(data), sorted(data))
+        data = list(range(5000))
+        quick_sort_recursive(data, 0, len(data) - 1)
+        self.assertEqual(data, list(range(5000)))
+
+    def test_heap_sort(self):
+        data = [random.randint(-100, 100) for _ in range(500)]
+        expected = data[:100] + sorted(data[100:400]) + data[400:]
+        heap_sort(data, 100, 399)
+        self.assertEqual(data, expected)
+
+    def test_external_sort(self):
+        data = [random.randint(-10 ** 9, 10 ** 9) for _ in range(10000)]
+        with tempfile.TemporaryDirectory() as tmp:
+            src = os.path.join(tmp, 'in.bin')
+            dst = os.path.join(tmp, 'out.txt')
+            with open(src, 'wb') as f:
+                array('q', data).tofile(f)
+            stats = external_sort(src, dst, memory_limit=128000, output_format='text')
+            with open(dst, encoding='utf-8') as f:
+                self.assertEqual([int(line) for line in f], sorted(data))
+            self.assertEqual(stats['items'], len(data))
+            self.assertGreater(stats['runs'], 1)
+            self.assertGreater(stats['merge_passes'], 1)
+
+    def test_sort_dispatch(self):
+        cases = {
+            'counting_sort': [random.randint(0, 500) for _ in range(1000)],
+            'radix_sort': [random.randint(-10 ** 9, 10 ** 9) for _ in range(1000)],
+            'merge_sort': list(range(1000, 0, -1)),
+            'quick_sort': [random.random() for _ in range(1000)],
+        }
+        for algorithm, data in cases.items():
+            result, decision = sort_explained(data)
+            self.assertEqual(result, sorted(data))
+            self.assertEqual(decision['algorithm'], algorithm)
+            self.assertEqual(decision['stats']['size'], 1000)
+        self.assertEqual(sort([3, 1, 2]), [1, 2, 3])
+        self.assertEqual(sort([]), [])
+
+    def test_sort_inputs(self):
+        self.assertEqual(sort([[2], [1], [3]]), [[1], [2], [3]])
+        self.assertIsNone(sort_explained([[2], [1]] * 50)[1]['stats']['duplicate_ratio'])
+        floats = tuple(random.random() for _ in range(100))
+        self.assertEqual(sort(floats), sorted(floats))
+        self.assertEqual(sort(x for x in (5, 3, 4)), [3, 4, 5])
+        data = array('q', (random.randint(-10 ** 12, 10 ** 12) for _ in range(500)))
+        self.assertEqual(sort(data), sorted(data))
+        if np is not None:
+            values = np.random.rand(1000)
+            result = sort(values)
+            self.assertIsInstance(result, list)
+            self.assertEqual(result, sorted(values.tolist()))
+
+    def test_sort_dispatch_duplicates(self):
+        global np
+        data = [random.choice((-10 ** 12, 7, 10 ** 12)) for _ in range(2000)]
+        saved, np = np, None
+        try:
+            result, decision = sort_explained(data)
+        finally:
+            np = saved
+        self.assertEqual(result, sorted(data))
+        self.assertEqual(decision['algorithm'], 'quick_sort')
+        self.assertGreater(decision['stats']['duplicate_ratio'], 0.9)
+
+    def test_argsort(self):
+        keys = [3.5, -1.0, 2, -7.25, 0.0, 3.5, 10 ** 6]
+        self.assertEqual(argsort(keys), sorted(range(len(keys)), key=keys.__getitem__))
+        self.assertEqual(argsort(keys, descending=True), [6, 0, 5, 2, 4, 1, 3])
+        self.assertEqual(argsort(['b', 'a', 'c']), [1, 0, 2])
+        self.assertEqual(argsort([]), [])
+        self.assertEqual(argsort(array('q', [2, 1, 2, 1])), [1, 3, 0, 2])
+        self.assertEqual(argsort(array('d', [1.5, 2.5, 1.5]), descending=True), [1, 0, 2])
+        zeros = array('d', [0.0, -0.0, 0.0, -0.0, -1.0])
+        self.assertEqual(argsort(zeros), [4, 0, 1, 2, 3])
+        self.assertEqual(argsort(zeros, descending=True), [0, 1, 2, 3, 4])
+
+    def test_lexsort(self):
+        first = array('q', [random.randint(0, 3) for _ in range(300)])
+        second = [random.choice('abc') for _ in range(300)]
+        third = array('d', [random.randint(0, 5) / 2 for _ in range(300)])
+        expected = sorted(range(300), key=lambda i: (first[i], -third[i]))
+        self.assertEqual(lexsort([first, third], [False, True]), expected)
+        expected = sorted(range(300), key=lambda i: (second[i], -first[i]))
+        self.assertEqual(lexsort([second, first], [False, True]), expected)
+        self.assertEqual(lexsort([]), [])
+
+    def test_sort_by_key(self):
+        records = [{'id': i, 'group': random.randint(0, 5), 'score': random.random()} for i in range(500)]
+        by_group = sort_by_key(records, lambda r: r['group'])
+        self.assertEqual(by_group, sorted(records, key=lambda r: r['group']))
+        multi = sort_by_key(records, [lambda r: r['group'], lambda r: r['score']], [True, False])
+        self.assertEqual(multi, sorted(records, key=lambda r: (-r['group'], r['score'])))
+        desc = sort_by_key(records, lambda r: r['group'], descending=True)
+        self.assertEqual(desc, sorted(records, key=lambda r: r['group'], reverse=True))
+        streamed = sort_by_key(iter(records), [lambda r: r['group'], lambda r: r['id']], [False, True])
+        self.assertEqual(streamed, sorted(records, key=lambda r: (r['group'], -r['id'])))
+
+    def test_selection(self):
+        data = [random.randint(-1000, 1000) for _ in range(3001)]
+        expected = sorted(data)
+        for k in (0, 1, 1500, 2999, 3000):
+            self.assertEqual(select(data, k), expected[k])
+        self.assertEqual(percentile(data, 50), expected[1500])
+        self.assertEqual(top_k(data, 10), expected[:10])
+        self.assertEqual(top_k(iter(data), 10, largest=True), expected[::-1][:10])
+        self.assertEqual(top_k(data, 10, largest=True), expected[::-1][:10])
+        copy = data[:]
+        self.assertEqual(partial_sort(copy, 25)[:25], expected[:25])
+        self.assertEqual(sorted(copy), expected)
+        with self.assertRaises(IndexError):
+            nth_element([1, 2], 2)
+
+    def test_select_worst_case(self):
+        data = list(range(2000)) * 2
+        _select_range(data, 0, len(data) - 1, 1999)
+        self.assertEqual(data[1999], 999)
+        data = [random.random() for _ in range(1000)]
+        mid = _median_of_medians(data, 0, len(data) - 1)
+        rank = sum(x < data[mid] for x in data)
+        self.assertTrue(300 <= rank <= 700)
+
+    def test_sort_probe(self):
+        data = [random.randint(0, 1000) for _ in range(2000)]
+        for sorter in (merge_sort, quick_sort, radix_sort):
+            probe = SortProbe()
+            self.assertEqual(sorter(data, probe=probe), sorted(data))
+            report = probe.report()
+            self.assertGreater(report['moves'], 0)
+            self.assertGreater(report['allocations'], 0)
+            self.assertTrue(report['phases'])
+            if sorter is not radix_sort:
+                self.assertGreater(report['comparisons'], len(data))
+                self.assertGreater(report['max_depth'], 0)
+        probe = SortProbe()
+        merge_sort(list(range(1000)), probe=probe)
+        self.assertLess(probe.comparisons, 1100)
+
+    def test_sample_sort(self):
+        data = [random.randint(-1000, 1000) for _ in range(5000)]
+        self.assertEqual(sample_sort(data, workers=3, threshold=100), sorted(data))
+        self.assertEqual(sample_sort([5, 1, 4], workers=4), [1, 4, 5])
+        self.assertEqual(sample_sort([7] * 300, workers=2, threshold=10), [7] * 300)
+        data = array('q', (random.randint(-10 ** 12, 10 ** 12) for _ in range(2000)))
+        self.assertEqual(sample_sort(data, workers=3, threshold=100), sorted(data))
+
 
 if __name__ == '__main__':
     unittest.main(exit=False)
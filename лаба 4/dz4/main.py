@@ -1,6 +1,110 @@
+import atexit
+import multiprocessing
 import threading
 import random
 import time
+import unittest
+from array import array
+from bisect import bisect_left, bisect_right
+from multiprocessing import shared_memory
+
+try:
+    import numpy as np
+except ImportError:  # NumPy необязателен: без него блоки сортируются через список
+    np = None
+
+
+# SortProbe и помощники интроспективной сортировки ниже (median_of_three,
+# choose_pivot, partition_three_way, insertion_sort, heap_sort) — копия кода из
+# «лаба 3/dz3/main.py». Каждая лаба сдаётся и запускается отдельно, а оба модуля
+# называются main и не импортируются друг из друга без правки sys.path, поэтому
+# код продублирован; исправления нужно вносить в оба файла.
+
+
+class _ProbeKey:
+    """Обёртка элемента, считающая сравнения."""
+    __slots__ = ('value', 'probe')
+
+    def __init__(self, value, probe):
+        self.value = value
+        self.probe = probe
+
+    def __lt__(self, other):
+        self.probe.comparisons += 1
+        return self.value < other.value
+
+    def __le__(self, other):
+        self.probe.comparisons += 1
+        return self.value <= other.value
+
+
+class _ProbeList(list):
+    """Список, считающий записи элементов (перемещения)."""
+
+    def __init__(self, probe, items=()):
+        super().__init__(items)
+        self.probe = probe
+
+    def __setitem__(self, index, value):
+        if isinstance(index, slice):
+            value = list(value)
+            self.probe.moves += len(value)
+        else:
+            self.probe.moves += 1
+        super().__setitem__(index, value)
+
+
+class SortProbe:
+    """Счётчики одного вызова сортировки: сравнения, перемещения, глубина, выделения, время по фазам.
+
+    Передаётся параметром probe в quicksort_sequential; без него сортировка
+    идёт по обычному пути без проверок в горячих циклах.
+    """
+
+    def __init__(self):
+        self.comparisons = 0
+        self.moves = 0
+        self.max_depth = 0
+        self.allocations = 0
+        self.allocated_items = 0
+        self.phases = {}
+
+    def allocated(self, items):
+        self.allocations += 1
+        self.allocated_items += items
+
+    def depth(self, value):
+        if value > self.max_depth:
+            self.max_depth = value
+
+    def timed(self, phase, func):
+        """Оборачивает func так, что время и число её вызовов копятся в фазе phase."""
+        stats = self.phases.setdefault(phase, [0, 0.0])
+
+        def wrapper(*args):
+            start = time.perf_counter()
+            try:
+                return func(*args)
+            finally:
+                stats[0] += 1
+                stats[1] += time.perf_counter() - start
+        return wrapper
+
+    def wrap(self, arr):
+        self.allocated(len(arr))
+        return _ProbeList(self, (_ProbeKey(x, self) for x in arr))
+
+    def report(self):
+        """Отчёт в виде словаря (готового для JSON)."""
+        return {
+            'comparisons': self.comparisons,
+            'moves': self.moves,
+            'max_depth': self.max_depth,
+            'allocations': self.allocations,
+            'allocated_items': self.allocated_items,
+            'phases': {name: {'calls': calls, 'seconds': seconds}
+                       for name, (calls, seconds) in self.phases.items()},
+        }
 
 
 def partition(arr, low, high):
@@ -15,12 +119,129 @@ def partition(arr, low, high):
     return i + 1
 
 
-def quicksort_sequential(arr, low, high):
-    """Последовательная реализация быстрой сортировки."""
-    if low < high:
-        pivot_index = partition(arr, low, high)
-        quicksort_sequential(arr, low, pivot_index - 1)
-        quicksort_sequential(arr, pivot_index + 1, high)
+INSERTION_SORT_CUTOFF = 16
+NINTHER_THRESHOLD = 128
+
+
+def median_of_three(arr, a, b, c):
+    """Возвращает индекс медианы из arr[a], arr[b], arr[c]."""
+    if arr[a] < arr[b]:
+        if arr[b] < arr[c]:
+            return b
+        return c if arr[a] < arr[c] else a
+    if arr[a] < arr[c]:
+        return a
+    return c if arr[b] < arr[c] else b
+
+
+def choose_pivot(arr, low, high):
+    """Индекс опорного элемента: медиана трёх или «ниннер» на больших отрезках."""
+    mid = (low + high) // 2
+    if high - low + 1 < NINTHER_THRESHOLD:
+        return median_of_three(arr, low, mid, high)
+    step = (high - low) // 8
+    return median_of_three(arr,
+                           median_of_three(arr, low, low + step, low + 2 * step),
+                           median_of_three(arr, mid - step, mid, mid + step),
+                           median_of_three(arr, high - 2 * step, high - step, high))
+
+
+def partition_three_way(arr, low, high):
+    """Трёхпутевое разбиение вокруг arr[high]; возвращает границы (lt, gt) блока равных опорному."""
+    pivot = arr[high]
+    lt, i, gt = low, low, high
+    while i <= gt:
+        item = arr[i]
+        if item < pivot:
+            arr[lt], arr[i] = item, arr[lt]
+            lt += 1
+            i += 1
+        elif pivot < item:
+            arr[i], arr[gt] = arr[gt], item
+            gt -= 1
+        else:
+            i += 1
+    return lt, gt
+
+
+def insertion_sort(arr, low, high):
+    """Сортировка вставками отрезка [low, high]."""
+    for i in range(low + 1, high + 1):
+        item = arr[i]
+        j = i - 1
+        while j >= low and item < arr[j]:
+            arr[j + 1] = arr[j]
+            j -= 1
+        arr[j + 1] = item
+
+
+def heap_sort(arr, low, high):
+    """Пирамидальная сортировка отрезка [low, high]."""
+    n = high - low + 1
+
+    def sift_down(root, size):
+        item = arr[low + root]
+        child = 2 * root + 1
+        while child < size:
+            if child + 1 < size and arr[low + child] < arr[low + child + 1]:
+                child += 1
+            if not item < arr[low + child]:
+                break
+            arr[low + root] = arr[low + child]
+            root = child
+            child = 2 * root + 1
+        arr[low + root] = item
+
+    for root in range(n // 2 - 1, -1, -1):
+        sift_down(root, n)
+    for end in range(n - 1, 0, -1):
+        arr[low], arr[low + end] = arr[low + end], arr[low]
+        sift_down(0, end)
+
+
+def quicksort_sequential(arr, low, high, probe=None):
+    """Последовательная реализация быстрой сортировки (интроспективная).
+
+    Без рекурсии: отрезки лежат в явном стеке, меньший обрабатывается сразу.
+    Опорный элемент — медиана трёх/ниннер, разбиение трёхпутевое, короткие
+    отрезки сортируются вставками, а при глубине больше 2·log2(n) —
+    пирамидальной сортировкой, так что худший случай O(n log n).
+    probe — необязательный SortProbe для подсчёта операций.
+    """
+    if high - low < 1:
+        return
+    partition3, insertion, heapsort = partition_three_way, insertion_sort, heap_sort
+    if probe is not None:
+        if not isinstance(arr, _ProbeList):
+            keys = probe.wrap(arr[low:high + 1])
+            quicksort_sequential(keys, 0, len(keys) - 1, probe)
+            arr[low:high + 1] = [key.value for key in keys]
+            return
+        partition3 = probe.timed('partition', partition3)
+        insertion = probe.timed('insertion', insertion)
+        heapsort = probe.timed('heap_sort', heapsort)
+    depth_limit = 2 * (high - low + 1).bit_length()
+    stack = [(low, high, depth_limit)]
+    while stack:
+        low, high, depth = stack.pop()
+        while high - low + 1 > INSERTION_SORT_CUTOFF:
+            if depth == 0:
+                heapsort(arr, low, high)
+                break
+            depth -= 1
+            p = choose_pivot(arr, low, high)
+            arr[p], arr[high] = arr[high], arr[p]
+            lt, gt = partition3(arr, low, high)
+            if probe is not None:
+                probe.depth(depth_limit - depth)
+            if lt - low < high - gt:
+                stack.append((gt + 1, high, depth))
+                high = lt - 1
+            else:
+                stack.append((low, lt - 1, depth))
+                low = gt + 1
+        else:
+            insertion(arr, low, high)
 
 
 def parallel_quicksort(arr, low, high, available_threads, threshold):
@@ -29,6 +250,8 @@ def parallel_quicksort(arr, low, high, available_threads, threshold):
         arr[low:high + 1] = sorted(arr[low:high + 1])
     else:
         if low < high:
+            p = median_of_three(arr, low, (low + high) // 2, high)
+            arr[p], arr[high] = arr[high], arr[p]
             pivot_index = partition(arr, low, high)
             if available_threads > 1:
                 left_threads = available_threads // 2
@@ -50,12 +273,278 @@ def parallel_quicksort(arr, low, high, available_threads, threshold):
                 parallel_quicksort(arr, pivot_index + 1, high, 1, threshold)
 
 
-def quicksort(arr, num_threads, threshold=100):
-    """Запускает параллельную сортировку с заданным числом потоков."""
-    parallel_quicksort(arr, 0, len(arr) - 1, num_threads, threshold)
+SAMPLE_OVERSAMPLE = 32  # элементов выборки на процесс при выборе разделителей
+
+_process_pool = None
+_process_pool_size = 0
+
+
+def get_process_pool(workers):
+    """Возвращает постоянный пул процессов, переиспользуемый между вызовами."""
+    global _process_pool, _process_pool_size
+    if _process_pool is None or _process_pool_size != workers:
+        shutdown_process_pool()
+        _process_pool = multiprocessing.Pool(workers)
+        _process_pool_size = workers
+    return _process_pool
+
+
+def shutdown_process_pool():
+    """Останавливает постоянный пул процессов, если он был создан."""
+    global _process_pool, _process_pool_size
+    if _process_pool is not None:
+        _process_pool.close()
+        _process_pool.join()
+        _process_pool = None
+        _process_pool_size = 0
+
+
+atexit.register(shutdown_process_pool)
+
+
+def _shared_slice(shm, low, high):
+    """Отрезок [low, high) общего буфера int64 без копирования: ndarray, а без NumPy — memoryview."""
+    if np is not None:
+        return np.ndarray(high - low, dtype=np.int64, buffer=shm.buf, offset=low * 8)
+    with shm.buf.cast('q') as view:
+        return view[low:high]
+
+
+def _release(view):
+    """Отпускает представление буфера, чтобы SharedMemory.close() не упал на экспортированных указателях."""
+    if isinstance(view, memoryview):
+        view.release()
+
+
+def _sort_shared_block(task):
+    """Сортирует блок [low, high) общего буфера на месте и возвращает границы корзин в нём.
+
+    В отсортированном блоке каждая корзина — отрезок: «меньше splitters[0]»,
+    «равны splitters[0]», «между splitters[0] и splitters[1]», ... «больше
+    splitters[-1]». Возвращаются начала корзин относительно low и длина блока.
+    """
+    name, low, high, splitters = task
+    shm = shared_memory.SharedMemory(name=name)
+    block = None
+    try:
+        block = _shared_slice(shm, low, high)
+        if np is not None:
+            block.sort()
+            bounds = np.empty(2 * len(splitters) + 2, dtype=np.int64)
+            bounds[0], bounds[-1] = 0, len(block)
+            bounds[1:-1:2] = np.searchsorted(block, splitters, side='left')
+            bounds[2:-1:2] = np.searchsorted(block, splitters, side='right')
+            return bounds.tolist()
+        items = block.tolist()
+        items.sort()
+        block[:] = array('q', items)
+        bounds = [0]
+        for splitter in splitters:
+            bounds.append(bisect_left(items, splitter))
+            bounds.append(bisect_right(items, splitter, bounds[-1]))
+        bounds.append(len(items))
+        return bounds
+    finally:
+        _release(block)
+        block = None
+        shm.close()
+
+
+def _merge_shared_bucket(task):
+    """Копирует отсортированные куски корзины из source в target с позиции start и сливает их там."""
+    source_name, target_name, pieces, start, needs_merge = task
+    source = shared_memory.SharedMemory(name=source_name)
+    target = shared_memory.SharedMemory(name=target_name)
+    size = sum(count for _, count in pieces)
+    out = piece = None
+    try:
+        out = _shared_slice(target, start, start + size)
+        position = 0
+        for offset, count in pieces:
+            piece = _shared_slice(source, offset, offset + count)
+            out[position:position + count] = piece
+            _release(piece)
+            piece = None
+            position += count
+        if needs_merge:
+            # Куски отсортированы, а timsort (sorted и kind='stable' в NumPy) сливает готовые серии
+            if np is not None:
+                out.sort(kind='stable')
+            else:
+                out[:] = array('q', sorted(out.tolist()))
+        return size
+    finally:
+        _release(piece)
+        _release(out)
+        out = piece = None
+        source.close()
+        target.close()
+
+
+def _copy_to_shared(arr, shm):
+    """Записывает вход в общий буфер: array('q') копируется побайтно, остальное — одним преобразованием в int64."""
+    n = len(arr)
+    if isinstance(arr, array) and arr.typecode == 'q':
+        with memoryview(arr).cast('B') as data:
+            shm.buf[:n * 8] = data
+    elif np is not None:
+        view = _shared_slice(shm, 0, n)
+        view[:] = arr
+        del view
+    else:
+        with memoryview(array('q', arr)).cast('B') as data:
+            shm.buf[:n * 8] = data
+
+
+def _copy_from_shared(shm, arr):
+    """Возвращает отсортированные данные из общего буфера в arr на месте."""
+    n = len(arr)
+    if isinstance(arr, array) and arr.typecode == 'q':
+        with memoryview(arr).cast('B') as data, shm.buf[:n * 8] as chunk:
+            data[:] = chunk
+    else:
+        with shm.buf.cast('q') as view, view[:n] as chunk:
+            arr[:] = chunk.tolist()
+
+
+def process_sample_sort(arr, workers, threshold=100, oversample=SAMPLE_OVERSAMPLE):
+    """Многопроцессная сортировка выборкой (sample sort) целых чисел в общей памяти.
+
+    Это не рекурсивное разбиение быстрой сортировки: у него первое разбиение
+    по всему массиву выполняется одним процессом и ограничивает ускорение.
+    Здесь разделители берутся из случайной выборки по индексам (workers *
+    oversample элементов), данные один раз записываются в
+    multiprocessing.shared_memory как int64, после чего:
+
+    1. процессы постоянного пула сортируют каждый свой непрерывный блок буфера
+       на месте и возвращают границы корзин в нём (поиск разделителей в
+       отсортированном блоке);
+    2. каждая корзина собирается из кусков всех блоков во второй буфер и
+       сливается там; корзины элементов, равных разделителю, не сортируются.
+
+    Между процессами передаются только имена буферов и границы кусков. С
+    NumPy блоки сортируются на месте в буфере (ndarray.sort), без него —
+    через список в процессе-обработчике. В родителе остаются выборка, одна
+    запись входа в буфер и одно чтение результата (для array('q') — побайтное
+    копирование, для списка — по одному преобразованию туда и обратно).
+
+    Почти линейное ускорение на 8+ ядрах для 10M элементов не измерялось:
+    тесты и замеры проводились на машине с одним ядром.
+    """
+    n = len(arr)
+    if n < 2:
+        return
+    if n <= threshold or workers < 2:
+        items = sorted(arr)
+        arr[:] = items if isinstance(arr, list) else array('q', items)
+        return
+
+    sample = sorted(arr[i] for i in random.sample(range(n), min(n, workers * oversample)))
+    step = len(sample) / workers
+    splitters = sorted({sample[int(i * step)] for i in range(1, workers)})
+
+    buffers = []
+    try:
+        source = shared_memory.SharedMemory(create=True, size=8 * n)
+        buffers.append(source)
+        target = shared_memory.SharedMemory(create=True, size=8 * n)
+        buffers.append(target)
+        _copy_to_shared(arr, source)
+        pool = get_process_pool(workers)
+
+        blocks = [n * i // workers for i in range(workers)]
+        bounds = pool.map(_sort_shared_block,
+                          [(source.name, low, high, splitters) for low, high in zip(blocks, blocks[1:] + [n])],
+                          chunksize=1)
+
+        # Корзина b лежит в каждом блоке отрезком [bounds[b], bounds[b + 1]); в target корзины идут по порядку
+        tasks = []
+        start = 0
+        for b in range(2 * len(splitters) + 1):
+            pieces = [(low + block_bounds[b], block_bounds[b + 1] - block_bounds[b])
+                      for low, block_bounds in zip(blocks, bounds) if block_bounds[b + 1] > block_bounds[b]]
+            size = sum(count for _, count in pieces)
+            if size:
+                tasks.append((size, (source.name, target.name, pieces, start, b % 2 == 0 and len(pieces) > 1)))
+            start += size
+
+        # Крупные корзины отдаём первыми, чтобы процессы загружались равномерно
+        tasks.sort(key=lambda task: -task[0])
+        for _ in pool.imap_unordered(_merge_shared_bucket, [task for _, task in tasks]):
+            pass
+
+        _copy_from_shared(target, arr)
+    finally:
+        for shm in buffers:
+            shm.close()
+            shm.unlink()
+
+
+def quicksort(arr, num_threads=1, threshold=100, workers=None):
+    """Запускает параллельную сортировку с заданным числом потоков.
+
+    Если задано workers, сортировка выполняется пулом процессов в общей
+    памяти (только для целых чисел, см. process_sample_sort).
+    """
+    if workers is not None:
+        process_sample_sort(arr, workers, threshold)
+    else:
+        parallel_quicksort(arr, 0, len(arr) - 1, num_threads, threshold)
+
+
+class TestQuicksort(unittest.TestCase):
+    INPUTS = {
+        'random': [random.randint(-10000, 10000) for _ in range(3000)],
+        'duplicates': [random.randint(0, 9) for _ in range(3000)],
+        'equal': [7] * 1000,
+        'sorted': list(range(3000)),
+        'reversed': list(range(3000, 0, -1)),
+    }
+
+    @classmethod
+    def tearDownClass(cls):
+        shutdown_process_pool()
+
+    def test_quicksort_sequential(self):
+        for name, data in self.INPUTS.items():
+            with self.subTest(name):
+                arr = data[:]
+                quicksort_sequential(arr, 0, len(arr) - 1)
+                self.assertEqual(arr, sorted(data))
+
+    def test_process_sample_sort(self):
+        for workers in (2, 3):
+            for name, data in self.INPUTS.items():
+                with self.subTest(name, workers=workers):
+                    arr = data[:]
+                    quicksort(arr, workers=workers, threshold=100)
+                    self.assertEqual(arr, sorted(data))
+
+    def test_process_sample_sort_small_and_array(self):
+        for data in ([], [1], [2, 1], [5, 3, 5, 1]):
+            arr = data[:]
+            quicksort(arr, workers=2)
+            self.assertEqual(arr, sorted(data))
+        arr = array('q', self.INPUTS['random'])
+        quicksort(arr, workers=2, threshold=100)
+        self.assertEqual(arr, array('q', sorted(self.INPUTS['random'])))
+
+    def test_process_sample_sort_without_numpy(self):
+        global np
+        saved, np = np, None
+        shutdown_process_pool()  # новый пул унаследует np = None (при старте через fork)
+        try:
+            for name in ('random', 'duplicates'):
+                arr = self.INPUTS[name][:]
+                quicksort(arr, workers=2, threshold=100)
+                self.assertEqual(arr, sorted(self.INPUTS[name]))
+        finally:
+            np = saved
+            shutdown_process_pool()
 
 
 if __name__ == "__main__":
+    unittest.main(exit=False)
     sizes = [100, 1000, 10000, 20000, 30000, 40000, 50000]
     num_threads_list = [2, 4, 8]  # Разное количество потоков
     threshold = 100  # Порог для перехода на стандартную сортировку
@@ -77,3 +566,12 @@ if __name__ == "__main__":
             par_time = time.perf_counter() - start_time
             speedup = seq_time / par_time if par_time > 0 else 0
             print(f"Параллельная сортировка с {num_threads} потоками: {par_time:.6f} секунд, Ускорение: {speedup:.2f}")
+
+        for workers in num_threads_list:
+            arr_proc = arr.copy()
+            quicksort(arr_proc[:threshold * 2], workers=workers)  # прогрев пула
+            start_time = time.perf_counter()
+            quicksort(arr_proc, workers=workers, threshold=threshold)
+            proc_time = time.perf_counter() - start_time
+            speedup = seq_time / proc_time if proc_time > 0 else 0
+            print(f"Сортировка пулом из {workers} процессов: {proc_time:.6f} секунд, Ускорение: {speedup:.2f}")
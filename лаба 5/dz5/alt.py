@@ -0,0 +1,273 @@
+"""
+ALT (A*, Landmarks, Triangle inequality) для графа из main.build_csr_graph.
+
+Для k опорных вершин (landmarks) заранее считаются расстояния от них до всех
+вершин и от всех вершин до них. По неравенству треугольника
+d(v, t) >= d(L, t) - d(L, v) и d(v, t) >= d(v, L) - d(t, L), максимум этих
+оценок — эвристика для A*. В отличие от haversine она «знает» про реки и
+мосты: объезд до моста уже заложен в расстояния до опорных вершин.
+
+    landmarks = build_landmarks(graph, k=8)
+    landmarks.save('belgrad_serbia.alt')
+    landmarks = load_landmarks('belgrad_serbia.alt', graph)
+    stats = {}
+    path, distance, street_names = landmarks.shortest_path(start, end, stats, compare=True)
+    print(stats['settled'], stats['baseline_settled'])
+"""
+import mmap
+import random
+import struct
+from array import array
+from typing import List, Optional, Tuple
+
+from main import (CSRGraph, astar_csr, dijkstra_csr, dijkstra_tree, graph_fingerprint, map_array_sections,
+                  path_street_names, write_array_sections)
+
+ALT_MAGIC = b'DZ5ALT\0\0'
+ALT_VERSION = 1
+# magic, версия, число вершин, число опорных вершин, запас на округление float32, отпечаток графа
+ALT_HEADER = struct.Struct('<8sI QI d 32s')
+DEFAULT_LANDMARKS = 8
+ACTIVE_LANDMARKS = 4
+LANDMARK_STRATEGIES = ('farthest', 'avoid')
+
+
+class LandmarkIndex:
+    """
+    Опорные вершины и таблицы расстояний в float32
+
+    from_table[i * n + v] = d(landmarks[i], v), to_table[i * n + v] = d(v, landmarks[i]);
+    недостижимые вершины хранятся как inf. margin вычитается из оценки, чтобы
+    округление до float32 не сделало эвристику переоценивающей.
+
+    Оценки остаются допустимыми, пока веса графа только растут: для этого
+    хранится копия весов на момент построения. Если какой-то вес стал меньше
+    (CSRGraph.update_edge, reopen_edge), query переходит на Дейкстру, пока
+    таблицы не построят заново.
+    """
+
+    def __init__(self, graph: CSRGraph, landmarks, from_table, to_table, margin: float):
+        self.graph = graph
+        self.landmarks = landmarks
+        self.from_table = from_table
+        self.to_table = to_table
+        self.margin = margin
+        self._mmap = None
+        self._weights = array('d', graph.weights)
+        self._checked_version = graph.version
+        self._valid = True
+
+    def valid(self) -> bool:
+        """Допустимы ли таблицы для текущих весов; проверяется один раз на graph.version"""
+        if self._checked_version != self.graph.version:
+            self._valid = all(w >= w0 for w, w0 in zip(self.graph.weights, self._weights))
+            self._checked_version = self.graph.version
+        return self._valid
+
+    def lower_bound(self, v: int, t: int) -> float:
+        """Нижняя оценка d(v, t) по всем опорным вершинам"""
+        n = self.graph.node_count
+        best = 0.0
+        for base in range(0, len(self.landmarks) * n, n):
+            bound = max(self.from_table[base + t] - self.from_table[base + v],
+                        self.to_table[base + v] - self.to_table[base + t])
+            if bound > best:
+                best = bound
+        return max(0.0, best - self.margin)
+
+    def heuristic(self, source: int, target: int, active: int = ACTIVE_LANDMARKS):
+        """
+        Эвристика h(v) для astar_csr к вершине target
+
+        Используются только active опорных вершин, дающих лучшую оценку для пары
+        (source, target): остальные почти никогда не выигрывают, а каждая стоит
+        двух обращений к таблицам на каждую вершину.
+        """
+        n = self.graph.node_count
+        from_table, to_table, margin = self.from_table, self.to_table, self.margin
+
+        def pair_bound(base):
+            return max(from_table[base + target] - from_table[base + source],
+                       to_table[base + source] - to_table[base + target])
+
+        bases = sorted(range(0, len(self.landmarks) * n, n), key=pair_bound, reverse=True)[:active]
+        chosen = tuple((base, from_table[base + target], to_table[base + target]) for base in bases)
+
+        def h(v: int) -> float:
+            best = 0.0
+            for base, from_t, to_t in chosen:
+                bound = from_t - from_table[base + v]
+                if bound > best:
+                    best = bound
+                bound = to_table[base + v] - to_t
+                if bound > best:
+                    best = bound
+            best -= margin
+            return best if best > 0.0 else 0.0
+
+        return h
+
+    def query(self, source: int, target: int, stats: Optional[dict] = None,
+              compare: bool = False) -> Tuple[List[int], float]:
+        """
+        A* с ALT-эвристикой: (список вершин, длина) или ([], inf)
+
+        stats['settled'] — число обработанных вершин; при compare=True тот же
+        запрос повторяется с эвристикой haversine и в stats['baseline_settled']
+        записывается её число обработанных вершин.
+        """
+        if self.valid():
+            path, distance = astar_csr(self.graph, source, target, self.heuristic(source, target), stats)
+        else:
+            path, distance = dijkstra_csr(self.graph, source, target, stats)
+        if compare and stats is not None:
+            baseline = {}
+            astar_csr(self.graph, source, target, stats=baseline)
+            stats['baseline_settled'] = baseline['settled']
+        return path, distance
+
+    def shortest_path(self, start: Tuple[float, float], end: Tuple[float, float],
+                      stats: Optional[dict] = None,
+                      compare: bool = False) -> Tuple[List[Tuple[float, float]], float, List[str]]:
+        """Тот же контракт, что у main.dijkstra: (path, total_distance, street_names)"""
+        try:
+            source, target = self.graph.node_id(start), self.graph.node_id(end)
+        except KeyError:
+            return [], 0, []
+        path, total_distance = self.query(source, target, stats, compare)
+        if not path:
+            return [], 0, []
+        return [self.graph.coord(node) for node in path], total_distance, path_street_names(self.graph, path)
+
+    def save(self, file_path: str) -> None:
+        """Сохраняет таблицы в бинарный файл, привязанный к отпечатку графа"""
+        header = ALT_HEADER.pack(ALT_MAGIC, ALT_VERSION, self.graph.node_count, len(self.landmarks),
+                                 self.margin, graph_fingerprint(self.graph))
+        with open(file_path, 'wb') as f:
+            f.write(header)
+            write_array_sections(f, (self.landmarks, self.from_table, self.to_table))
+
+
+def load_landmarks(file_path: str, graph: CSRGraph) -> LandmarkIndex:
+    """Загружает таблицы через mmap; ValueError, если файл построен для другого графа"""
+    with open(file_path, 'rb') as f:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    view = memoryview(mm)
+    magic, version, n, k, margin, fingerprint = ALT_HEADER.unpack(view[:ALT_HEADER.size])
+    if magic != ALT_MAGIC or version != ALT_VERSION:
+        raise ValueError(f"{file_path}: неподдерживаемый формат таблиц ALT")
+    if n != graph.node_count or fingerprint != graph_fingerprint(graph):
+        raise ValueError(f"{file_path}: таблицы ALT построены для другого графа")
+    sections, _ = map_array_sections(view, ALT_HEADER.size, (('i', k), ('f', k * n), ('f', k * n)))
+    index = LandmarkIndex(graph, *sections, margin)
+    index._mmap = mm
+    return index
+
+
+def _farthest(distances: List[float], coverage: List[float]) -> int:
+    """Достижимая вершина с наибольшим расстоянием (coverage — текущий минимум по опорным)"""
+    inf = float('inf')
+    best, best_value = -1, -1.0
+    for v, d in enumerate(distances):
+        if d < inf and coverage[v] > best_value:
+            best, best_value = v, coverage[v]
+    return best
+
+
+def _avoid(graph: CSRGraph, root: int, landmarks: List[int],
+           tables: List[Tuple[List[float], List[float]]]) -> int:
+    """
+    Стратегия avoid: лист дерева кратчайших путей от root в самом «плохо
+    покрытом» поддереве
+
+    Вес вершины — насколько текущая оценка d(root, v) по уже выбранным опорным
+    вершинам отстаёт от точного расстояния; поддеревья, содержащие опорную
+    вершину, исключаются. Спуск от root идёт в сторону поддерева с наибольшим
+    суммарным весом.
+    """
+    distances, predecessors = dijkstra_tree(graph, root)
+    inf = float('inf')
+    reached = [v for v in range(graph.node_count) if distances[v] < inf]
+    reached.sort(key=distances.__getitem__, reverse=True)
+
+    size = [0.0] * graph.node_count
+    blocked = bytearray(graph.node_count)
+    for landmark in landmarks:
+        blocked[landmark] = 1
+    for v in reached:
+        bound = 0.0
+        for from_landmark, to_landmark in tables:
+            bound = max(bound, from_landmark[v] - from_landmark[root], to_landmark[root] - to_landmark[v])
+        size[v] += distances[v] - bound
+    children: List[List[int]] = [[] for _ in range(graph.node_count)]
+    for v in reached:
+        parent = predecessors[v]
+        if parent != -1:
+            children[parent].append(v)
+            if blocked[v]:
+                blocked[parent] = 1
+            size[parent] += size[v]
+
+    node = root
+    while True:
+        candidates = [c for c in children[node] if not blocked[c]]
+        if not candidates:
+            return node
+        node = max(candidates, key=size.__getitem__)
+
+
+def select_landmarks(graph: CSRGraph, k: int = DEFAULT_LANDMARKS, strategy: str = 'avoid',
+                     seed: int = 0) -> Tuple[List[int], List[Tuple[List[float], List[float]]]]:
+    """
+    Выбирает k опорных вершин; возвращает (landmarks, [(d(L, ·), d(·, L)), ...])
+
+    farthest — каждая следующая вершина максимально далека от уже выбранных;
+    avoid — лист самого плохо покрытого поддерева от случайного корня
+    (Goldberg, Werneck). Первая опорная вершина в обоих случаях — самая
+    далёкая от случайной стартовой.
+    """
+    if strategy not in LANDMARK_STRATEGIES:
+        raise ValueError(f"Неизвестная стратегия выбора опорных вершин: {strategy}")
+    n = graph.node_count
+    rng = random.Random(seed)
+    reverse = graph.reverse()
+    start = rng.randrange(n)
+    distances, _ = dijkstra_tree(graph, start)
+    landmarks: List[int] = []
+    tables: List[Tuple[List[float], List[float]]] = []
+    coverage = list(distances)
+
+    while len(landmarks) < min(k, n):
+        if not landmarks or strategy == 'farthest':
+            landmark = _farthest(distances, coverage)
+        else:
+            landmark = _avoid(graph, rng.randrange(n), landmarks, tables)
+        if landmark in landmarks:
+            landmark = _farthest(distances, coverage)
+        if landmark in landmarks:
+            break
+        from_landmark, _ = dijkstra_tree(graph, landmark)
+        to_landmark, _ = dijkstra_tree(reverse, landmark)
+        landmarks.append(landmark)
+        tables.append((from_landmark, to_landmark))
+        if len(landmarks) == 1:
+            coverage = list(from_landmark)
+        else:
+            coverage = [min(c, d) for c, d in zip(coverage, from_landmark)]
+    return landmarks, tables
+
+
+def build_landmarks(graph: CSRGraph, k: int = DEFAULT_LANDMARKS, strategy: str = 'avoid',
+                    seed: int = 0) -> LandmarkIndex:
+    """Выбирает опорные вершины и упаковывает их таблицы в float32"""
+    landmarks, tables = select_landmarks(graph, k, strategy, seed)
+    from_table, to_table = array('f'), array('f')
+    largest = 0.0
+    inf = float('inf')
+    for from_landmark, to_landmark in tables:
+        from_table.extend(from_landmark)
+        to_table.extend(to_landmark)
+        largest = max([largest] + [d for d in from_landmark if d < inf] + [d for d in to_landmark if d < inf])
+    # Относительная погрешность float32 — 2**-24 на каждое из двух слагаемых оценки
+    margin = largest * 2 ** -22
+    return LandmarkIndex(graph, array('i', landmarks), from_table, to_table, margin)
@@ -0,0 +1,290 @@
+"""
+Иерархии сжатия (contraction hierarchies) для графа из main.build_csr_graph.
+
+Предобработка один раз упорядочивает вершины по разности рёбер и «сжимает»
+их по очереди, добавляя шорткаты там, где поиск свидетеля не нашёл обходного
+пути. Запрос — двунаправленная Дейкстра только вверх по иерархии, она
+обрабатывает сотни вершин вместо десятков тысяч.
+
+    hierarchy = build_contraction_hierarchy(graph)
+    hierarchy.save('belgrad_serbia.ch')
+    hierarchy = load_contraction_hierarchy('belgrad_serbia.ch', graph)
+    path, distance, street_names = hierarchy.shortest_path(start, end)
+"""
+import heapq
+import mmap
+import struct
+from array import array
+from typing import Dict, List, Optional, Tuple
+
+from main import CSRGraph, graph_fingerprint, map_array_sections, path_street_names, write_array_sections
+
+CH_MAGIC = b'DZ5CH\0\0\0'
+CH_VERSION = 1
+# magic, версия, число вершин, число дуг вверх, число дуг вниз, отпечаток графа
+CH_HEADER = struct.Struct('<8sI QQQ 32s')
+WITNESS_SETTLE_LIMIT = 64
+
+
+class ContractionHierarchy:
+    """
+    Результат предобработки: ранги вершин и два «восходящих» графа в формате CSR
+
+    up_*: дуги u -> v исходного графа (или шорткаты), где rank[v] > rank[u];
+    down_*: дуги u -> v, где rank[u] > rank[v], хранящиеся у v как (u, вес) —
+    по ним идёт обратный поиск от цели. middle — сжатая вершина, через
+    которую проходит шорткат, или -1 для исходной дуги.
+    """
+
+    def __init__(self, graph: CSRGraph, rank, up_offsets, up_targets, up_weights, up_middle,
+                 down_offsets, down_targets, down_weights, down_middle):
+        self.graph = graph
+        self.rank = rank
+        self.up = (up_offsets, up_targets, up_weights, up_middle)
+        self.down = (down_offsets, down_targets, down_weights, down_middle)
+        self._mmap = None
+
+    @property
+    def shortcut_count(self) -> int:
+        return sum(1 for m in self.up[3] if m != -1) + sum(1 for m in self.down[3] if m != -1)
+
+    def query(self, source: int, target: int, stats: Optional[dict] = None) -> Tuple[List[int], float]:
+        """
+        Кратчайший путь между индексами вершин: (список вершин, длина) или ([], inf)
+
+        Прямой поиск идёт от source по up-дугам, обратный от target по down-дугам;
+        сторона прекращает работу, когда минимум её очереди не меньше лучшего
+        найденного пути mu.
+        """
+        inf = float('inf')
+        if source == target:
+            if stats is not None:
+                stats['settled'] = 1
+            return [source], 0.0
+        dist_f, dist_b = {source: 0.0}, {target: 0.0}
+        pred = ({source: (-1, -1)}, {target: (-1, -1)})
+        queue_f, queue_b = [(0.0, source)], [(0.0, target)]
+        forward = (queue_f, dist_f, dist_b, pred[0]) + self.up
+        backward = (queue_b, dist_b, dist_f, pred[1]) + self.down
+        mu, meeting, settled = inf, -1, 0
+        heappop, heappush = heapq.heappop, heapq.heappush
+
+        while True:
+            top_f = queue_f[0][0] if queue_f else inf
+            top_b = queue_b[0][0] if queue_b else inf
+            if min(top_f, top_b) >= mu:
+                break
+            queue, distances, other_distances, predecessors, offsets, targets, weights, middle = (
+                forward if top_f <= top_b else backward)
+            d, u = heappop(queue)
+            if d > distances[u]:
+                continue
+            settled += 1
+            other = other_distances.get(u)
+            if other is not None and d + other < mu:
+                mu, meeting = d + other, u
+            for k in range(offsets[u], offsets[u + 1]):
+                v = targets[k]
+                nd = d + weights[k]
+                if nd < distances.get(v, inf):
+                    distances[v] = nd
+                    predecessors[v] = (u, middle[k])
+                    heappush(queue, (nd, v))
+
+        if stats is not None:
+            stats['settled'] = settled
+        if meeting == -1:
+            return [], inf
+
+        arcs = []
+        node = meeting
+        while pred[0][node][0] != -1:
+            u, m = pred[0][node]
+            arcs.append((u, node, m))
+            node = u
+        arcs.reverse()
+        node = meeting
+        while pred[1][node][0] != -1:
+            x, m = pred[1][node]
+            arcs.append((node, x, m))
+            node = x
+
+        path = [source]
+        for arc in arcs:
+            path.extend(self._unpack(*arc))
+        return path, mu
+
+    def _middle(self, u: int, v: int) -> int:
+        """middle самой короткой дуги u -> v в иерархии"""
+        if self.rank[v] > self.rank[u]:
+            offsets, targets, weights, middle = self.up
+            owner, other = u, v
+        else:
+            offsets, targets, weights, middle = self.down
+            owner, other = v, u
+        best, best_middle = float('inf'), -1
+        for k in range(offsets[owner], offsets[owner + 1]):
+            if targets[k] == other and weights[k] < best:
+                best, best_middle = weights[k], middle[k]
+        return best_middle
+
+    def _unpack(self, u: int, v: int, m: int) -> List[int]:
+        """Разворачивает дугу u -> v (m — её middle) в вершины исходного графа после u"""
+        result = []
+        stack = [(u, v, m)]
+        while stack:
+            a, b, mid = stack.pop()
+            if mid == -1:
+                result.append(b)
+            else:
+                stack.append((mid, b, self._middle(mid, b)))
+                stack.append((a, mid, self._middle(a, mid)))
+        return result
+
+    def shortest_path(self, start: Tuple[float, float], end: Tuple[float, float],
+                      stats: Optional[dict] = None) -> Tuple[List[Tuple[float, float]], float, List[str]]:
+        """Тот же контракт, что у main.dijkstra: (path, total_distance, street_names)"""
+        try:
+            source, target = self.graph.node_id(start), self.graph.node_id(end)
+        except KeyError:
+            return [], 0, []
+        path, total_distance = self.query(source, target, stats)
+        if not path:
+            return [], 0, []
+        return [self.graph.coord(node) for node in path], total_distance, path_street_names(self.graph, path)
+
+    def save(self, file_path: str) -> None:
+        """Сохраняет иерархию в бинарный файл, привязанный к отпечатку графа"""
+        header = CH_HEADER.pack(CH_MAGIC, CH_VERSION, len(self.rank), len(self.up[1]), len(self.down[1]),
+                                graph_fingerprint(self.graph))
+        with open(file_path, 'wb') as f:
+            f.write(header)
+            write_array_sections(f, (self.rank,) + self.up + self.down)
+
+
+def load_contraction_hierarchy(file_path: str, graph: CSRGraph) -> ContractionHierarchy:
+    """Загружает иерархию через mmap; ValueError, если файл построен для другого графа"""
+    with open(file_path, 'rb') as f:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    view = memoryview(mm)
+    magic, version, n, up_count, down_count, fingerprint = CH_HEADER.unpack(view[:CH_HEADER.size])
+    if magic != CH_MAGIC or version != CH_VERSION:
+        raise ValueError(f"{file_path}: неподдерживаемый формат иерархии")
+    if n != graph.node_count or fingerprint != graph_fingerprint(graph):
+        raise ValueError(f"{file_path}: иерархия построена для другого графа")
+    sections, _ = map_array_sections(view, CH_HEADER.size, (
+        ('i', n),
+        ('q', n + 1), ('i', up_count), ('d', up_count), ('i', up_count),
+        ('q', n + 1), ('i', down_count), ('d', down_count), ('i', down_count)))
+    hierarchy = ContractionHierarchy(graph, *sections)
+    hierarchy._mmap = mm
+    return hierarchy
+
+
+def _witness_search(out_adj: List[Dict[int, tuple]], source: int, skip: int,
+                    max_distance: float, limit: int) -> Dict[int, float]:
+    """Ограниченная Дейкстра от source в ещё не сжатом графе без вершины skip"""
+    dist = {source: 0.0}
+    queue = [(0.0, source)]
+    settled = 0
+    while queue:
+        d, u = heapq.heappop(queue)
+        if d > dist[u]:
+            continue
+        if d > max_distance or settled >= limit:
+            break
+        settled += 1
+        for v, (w, _) in out_adj[u].items():
+            if v == skip:
+                continue
+            nd = d + w
+            if nd < dist.get(v, float('inf')):
+                dist[v] = nd
+                heapq.heappush(queue, (nd, v))
+    return dist
+
+
+def _shortcuts(out_adj, in_adj, v: int, limit: int) -> List[Tuple[int, int, float]]:
+    """Шорткаты (u, x, вес), нужные при сжатии v: пары без более короткого пути-свидетеля"""
+    shortcuts = []
+    outgoing = out_adj[v]
+    for u, (w1, _) in in_adj[v].items():
+        candidates = [(x, w1 + w2) for x, (w2, _) in outgoing.items() if x != u]
+        if not candidates:
+            continue
+        dist = _witness_search(out_adj, u, v, max(d for _, d in candidates), limit)
+        inf = float('inf')
+        shortcuts.extend((u, x, d) for x, d in candidates if dist.get(x, inf) > d)
+    return shortcuts
+
+
+def build_contraction_hierarchy(graph: CSRGraph, witness_limit: int = WITNESS_SETTLE_LIMIT) -> ContractionHierarchy:
+    """
+    Строит иерархию сжатия для CSR-графа
+
+    Вершины сжимаются в порядке приоритета «разность рёбер + число уже сжатых
+    соседей» с ленивым пересчётом: вершина сжимается, только если её
+    пересчитанный приоритет не хуже следующего в очереди. witness_limit
+    ограничивает поиск свидетеля — лишние шорткаты допустимы, неверных не бывает.
+    """
+    n = graph.node_count
+    out_adj = [dict() for _ in range(n)]
+    in_adj = [dict() for _ in range(n)]
+    for u in range(n):
+        for k in range(graph.offsets[u], graph.offsets[u + 1]):
+            v, w = graph.targets[k], graph.weights[k]
+            if v != u and (v not in out_adj[u] or w < out_adj[u][v][0]):
+                out_adj[u][v] = (w, -1)
+                in_adj[v][u] = (w, -1)
+
+    contracted_neighbors = [0] * n
+
+    def priority(v: int) -> int:
+        shortcuts = len(_shortcuts(out_adj, in_adj, v, witness_limit))
+        return shortcuts - len(in_adj[v]) - len(out_adj[v]) + contracted_neighbors[v]
+
+    queue = [(priority(v), v) for v in range(n)]
+    heapq.heapify(queue)
+    rank = array('i', [0]) * n
+    up_arcs: List[List[tuple]] = [[] for _ in range(n)]
+    down_arcs: List[List[tuple]] = [[] for _ in range(n)]
+    order = 0
+
+    while queue:
+        _, v = heapq.heappop(queue)
+        new_priority = priority(v)
+        if queue and new_priority > queue[0][0]:
+            heapq.heappush(queue, (new_priority, v))
+            continue
+
+        shortcuts = _shortcuts(out_adj, in_adj, v, witness_limit)
+        rank[v] = order
+        order += 1
+        up_arcs[v] = [(x, w, m) for x, (w, m) in out_adj[v].items()]
+        down_arcs[v] = [(u, w, m) for u, (w, m) in in_adj[v].items()]
+        for u in in_adj[v]:
+            del out_adj[u][v]
+            contracted_neighbors[u] += 1
+        for x in out_adj[v]:
+            del in_adj[x][v]
+            contracted_neighbors[x] += 1
+        out_adj[v] = {}
+        in_adj[v] = {}
+        for u, x, d in shortcuts:
+            if x not in out_adj[u] or d < out_adj[u][x][0]:
+                out_adj[u][x] = (d, v)
+                in_adj[x][u] = (d, v)
+
+    return ContractionHierarchy(graph, rank, *_pack(up_arcs), *_pack(down_arcs))
+
+
+def _pack(arcs: List[List[tuple]]):
+    offsets = array('q', [0])
+    targets, weights, middle = array('i'), array('d'), array('i')
+    for node_arcs in arcs:
+        for target, weight, mid in node_arcs:
+            targets.append(target)
+            weights.append(weight)
+            middle.append(mid)
+        offsets.append(len(targets))
+    return offsets, targets, weights, middle
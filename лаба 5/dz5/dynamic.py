@@ -0,0 +1,157 @@
+"""
+Деревья кратчайших путей, которые переживают изменения весов рёбер.
+
+Для зарегистрированных «горячих» источников хранится полное дерево
+кратчайших путей (distances, predecessors). Изменение дуги u -> v чинит
+только затронутую часть (по мотивам Ramalingam–Reps / LPA*):
+
+* вес уменьшился — улучшение распространяется от v Дейкстрой, которая
+  останавливается там, где расстояния не меняются;
+* вес вырос и дуга была в дереве — поддерево v теряет расстояния и
+  пересчитывается от его границы с остальным деревом.
+
+Каждое обновление сообщает, сколько вершин пришлось тронуть для каждого
+источника; после небольшого изменения это доли процента графа.
+
+    paths = DynamicShortestPaths(graph)
+    paths.register(depot)
+    touched = paths.close_edge(u, v)        # {depot: число тронутых вершин}
+    path, distance = paths.path(depot, target)
+"""
+import heapq
+from array import array
+from typing import Dict, List, Tuple
+
+from main import CSRGraph, _reconstruct, dijkstra_tree
+
+
+class DynamicShortestPaths:
+    """
+    Набор деревьев кратчайших путей от источников origins над изменяемым графом
+
+    Обновления нужно делать через методы этого класса (update_edge, close_edge,
+    reopen_edge): они меняют граф (CSRGraph.update_edge и т. п.) и сразу чинят
+    деревья. Входящие дуги каждой вершины индексируются один раз — структура
+    графа не меняется, меняются только веса.
+    """
+
+    def __init__(self, graph: CSRGraph):
+        self.graph = graph
+        n = graph.node_count
+        self.arc_sources = array('i', [0]) * graph.edge_count
+        counts = array('q', [0]) * (n + 1)
+        for u in range(n):
+            for k in range(graph.offsets[u], graph.offsets[u + 1]):
+                self.arc_sources[k] = u
+                counts[graph.targets[k] + 1] += 1
+        for i in range(n):
+            counts[i + 1] += counts[i]
+        self.in_offsets = counts
+        self.in_arcs = array('i', [0]) * graph.edge_count
+        fill = counts[:-1]
+        for k, v in enumerate(graph.targets):
+            self.in_arcs[fill[v]] = k
+            fill[v] += 1
+        self.trees: Dict[int, Tuple[array, array]] = {}
+
+    def register(self, origin: int) -> int:
+        """Строит дерево от origin полной Дейкстрой; возвращает число обработанных вершин"""
+        stats = {}
+        distances, predecessors = dijkstra_tree(self.graph, origin, stats=stats)
+        self.trees[origin] = (array('d', distances), array('i', predecessors))
+        return stats['settled']
+
+    def unregister(self, origin: int) -> None:
+        self.trees.pop(origin, None)
+
+    def distance(self, origin: int, target: int) -> float:
+        return self.trees[origin][0][target]
+
+    def path(self, origin: int, target: int) -> Tuple[List[int], float]:
+        """Путь из дерева без поиска: (список вершин, длина) или ([], inf)"""
+        distances, predecessors = self.trees[origin]
+        if distances[target] == float('inf'):
+            return [], float('inf')
+        return _reconstruct(predecessors, target), distances[target]
+
+    # --- Обновления ---
+
+    def update_edge(self, u: int, v: int, weight: float, both: bool = True) -> Dict[int, int]:
+        """Меняет вес ребра и чинит деревья; возвращает {источник: число тронутых вершин}"""
+        return self._apply(self.graph.update_edge(u, v, weight, both))
+
+    def close_edge(self, u: int, v: int, both: bool = True) -> Dict[int, int]:
+        return self._apply(self.graph.close_edge(u, v, both))
+
+    def reopen_edge(self, u: int, v: int, both: bool = True) -> Dict[int, int]:
+        return self._apply(self.graph.reopen_edge(u, v, both))
+
+    def _apply(self, changes: List[Tuple[int, float, float]]) -> Dict[int, int]:
+        touched = {origin: 0 for origin in self.trees}
+        for k, old, new in changes:
+            for origin, (distances, predecessors) in self.trees.items():
+                if new < old:
+                    touched[origin] += self._decrease(distances, predecessors, k)
+                elif predecessors[self.graph.targets[k]] == self.arc_sources[k]:
+                    touched[origin] += self._increase(distances, predecessors, k)
+        return touched
+
+    def _propagate(self, distances: array, predecessors: array, queue: list) -> int:
+        """Дейкстра от очереди улучшенных вершин; возвращает число обработанных"""
+        offsets, targets, weights = self.graph.offsets, self.graph.targets, self.graph.weights
+        heappop, heappush = heapq.heappop, heapq.heappush
+        settled = 0
+        while queue:
+            d, x = heappop(queue)
+            if d > distances[x]:
+                continue
+            settled += 1
+            for k in range(offsets[x], offsets[x + 1]):
+                y = targets[k]
+                nd = d + weights[k]
+                if nd < distances[y]:
+                    distances[y] = nd
+                    predecessors[y] = x
+                    heappush(queue, (nd, y))
+        return settled
+
+    def _decrease(self, distances: array, predecessors: array, k: int) -> int:
+        u, v = self.arc_sources[k], self.graph.targets[k]
+        nd = distances[u] + self.graph.weights[k]
+        if nd >= distances[v]:
+            return 0
+        distances[v] = nd
+        predecessors[v] = u
+        return self._propagate(distances, predecessors, [(nd, v)])
+
+    def _increase(self, distances: array, predecessors: array, k: int) -> int:
+        offsets, targets, weights = self.graph.offsets, self.graph.targets, self.graph.weights
+        inf = float('inf')
+        root = targets[k]
+
+        # Поддерево root в дереве кратчайших путей: дети x — концы дуг x -> y с predecessors[y] == x
+        subtree = [root]
+        for x in subtree:
+            for j in range(offsets[x], offsets[x + 1]):
+                y = targets[j]
+                if predecessors[y] == x and y != root:
+                    subtree.append(y)
+        for x in subtree:
+            distances[x] = inf
+            predecessors[x] = -1
+
+        # Граница: лучший вход в каждую вершину поддерева из оставшейся части дерева
+        queue = []
+        for x in subtree:
+            best, parent = inf, -1
+            for j in self.in_arcs[self.in_offsets[x]:self.in_offsets[x + 1]]:
+                s = self.arc_sources[j]
+                candidate = distances[s] + weights[j]
+                if candidate < best:
+                    best, parent = candidate, s
+            if parent != -1:
+                distances[x] = best
+                predecessors[x] = parent
+                queue.append((best, x))
+        heapq.heapify(queue)
+        return len(subtree) + self._propagate(distances, predecessors, queue)
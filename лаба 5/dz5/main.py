@@ -1,13 +1,34 @@
+import asyncio
+import functools
+import hashlib
+import json
+import mmap
+import os
+import random
+import shutil
+import struct
+import sys
+import tempfile
 import time
+import unicodedata
+import unittest
 import xml.etree.ElementTree as ET
 from pprint import pprint
 
 import matplotlib.pyplot as plt
 from matplotlib.collections import LineCollection
-from typing import Dict, List, Tuple
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict
+from typing import Dict, Iterator, List, Optional, Tuple
 import math
 import heapq
 
+try:
+    import numpy as np
+except ImportError:  # NumPy необязателен: без него массовые расстояния считаются в цикле
+    np = None
+
 
 def haversine(coord1: Tuple[float, float], coord2: Tuple[float, float]) -> float:
     """
@@ -22,18 +43,73 @@ def haversine(coord1: Tuple[float, float], coord2: Tuple[float, float]) -> float
     dlambda = math.radians(lon2 - lon1)
 
     a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    a = min(a, 1.0)  # у антиподов округление даёт a чуть больше 1
     return 2 * R * math.atan2(math.sqrt(a), math.sqrt(1 - a))
 
 
+def haversine_arrays(lon1, lat1, lon2, lat2, typecode: str = 'd') -> array:
+    """
+    Попарные расстояния haversine (км) между точками (lon1[i], lat1[i]) и (lon2[i], lat2[i])
+
+    Формула та же, что у haversine; с NumPy считается одним векторным проходом
+    в float64, без неё — циклом. typecode='f' возвращает array('f') вдвое меньшего
+    размера (точность около 1e-7 относительной).
+    """
+    if np is None:
+        radians, sin, cos, atan2, sqrt = math.radians, math.sin, math.cos, math.atan2, math.sqrt
+        distances = array(typecode)
+        append = distances.append
+        for x1, y1, x2, y2 in zip(lon1, lat1, lon2, lat2):
+            phi1, phi2 = radians(y1), radians(y2)
+            a = sin(radians(y2 - y1) / 2) ** 2 + cos(phi1) * cos(phi2) * sin(radians(x2 - x1) / 2) ** 2
+            a = min(a, 1.0)
+            append(2 * 6371 * atan2(sqrt(a), sqrt(1 - a)))
+        return distances
+    lon1, lat1 = np.asarray(lon1, dtype=np.float64), np.asarray(lat1, dtype=np.float64)
+    lon2, lat2 = np.asarray(lon2, dtype=np.float64), np.asarray(lat2, dtype=np.float64)
+    phi1, phi2 = np.radians(lat1), np.radians(lat2)
+    dphi = np.radians(lat2 - lat1)
+    dlambda = np.radians(lon2 - lon1)
+    a = np.minimum(np.sin(dphi / 2) ** 2 + np.cos(phi1) * np.cos(phi2) * np.sin(dlambda / 2) ** 2, 1.0)
+    distances = 2 * 6371 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+    return array(typecode, distances.astype(typecode).tobytes())
+
+
+def haversine_many(points, point: Tuple[float, float], typecode: str = 'd') -> array:
+    """Расстояния (км) от каждой из points — пар (lon, lat) — до одной точки point"""
+    if np is None:
+        return array(typecode, (haversine(p, point) for p in points))
+    coords = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    return haversine_arrays(coords[:, 0], coords[:, 1], np.full(len(coords), point[0]),
+                            np.full(len(coords), point[1]), typecode)
+
+
+def edge_lengths(lon, lat, sources, targets, typecode: str = 'd') -> array:
+    """Длины рёбер sources[i] -> targets[i] (индексы вершин в массивах lon/lat) одним проходом"""
+    if np is None:
+        return haversine_arrays((lon[u] for u in sources), (lat[u] for u in sources),
+                                (lon[v] for v in targets), (lat[v] for v in targets), typecode)
+    lon, lat = np.asarray(lon, dtype=np.float64), np.asarray(lat, dtype=np.float64)
+    sources, targets = np.asarray(sources, dtype=np.intp), np.asarray(targets, dtype=np.intp)
+    return haversine_arrays(lon[sources], lat[sources], lon[targets], lat[targets], typecode)
+
+
 def dijkstra(graph: Dict[Tuple[float, float], List[Tuple[Tuple[float, float], float]]],
              start: Tuple[float, float],
-             end: Tuple[float, float]) -> Tuple[List[Tuple[float, float]], float, List[str]]:
+             end: Tuple[float, float],
+             method: str = 'dijkstra',
+             stats: Optional[dict] = None) -> Tuple[List[Tuple[float, float]], float, List[str]]:
     """
     Находит кратчайший путь в графе от начальной вершины до конечной с помощью алгоритма Дейкстры.
 
     Аргументы:
         graph: Граф, представленный в виде словаря. Ключами являются вершины (кортежи с координатами),
                а значениями — списки смежных вершин, каждая из которых представлена кортежем (соседняя вершина, расстояние).
+               Можно передать и CSRGraph — тогда поиск идёт по целочисленным индексам вершин.
+        method: 'dijkstra', 'astar', 'bidirectional' или 'bidirectional_astar'. Для словарного
+                графа любой метод, кроме 'dijkstra', работает по CSRGraph.from_dict(graph);
+                преобразование кэшируется для последнего переданного словаря (см. _csr_for_dict).
+        stats: необязательный словарь, куда записывается число обработанных вершин (settled).
         start: Начальная вершина в формате (долгота, широта).
         end: Конечная вершина в формате (долгота, широта).
 
@@ -43,6 +119,11 @@ def dijkstra(graph: Dict[Tuple[float, float], List[Tuple[Tuple[float, float], fl
         - total_distance: Общее расстояние кратчайшего пути (float).
         - street_names: Список названий улиц вдоль пути (пустой, если информация о названиях улиц недоступна).
     """
+    if isinstance(graph, CSRGraph):
+        return shortest_path_csr(graph, start, end, method, stats)
+    if method != 'dijkstra':
+        return shortest_path_csr(_csr_for_dict(graph), start, end, method, stats)
+
     # Приоритетная очередь для хранения (расстояние, узел)
     queue = []
     heapq.heappush(queue, (0, start))
@@ -73,6 +154,9 @@ def dijkstra(graph: Dict[Tuple[float, float], List[Tuple[Tuple[float, float], fl
                     predecessors[neighbor] = current_node
                     heapq.heappush(queue, (new_distance, neighbor))
 
+    if stats is not None:
+        stats['settled'] = len(visited)
+
     path = []
     total_distance = distances[end]
 
@@ -90,6 +174,29 @@ def dijkstra(graph: Dict[Tuple[float, float], List[Tuple[Tuple[float, float], fl
     return path, total_distance, street_names
 
 
+# Последний словарный граф, переведённый в CSR: (граф, (число вершин, число дуг), CSRGraph)
+_dict_csr_cache: Optional[tuple] = None
+
+
+def _csr_for_dict(graph: Dict[Tuple[float, float], List[Tuple[Tuple[float, float], float]]]) -> 'CSRGraph':
+    """
+    CSRGraph.from_dict(graph), построенный один раз для одного и того же словаря
+
+    Словарь узнаётся по идентичности (кэш держит на него ссылку, так что id не
+    переиспользуется), а добавление или удаление вершин и дуг — по их числу.
+    Изменение весов на месте не отслеживается: для изменяемого графа
+    используйте CSRGraph и его update_edge.
+    """
+    global _dict_csr_cache
+    shape = (len(graph), sum(map(len, graph.values())))
+    cached = _dict_csr_cache
+    if cached is not None and cached[0] is graph and cached[1] == shape:
+        return cached[2]
+    csr = CSRGraph.from_dict(graph)
+    _dict_csr_cache = (graph, shape, csr)
+    return csr
+
+
 def build_graph(edges: List[Tuple[Tuple[float, float], Tuple[float, float], str]]) -> Dict[
     Tuple[float, float], List[Tuple[Tuple[float, float], float]]]:
     """
@@ -103,6 +210,739 @@ def build_graph(edges: List[Tuple[Tuple[float, float], Tuple[float, float], str]
     return graph
 
 
+HEURISTIC_TOLERANCE = 1e-9  # относительный запас на округление при сравнении веса с haversine
+
+
+class CSRGraph:
+    """
+    Граф в формате CSR (compressed sparse row) с целочисленными индексами вершин.
+
+    Вершина i хранит координаты lon[i], lat[i]; её исходящие рёбра занимают
+    позиции offsets[i]..offsets[i + 1] - 1 в массивах targets (индекс соседа),
+    weights (длина в км) и edge_names (индекс названия в names или -1).
+    Все массивы — array.array, без кортежей и словарей на каждое ребро.
+
+    heuristic_safe — ни один вес, заданный через update_edge, не короче
+    расстояния по прямой между концами ребра; иначе эвристика haversine
+    переоценивает, и A* по умолчанию переходит на Дейкстру.
+    """
+
+    def __init__(self, lon, lat, offsets, targets, weights, edge_names=None, names=None):
+        self.lon = lon
+        self.lat = lat
+        self.offsets = offsets
+        self.targets = targets
+        self.weights = weights
+        self.edge_names = edge_names if edge_names is not None else array('i', [-1]) * len(targets)
+        self.names = names if names is not None else []
+        self.version = 0
+        self._node_index = None
+        self._mmap = None  # отображённый файл кэша, если граф загружен load_graph_cache
+        self._reverse = None
+        self._street_index = None
+        self._closed: Dict[int, float] = {}  # дуга -> её вес до закрытия
+        self.heuristic_safe = True
+
+    @property
+    def node_count(self) -> int:
+        return len(self.lon)
+
+    @property
+    def edge_count(self) -> int:
+        return len(self.targets)
+
+    def coord(self, node: int) -> Tuple[float, float]:
+        """Координаты (долгота, широта) вершины по индексу"""
+        return self.lon[node], self.lat[node]
+
+    def node_id(self, coord: Tuple[float, float]) -> int:
+        """Индекс вершины по координатам (KeyError, если такой вершины нет)"""
+        if self._node_index is None:
+            self._node_index = {(x, y): i for i, (x, y) in enumerate(zip(self.lon, self.lat))}
+        return self._node_index[coord]
+
+    def neighbors(self, node: int) -> Iterator[Tuple[int, float]]:
+        """Пары (индекс соседа, вес) для исходящих рёбер вершины"""
+        for k in range(self.offsets[node], self.offsets[node + 1]):
+            yield self.targets[k], self.weights[k]
+
+    def reverse(self) -> 'CSRGraph':
+        """Граф с обращёнными дугами (для обратного поиска); кэшируется до изменения version"""
+        cached = self._reverse
+        if cached is not None and cached.version == self.version:
+            return cached
+        arcs = {}
+        for u in range(self.node_count):
+            for k in range(self.offsets[u], self.offsets[u + 1]):
+                arcs[(self.targets[k], u)] = (self.weights[k], self.edge_names[k])
+        reverse = _pack_csr(list(zip(self.lon, self.lat)), arcs, self.names)
+        reverse.version = self.version
+        self._reverse = reverse
+        return reverse
+
+    def edges(self) -> Iterator[Tuple[Tuple[float, float], Tuple[float, float], Optional[str]]]:
+        """Рёбра в формате read_graphml: ((x1, y1), (x2, y2), название_улицы), каждое по одному разу"""
+        for u in range(self.node_count):
+            for k in range(self.offsets[u], self.offsets[u + 1]):
+                v = self.targets[k]
+                if u < v:
+                    name_id = self.edge_names[k]
+                    yield self.coord(u), self.coord(v), self.names[name_id] if name_id >= 0 else None
+
+    def street_index(self) -> 'StreetIndex':
+        """Индекс названий улиц; строится при первом обращении и переиспользуется"""
+        if self._street_index is None:
+            self._street_index = StreetIndex(self)
+        return self._street_index
+
+    def arc(self, u: int, v: int) -> int:
+        """Позиция самой короткой дуги u -> v в targets/weights или -1"""
+        best, best_weight = -1, float('inf')
+        for k in range(self.offsets[u], self.offsets[u + 1]):
+            if self.targets[k] == v and (best < 0 or self.weights[k] < best_weight):
+                best, best_weight = k, self.weights[k]
+        return best
+
+    def _writable_weights(self):
+        """Веса, которые можно менять: из кэша на mmap они сначала копируются (copy-on-write)"""
+        if not isinstance(self.weights, array):
+            self.weights = array('d', self.weights)
+        return self.weights
+
+    def _edge_arcs(self, u: int, v: int, both: bool) -> List[int]:
+        arcs = [self.arc(u, v)] + ([self.arc(v, u)] if both else [])
+        if arcs[0] < 0:
+            raise KeyError(f"нет ребра {u} -> {v}")
+        return [k for k in arcs if k >= 0]
+
+    def update_edge(self, u: int, v: int, weight: float, both: bool = True) -> List[Tuple[int, float, float]]:
+        """
+        Меняет вес ребра u -> v (и v -> u при both) на месте и увеличивает version
+
+        Возвращает изменения [(дуга, старый вес, новый вес)]. Для закрытого
+        ребра запоминается новый вес, который вернёт reopen_edge. Вес короче
+        расстояния по прямой сбрасывает heuristic_safe. Иерархии сжатия после
+        изменения весов нужно построить заново; таблицы ALT сами переходят на
+        Дейкстру, если какой-то вес стал меньше, чем при их построении.
+        """
+        weights = self._writable_weights()
+        if weight < haversine(self.coord(u), self.coord(v)) * (1 - HEURISTIC_TOLERANCE):
+            self.heuristic_safe = False
+        changes = []
+        for k in self._edge_arcs(u, v, both):
+            if k in self._closed:
+                self._closed[k] = weight
+            elif weights[k] != weight:
+                changes.append((k, weights[k], weight))
+                weights[k] = weight
+        self.version += 1
+        return changes
+
+    def close_edge(self, u: int, v: int, both: bool = True) -> List[Tuple[int, float, float]]:
+        """Закрывает ребро (вес inf), сохраняя прежний вес для reopen_edge"""
+        weights = self._writable_weights()
+        changes = []
+        for k in self._edge_arcs(u, v, both):
+            if k not in self._closed:
+                self._closed[k] = weights[k]
+                changes.append((k, weights[k], float('inf')))
+                weights[k] = float('inf')
+        self.version += 1
+        return changes
+
+    def reopen_edge(self, u: int, v: int, both: bool = True) -> List[Tuple[int, float, float]]:
+        """Открывает закрытое ребро с весом, который был у него до закрытия"""
+        weights = self._writable_weights()
+        changes = []
+        for k in self._edge_arcs(u, v, both):
+            if k in self._closed:
+                weight = self._closed.pop(k)
+                changes.append((k, weights[k], weight))
+                weights[k] = weight
+        self.version += 1
+        return changes
+
+    def to_dict(self) -> Dict[Tuple[float, float], List[Tuple[Tuple[float, float], float]]]:
+        """Граф в прежнем словарном формате build_graph"""
+        coords = list(zip(self.lon, self.lat))
+        return {coords[u]: [(coords[v], w) for v, w in self.neighbors(u)] for u in range(self.node_count)}
+
+    @classmethod
+    def from_dict(cls, graph: Dict[Tuple[float, float], List[Tuple[Tuple[float, float], float]]]) -> 'CSRGraph':
+        """Строит CSRGraph из словарного графа build_graph"""
+        ids = {}
+        for node in graph:
+            ids.setdefault(node, len(ids))
+            for neighbor, _ in graph[node]:
+                ids.setdefault(neighbor, len(ids))
+        arcs = {}
+        for node, adjacent in graph.items():
+            u = ids[node]
+            for neighbor, dist in adjacent:
+                key = (u, ids[neighbor])
+                if key not in arcs or dist < arcs[key][0]:
+                    arcs[key] = (dist, -1)
+        return _pack_csr(list(ids), arcs, [])
+
+
+def _pack_csr(coords, arcs, names) -> CSRGraph:
+    """Упаковывает словарь дуг {(u, v): (вес, индекс названия)} в массивы CSR"""
+    n = len(coords)
+    offsets = array('q', [0]) * (n + 1)
+    for u, _ in arcs:
+        offsets[u + 1] += 1
+    for i in range(n):
+        offsets[i + 1] += offsets[i]
+
+    targets = array('i', [0]) * len(arcs)
+    weights = array('d', [0.0]) * len(arcs)
+    edge_names = array('i', [-1]) * len(arcs)
+    fill = offsets[:-1]
+    for (u, v), (dist, name_id) in sorted(arcs.items()):
+        k = fill[u]
+        targets[k] = v
+        weights[k] = dist
+        edge_names[k] = name_id
+        fill[u] = k + 1
+
+    lon = array('d', (x for x, _ in coords))
+    lat = array('d', (y for _, y in coords))
+    return CSRGraph(lon, lat, offsets, targets, weights, edge_names, names)
+
+
+def build_csr_graph(edges: List[Tuple[Tuple[float, float], Tuple[float, float], str]]) -> CSRGraph:
+    """
+    Строит компактный CSR-граф из рёбер (как build_graph, но с индексами вершин).
+
+    Граф неориентированный: каждое ребро добавляется в обе стороны, из
+    параллельных рёбер между одной парой вершин остаётся самое короткое.
+    Названия улиц сохраняются в таблице names, рёбра ссылаются на неё индексом.
+    """
+    ids = {}
+    names = []
+    name_ids = {}
+    sources, targets, edge_names = array('i'), array('i'), array('i')
+    for start, end, street_name in edges:
+        sources.append(ids.setdefault(start, len(ids)))
+        targets.append(ids.setdefault(end, len(ids)))
+        name_id = -1
+        if street_name:
+            name_id = name_ids.get(street_name)
+            if name_id is None:
+                name_id = name_ids[street_name] = len(names)
+                names.append(street_name)
+        edge_names.append(name_id)
+
+    coords = list(ids)
+    lengths = edge_lengths(array('d', (x for x, _ in coords)), array('d', (y for _, y in coords)), sources, targets)
+    arcs = {}
+    for u, v, dist, name_id in zip(sources, targets, lengths, edge_names):
+        for key in ((u, v), (v, u)):
+            if key not in arcs or dist < arcs[key][0]:
+                arcs[key] = (dist, name_id)
+    return _pack_csr(coords, arcs, names)
+
+
+def _reconstruct(predecessors: List[int], node: int) -> List[int]:
+    path = []
+    while node != -1:
+        path.append(node)
+        node = predecessors[node]
+    path.reverse()
+    return path
+
+
+def dijkstra_csr(graph: CSRGraph, source: int, target: int,
+                 stats: Optional[dict] = None) -> Tuple[List[int], float]:
+    """
+    Алгоритм Дейкстры на CSR-графе.
+
+    Возвращает (список индексов вершин пути, длина пути); ([], inf), если пути нет.
+    Если передан словарь stats, в него записывается число окончательно
+    обработанных вершин (settled).
+    """
+    offsets, targets, weights = graph.offsets, graph.targets, graph.weights
+    inf = float('inf')
+    distances = [inf] * graph.node_count
+    predecessors = [-1] * graph.node_count
+    distances[source] = 0.0
+    queue = [(0.0, source)]
+    heappop, heappush = heapq.heappop, heapq.heappush
+    settled = 0
+
+    while queue:
+        current_distance, u = heappop(queue)
+        if current_distance > distances[u]:
+            continue
+        settled += 1
+        if u == target:
+            break
+        for k in range(offsets[u], offsets[u + 1]):
+            v = targets[k]
+            new_distance = current_distance + weights[k]
+            if new_distance < distances[v]:
+                distances[v] = new_distance
+                predecessors[v] = u
+                heappush(queue, (new_distance, v))
+
+    if stats is not None:
+        stats['settled'] = settled
+    if distances[target] == inf:
+        return [], inf
+    return _reconstruct(predecessors, target), distances[target]
+
+
+def dijkstra_tree(graph: CSRGraph, source: int, targets=None,
+                  stats: Optional[dict] = None) -> Tuple[List[float], List[int]]:
+    """
+    Дерево кратчайших путей от source: (distances, predecessors) по индексам вершин.
+
+    Без targets обходит всю компоненту связности; с targets (набор индексов)
+    останавливается, как только все цели обработаны. Недостижимые вершины
+    имеют расстояние inf и предка -1.
+    """
+    offsets, arc_targets, weights = graph.offsets, graph.targets, graph.weights
+    inf = float('inf')
+    distances = [inf] * graph.node_count
+    predecessors = [-1] * graph.node_count
+    distances[source] = 0.0
+    remaining = set(targets) if targets is not None else None
+    queue = [(0.0, source)]
+    heappop, heappush = heapq.heappop, heapq.heappush
+    settled = 0
+
+    while queue:
+        current_distance, u = heappop(queue)
+        if current_distance > distances[u]:
+            continue
+        settled += 1
+        if remaining is not None:
+            remaining.discard(u)
+            if not remaining:
+                break
+        for k in range(offsets[u], offsets[u + 1]):
+            v = arc_targets[k]
+            new_distance = current_distance + weights[k]
+            if new_distance < distances[v]:
+                distances[v] = new_distance
+                predecessors[v] = u
+                heappush(queue, (new_distance, v))
+
+    if stats is not None:
+        stats['settled'] = settled
+    return distances, predecessors
+
+
+def haversine_heuristic(graph: CSRGraph, target: int, scale: float = 1.0):
+    """
+    Допустимая эвристика для A*: расстояние по прямой (haversine) до target.
+
+    scale переводит километры в единицы весов графа (1.0 — веса в км,
+    1000.0 — в метрах). Значения кэшируются для уже посещённых вершин.
+    """
+    R = 6371 * scale
+    lon, lat = graph.lon, graph.lat
+    phi2 = math.radians(lat[target])
+    lon2 = lon[target]
+    cos_phi2 = math.cos(phi2)
+    cache = {}
+
+    def h(node: int) -> float:
+        value = cache.get(node)
+        if value is None:
+            phi1 = math.radians(lat[node])
+            a = (math.sin((phi2 - phi1) / 2) ** 2
+                 + math.cos(phi1) * cos_phi2 * math.sin(math.radians(lon2 - lon[node]) / 2) ** 2)
+            value = cache[node] = 2 * R * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+        return value
+    return h
+
+
+def astar_csr(graph: CSRGraph, source: int, target: int, heuristic=None,
+              stats: Optional[dict] = None, scale: float = 1.0) -> Tuple[List[int], float]:
+    """
+    A* на CSR-графе; по умолчанию с эвристикой haversine_heuristic(graph, target, scale).
+
+    scale — единицы весов графа относительно километров (1000.0 для весов в
+    метрах); при явно переданной heuristic не используется.
+    Контракт тот же, что у dijkstra_csr. Эвристика должна быть допустимой
+    (не переоценивать расстояние до цели); если она ещё и согласованная, каждая
+    вершина обрабатывается один раз, иначе вершина может быть обработана повторно
+    после улучшения её расстояния. Без heuristic на графе с heuristic_safe=False
+    выполняется обычная Дейкстра.
+    """
+    if heuristic is None and not graph.heuristic_safe:
+        return dijkstra_csr(graph, source, target, stats)
+    h = heuristic or haversine_heuristic(graph, target, scale)
+    offsets, targets, weights = graph.offsets, graph.targets, graph.weights
+    inf = float('inf')
+    distances = [inf] * graph.node_count
+    predecessors = [-1] * graph.node_count
+    distances[source] = 0.0
+    queue = [(h(source), 0.0, source)]
+    heappop, heappush = heapq.heappop, heapq.heappush
+    settled = 0
+
+    while queue:
+        _, du, u = heappop(queue)
+        if du > distances[u]:
+            continue
+        settled += 1
+        if u == target:
+            break
+        for k in range(offsets[u], offsets[u + 1]):
+            v = targets[k]
+            new_distance = du + weights[k]
+            if new_distance < distances[v]:
+                distances[v] = new_distance
+                predecessors[v] = u
+                heappush(queue, (new_distance + h(v), new_distance, v))
+
+    if stats is not None:
+        stats['settled'] = settled
+    if distances[target] == inf:
+        return [], inf
+    return _reconstruct(predecessors, target), distances[target]
+
+
+def bidirectional_csr(graph: CSRGraph, source: int, target: int, use_heuristic: bool = False,
+                      stats: Optional[dict] = None, scale: float = 1.0) -> Tuple[List[int], float]:
+    """
+    Двунаправленный поиск: Дейкстра (или A* при use_heuristic=True) одновременно от source и от target.
+
+    Обратный поиск идёт по обращённому графу. Для A* используются усреднённые
+    потенциалы p(v) = (h_t(v) - h_s(v)) / 2 для прямого поиска и -p(v) для
+    обратного — они согласованы для обоих направлений. Поиск останавливается,
+    когда сумма минимальных ключей двух очередей не меньше длины лучшего
+    найденного пути mu; при таком критерии найденный путь кратчайший.
+    scale — единицы весов графа относительно километров, как у astar_csr.
+    На графе с heuristic_safe=False потенциалы не используются.
+    """
+    if source == target:
+        if stats is not None:
+            stats['settled'] = 1
+        return [source], 0.0
+    if use_heuristic and graph.heuristic_safe:
+        h_t = haversine_heuristic(graph, target, scale)
+        h_s = haversine_heuristic(graph, source, scale)
+
+        def potential(node: int) -> float:
+            return (h_t(node) - h_s(node)) / 2
+    else:
+        potential = None
+
+    reverse = graph.reverse()
+    inf = float('inf')
+    n = graph.node_count
+    dist_f, dist_b = [inf] * n, [inf] * n
+    pred_f, pred_b = [-1] * n, [-1] * n
+    dist_f[source] = dist_b[target] = 0.0
+    queue_f = [(potential(source) if potential else 0.0, source)]
+    queue_b = [(-potential(target) if potential else 0.0, target)]
+    forward = (queue_f, graph.offsets, graph.targets, graph.weights, dist_f, pred_f, bytearray(n), dist_b, 1.0)
+    backward = (queue_b, reverse.offsets, reverse.targets, reverse.weights, dist_b, pred_b, bytearray(n), dist_f, -1.0)
+    heappop, heappush = heapq.heappop, heapq.heappush
+    mu, meeting, settled = inf, -1, 0
+
+    while queue_f and queue_b:
+        if queue_f[0][0] + queue_b[0][0] >= mu:
+            break
+        side = forward if queue_f[0][0] <= queue_b[0][0] else backward
+        queue, offsets, targets, weights, distances, predecessors, closed, other_distances, sign = side
+        _, u = heappop(queue)
+        if closed[u]:
+            continue
+        closed[u] = 1
+        settled += 1
+        du = distances[u]
+        for k in range(offsets[u], offsets[u + 1]):
+            v = targets[k]
+            new_distance = du + weights[k]
+            if new_distance < distances[v]:
+                distances[v] = new_distance
+                predecessors[v] = u
+                heappush(queue, (new_distance + sign * potential(v) if potential else new_distance, v))
+            if new_distance + other_distances[v] < mu:
+                mu = new_distance + other_distances[v]
+                meeting = v
+
+    if stats is not None:
+        stats['settled'] = settled
+    if meeting == -1:
+        return [], inf
+    path = _reconstruct(pred_f, meeting)
+    node = pred_b[meeting]
+    while node != -1:
+        path.append(node)
+        node = pred_b[node]
+    return path, mu
+
+
+SEARCH_METHODS = {
+    'dijkstra': dijkstra_csr,
+    'astar': astar_csr,
+    'bidirectional': bidirectional_csr,
+    'bidirectional_astar': lambda graph, source, target, stats=None, scale=1.0: bidirectional_csr(
+        graph, source, target, use_heuristic=True, stats=stats, scale=scale),
+}
+
+
+def shortest_path_csr(graph: CSRGraph,
+                      start: Tuple[float, float],
+                      end: Tuple[float, float],
+                      method: str = 'dijkstra',
+                      stats: Optional[dict] = None,
+                      scale: float = 1.0) -> Tuple[List[Tuple[float, float]], float, List[str]]:
+    """
+    Кратчайший путь в CSRGraph с тем же контрактом, что у dijkstra
+
+    method: 'dijkstra', 'astar', 'bidirectional' или 'bidirectional_astar'.
+    В stats (если передан) записывается число обработанных вершин settled.
+    scale передаётся эвристическим методам (см. astar_csr).
+    """
+    search = SEARCH_METHODS[method]
+    try:
+        source, target = graph.node_id(start), graph.node_id(end)
+    except KeyError:
+        return [], 0, []
+    options = {'stats': stats} if method == 'dijkstra' else {'stats': stats, 'scale': scale}
+    path, total_distance = search(graph, source, target, **options)
+    if not path:
+        return [], 0, []
+    return [graph.coord(node) for node in path], total_distance, path_street_names(graph, path)
+
+
+def street_segments(graph: CSRGraph, path: List[int]) -> List[Tuple[Optional[str], int, int]]:
+    """
+    Участки пути с одним названием: (название или None, первая, последняя позиция в path)
+
+    Название каждой дуги берётся из таблицы edge_names, соседние дуги с
+    одинаковым названием сливаются в один участок.
+    """
+    segments = []
+    for i in range(len(path) - 1):
+        k = graph.arc(path[i], path[i + 1])
+        name_id = graph.edge_names[k] if k >= 0 else -1
+        name = graph.names[name_id] if name_id >= 0 else None
+        if segments and segments[-1][0] == name:
+            segments[-1] = (name, segments[-1][1], i + 1)
+        else:
+            segments.append((name, i, i + 1))
+    return segments
+
+
+def path_street_names(graph: CSRGraph, path: List[int]) -> List[str]:
+    """Названия улиц вдоль пути без повторов подряд и без безымянных участков"""
+    names = []
+    for name, _, _ in street_segments(graph, path):
+        if name and (not names or names[-1] != name):
+            names.append(name)
+    return names
+
+
+ROUTE_CACHE_SIZE = 1024
+
+
+class RoutingService:
+    """
+    Долгоживущий маршрутизатор: граф загружается один раз, память поиска переиспользуется
+
+    Массивы distances/predecessors выделяются один раз на весь граф; вместо
+    их очистки перед каждым запросом увеличивается счётчик поколения, и запись
+    вершины считается действительной, только если её stamp равен текущему
+    поколению. Последние cache_size ответов хранятся в LRU-кэше по (start, end,
+    method); кэш сбрасывается, когда меняется graph.version.
+    """
+
+    def __init__(self, graph: CSRGraph, cache_size: int = ROUTE_CACHE_SIZE):
+        n = graph.node_count
+        self.graph = graph
+        self.cache_size = cache_size
+        self._distances = array('d', [0.0]) * n
+        self._predecessors = array('i', [-1]) * n
+        self._stamps = array('q', [0]) * n
+        self._generation = 0
+        self._cache: OrderedDict = OrderedDict()
+        self._cache_version = graph.version
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @classmethod
+    def from_graphml(cls, graphml_path: str, cache_path: Optional[str] = None,
+                     cache_size: int = ROUTE_CACHE_SIZE) -> 'RoutingService':
+        """Загружает граф через load_graph (с бинарным кэшем) и создаёт сервис"""
+        return cls(load_graph(graphml_path, cache_path), cache_size)
+
+    def search(self, source: int, target: int, method: str = 'dijkstra',
+               stats: Optional[dict] = None) -> Tuple[List[int], float]:
+        """
+        Дейкстра (или A* с haversine при method='astar') на общих массивах сервиса
+
+        Контракт как у dijkstra_csr: (список индексов вершин, длина) или ([], inf).
+        """
+        if method not in ('dijkstra', 'astar'):
+            raise ValueError(f"RoutingService поддерживает 'dijkstra' и 'astar', а не {method!r}")
+        h = haversine_heuristic(self.graph, target) if method == 'astar' and self.graph.heuristic_safe else None
+        offsets, targets, weights = self.graph.offsets, self.graph.targets, self.graph.weights
+        distances, predecessors, stamps = self._distances, self._predecessors, self._stamps
+        self._generation += 1
+        generation = self._generation
+        inf = float('inf')
+
+        distances[source] = 0.0
+        predecessors[source] = -1
+        stamps[source] = generation
+        queue = [(h(source) if h else 0.0, 0.0, source)]
+        heappop, heappush = heapq.heappop, heapq.heappush
+        settled = 0
+        found = False
+
+        while queue:
+            _, du, u = heappop(queue)
+            if du > distances[u]:
+                continue
+            settled += 1
+            if u == target:
+                found = True
+                break
+            for k in range(offsets[u], offsets[u + 1]):
+                v = targets[k]
+                new_distance = du + weights[k]
+                if stamps[v] != generation or new_distance < distances[v]:
+                    stamps[v] = generation
+                    distances[v] = new_distance
+                    predecessors[v] = u
+                    heappush(queue, (new_distance + h(v) if h else new_distance, new_distance, v))
+
+        if stats is not None:
+            stats['settled'] = settled
+        if not found:
+            return [], inf
+        path = [target]
+        while predecessors[path[-1]] != -1:
+            path.append(predecessors[path[-1]])
+        path.reverse()
+        return path, distances[target]
+
+    def route(self, start: Tuple[float, float], end: Tuple[float, float], method: str = 'dijkstra',
+              stats: Optional[dict] = None) -> Tuple[List[Tuple[float, float]], float, List[str]]:
+        """
+        Тот же контракт, что у dijkstra: (path, total_distance, street_names)
+
+        Повторный запрос той же пары отдаётся из кэша без поиска; stats['cached']
+        показывает, откуда взят ответ.
+        """
+        if self._cache_version != self.graph.version:
+            self.invalidate()
+        key = (start, end, method)
+        cached = self._cache.get(key)
+        if cached is not None:
+            self._cache.move_to_end(key)
+            self.hits += 1
+            if stats is not None:
+                stats['cached'] = True
+                stats['settled'] = 0
+            path, total_distance, street_names = cached
+            return list(path), total_distance, list(street_names)
+
+        self.misses += 1
+        if stats is not None:
+            stats['cached'] = False
+        try:
+            source, target = self.graph.node_id(start), self.graph.node_id(end)
+        except KeyError:
+            return [], 0, []
+        ids, total_distance = self.search(source, target, method, stats)
+        if ids:
+            result = ([self.graph.coord(node) for node in ids], total_distance, path_street_names(self.graph, ids))
+        else:
+            result = ([], 0, [])
+        if self.cache_size > 0:
+            self._cache[key] = (tuple(result[0]), result[1], tuple(result[2]))
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+                self.evictions += 1
+        return list(result[0]), result[1], list(result[2])
+
+    def invalidate(self) -> None:
+        """Сбрасывает кэш маршрутов (вызывается сам при смене graph.version)"""
+        self._cache.clear()
+        self._cache_version = self.graph.version
+
+    def metrics(self) -> dict:
+        """Счётчики кэша: попадания, промахи, доля попаданий, вытеснения и текущий размер"""
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0,
+            'evictions': self.evictions,
+            'size': len(self._cache),
+            'capacity': self.cache_size,
+            'graph_version': self.graph.version,
+        }
+
+
+GRAPHML_NS = '{http://graphml.graphdrawing.org/xmlns}'
+# Идентификаторы ключей по умолчанию — на случай файла без объявлений <key>
+DEFAULT_GRAPHML_KEYS = {('node', 'x'): 'd4', ('node', 'y'): 'd5', ('edge', 'name'): 'd20'}
+
+
+def iter_graphml(file_path: str) -> Iterator[tuple]:
+    """
+    Потоково читает GraphML (iterparse), не строя дерево документа целиком
+
+    Идентификаторы ключей берутся из объявлений <key attr.name="x|y|name">,
+    поэтому не зависят от версии osmnx. Разобранные элементы сразу удаляются
+    из дерева, так что память растёт только с размером результата. Длина
+    ребра из файла (ключ length) не читается: веса графа считаются haversine
+    по координатам, и эвристики A*/ALT опираются на то, что вес не короче
+    прямой.
+
+    Yields:
+        ('node', node_id, (x, y)) для каждой вершины с координатами и
+        ('edge', source_id, target_id, название_улицы) для каждого ребра
+        (название — None, если его нет в файле)
+    """
+    keys = dict(DEFAULT_GRAPHML_KEYS)
+    declared = set()
+    key_tag, node_tag, edge_tag, data_tag = (GRAPHML_NS + tag for tag in ('key', 'node', 'edge', 'data'))
+    parents = []
+
+    for event, elem in ET.iterparse(file_path, events=('start', 'end')):
+        if event == 'start':
+            parents.append(elem)
+            continue
+        parents.pop()
+        tag = elem.tag
+        if tag == key_tag:
+            target = (elem.get('for'), elem.get('attr.name'))
+            if target not in declared:
+                declared.add(target)
+                keys[target] = elem.get('id')
+        elif tag == node_tag:
+            values = {data.get('key'): data.text for data in elem.iter(data_tag)}
+            x, y = values.get(keys[('node', 'x')]), values.get(keys[('node', 'y')])
+            if x is not None and y is not None:
+                yield 'node', elem.get('id'), (float(x), float(y))
+            parents[-1].clear()
+        elif tag == edge_tag:
+            values = {data.get('key'): data.text for data in elem.iter(data_tag)}
+            yield 'edge', elem.get('source'), elem.get('target'), values.get(keys[('edge', 'name')]) or None
+            parents[-1].clear()
+
+
+def iter_graphml_edges(file_path: str) -> Iterator[Tuple[Tuple[float, float], Tuple[float, float], str]]:
+    """Потоково выдаёт рёбра ((x1, y1), (x2, y2), название_улицы) — можно сразу передать в build_csr_graph"""
+    nodes = {}
+    for item in iter_graphml(file_path):
+        if item[0] == 'node':
+            nodes[item[1]] = item[2]
+        elif item[1] in nodes and item[2] in nodes:
+            yield nodes[item[1]], nodes[item[2]], item[3]
+
+
 def read_graphml(file_path: str) -> Tuple[
     Dict[str, Tuple[float, float]], List[Tuple[Tuple[float, float], Tuple[float, float], str]]]:
     """
@@ -116,36 +956,290 @@ def read_graphml(file_path: str) -> Tuple[
         - nodes: словарь {node_id: (x, y)}
         - edges: список [((x1, y1), (x2, y2), название_улицы), ...]
     """
-    tree = ET.parse(file_path)
-    root = tree.getroot()
-    ns = {'g': 'http://graphml.graphdrawing.org/xmlns'}
-
     nodes = {}
-    for node in root.findall('.//g:node', ns):
-        node_id = node.get('id')
-        x, y = None, None
-        for data in node.findall('.//g:data', ns):
-            if data.get('key') == 'd4':  # x координата (обычно longitude)
-                x = float(data.text)
-            elif data.get('key') == 'd5':  # y координата (обычно latitude)
-                y = float(data.text)
-        if x is not None and y is not None:
-            nodes[node_id] = (x, y)
-
     edges = []
-    for edge in root.findall('.//g:edge', ns):
-        source = edge.get('source')
-        target = edge.get('target')
-        street_name = None
+    for item in iter_graphml(file_path):
+        if item[0] == 'node':
+            nodes[item[1]] = item[2]
+        elif item[1] in nodes and item[2] in nodes:
+            edges.append((nodes[item[1]], nodes[item[2]], item[3]))
+    return nodes, edges
 
-        for data in edge.findall('.//g:data', ns):
-            if data.get('key') == 'd20':  # название улицы
-                street_name = data.text if data.text else None
 
-        if source in nodes and target in nodes:
-            edges.append((nodes[source], nodes[target], street_name))
+GRAPH_CACHE_MAGIC = b'DZ5GRAPH'
+GRAPH_CACHE_VERSION = 1
+# magic, версия, порядок байт, число вершин, число дуг, размер таблицы названий,
+# sha256 исходного файла, его размер и время изменения
+GRAPH_CACHE_HEADER = struct.Struct('<8sII QQQ 32s Qd')
 
-    return nodes, edges
+
+def file_sha256(file_path: str) -> bytes:
+    """SHA-256 файла, читаемого блоками по 1 МБ"""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.digest()
+
+
+def graph_fingerprint(graph: CSRGraph) -> bytes:
+    """SHA-256 структуры и весов графа — чтобы привязать к нему предвычисленные данные"""
+    digest = hashlib.sha256()
+    for section in (graph.offsets, graph.targets, graph.weights):
+        digest.update(section)
+    return digest.digest()
+
+
+def write_array_sections(f, sections) -> None:
+    """Пишет массивы (array или memoryview) подряд, выравнивая каждый по 8 байт"""
+    for section in sections:
+        padding = -f.tell() % 8
+        if padding:
+            f.write(b'\0' * padding)
+        f.write(section)
+
+
+def map_array_sections(view: memoryview, position: int, layout) -> Tuple[list, int]:
+    """
+    Обратная операция к write_array_sections над отображённым файлом
+
+    layout — список пар (typecode, число элементов). Возвращает список
+    memoryview без копирования данных и позицию сразу за последним массивом.
+    """
+    sections = []
+    for typecode, count in layout:
+        position += -position % 8
+        size = struct.calcsize(typecode) * count
+        sections.append(view[position:position + size].cast(typecode))
+        position += size
+    return sections, position
+
+
+def compile_graph(graphml_path: str, cache_path: str) -> CSRGraph:
+    """
+    Разбирает GraphML и сохраняет CSR-граф в бинарный кэш для load_graph_cache
+
+    В файле после заголовка (версия формата, контрольная сумма исходника)
+    идут выровненные по 8 байт массивы lon, lat, offsets, targets, weights,
+    edge_names и таблица названий улиц (UTF-8, через нулевой байт).
+    """
+    graph = build_csr_graph(iter_graphml_edges(graphml_path))
+    names_blob = '\0'.join(graph.names).encode('utf-8')
+    stat = os.stat(graphml_path)
+    header = GRAPH_CACHE_HEADER.pack(GRAPH_CACHE_MAGIC, GRAPH_CACHE_VERSION, sys.byteorder == 'little',
+                                     graph.node_count, graph.edge_count, len(names_blob),
+                                     file_sha256(graphml_path), stat.st_size, stat.st_mtime)
+    tmp_path = cache_path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(header)
+        write_array_sections(f, (graph.lon, graph.lat, graph.offsets, graph.targets, graph.weights,
+                                 graph.edge_names))
+        f.write(names_blob)
+    os.replace(tmp_path, cache_path)
+    return graph
+
+
+def read_graph_cache_header(cache_path: str) -> dict:
+    """Заголовок кэша графа в виде словаря"""
+    with open(cache_path, 'rb') as f:
+        raw = f.read(GRAPH_CACHE_HEADER.size)
+    if len(raw) < GRAPH_CACHE_HEADER.size:
+        raise ValueError(f"{cache_path}: файл кэша повреждён")
+    fields = GRAPH_CACHE_HEADER.unpack(raw)
+    keys = ('magic', 'version', 'little_endian', 'node_count', 'edge_count', 'names_size',
+            'source_sha256', 'source_size', 'source_mtime')
+    return dict(zip(keys, fields))
+
+
+def load_graph_cache(cache_path: str) -> CSRGraph:
+    """
+    Открывает бинарный кэш через mmap без копирования
+
+    Массивы графа — это memoryview поверх отображённого файла, поэтому загрузка
+    занимает миллисекунды, а несколько процессов делят одни страницы в page cache.
+    """
+    header = read_graph_cache_header(cache_path)
+    if header['magic'] != GRAPH_CACHE_MAGIC or header['version'] != GRAPH_CACHE_VERSION:
+        raise ValueError(f"{cache_path}: неподдерживаемый формат кэша")
+    if header['little_endian'] != (sys.byteorder == 'little'):
+        raise ValueError(f"{cache_path}: кэш записан с другим порядком байт")
+
+    with open(cache_path, 'rb') as f:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    view = memoryview(mm)
+    n, m = header['node_count'], header['edge_count']
+    sections, position = map_array_sections(
+        view, GRAPH_CACHE_HEADER.size, (('d', n), ('d', n), ('q', n + 1), ('i', m), ('d', m), ('i', m)))
+    names_blob = bytes(view[position:position + header['names_size']])
+    names = names_blob.decode('utf-8').split('\0') if names_blob else []
+
+    graph = CSRGraph(*sections, names=names)
+    graph._mmap = mm
+    return graph
+
+
+def load_graph(graphml_path: str, cache_path: Optional[str] = None, verify: bool = False) -> CSRGraph:
+    """
+    Загружает граф из бинарного кэша, при необходимости пересобирая его из GraphML
+
+    Кэш считается актуальным, если совпадают версия формата, размер и время
+    изменения исходного файла; при verify=True дополнительно сверяется SHA-256.
+    """
+    if cache_path is None:
+        cache_path = os.path.splitext(graphml_path)[0] + '.graphcache'
+    if os.path.exists(cache_path):
+        try:
+            header = read_graph_cache_header(cache_path)
+        except ValueError:
+            header = None
+        stat = os.stat(graphml_path)
+        if (header is not None and header['magic'] == GRAPH_CACHE_MAGIC
+                and header['version'] == GRAPH_CACHE_VERSION
+                and header['little_endian'] == (sys.byteorder == 'little')
+                and header['source_size'] == stat.st_size and header['source_mtime'] == stat.st_mtime
+                and (not verify or header['source_sha256'] == file_sha256(graphml_path))):
+            return load_graph_cache(cache_path)
+    compile_graph(graphml_path, cache_path)
+    return load_graph_cache(cache_path)
+
+
+# Сербская кириллица (и остальные русские буквы) -> латиница после NFKD:
+# диакритика уже снята, поэтому «ž», «č», «ć» и «ж», «ч», «ћ» дают одно и то же.
+CYRILLIC_TO_LATIN = str.maketrans({
+    'а': 'a', 'б': 'b', 'в': 'v', 'г': 'g', 'д': 'd', 'ђ': 'dj', 'е': 'e', 'ж': 'z',
+    'з': 'z', 'и': 'i', 'ј': 'j', 'к': 'k', 'л': 'l', 'љ': 'lj', 'м': 'm', 'н': 'n',
+    'њ': 'nj', 'о': 'o', 'п': 'p', 'р': 'r', 'с': 's', 'т': 't', 'ћ': 'c', 'у': 'u',
+    'ф': 'f', 'х': 'h', 'ц': 'c', 'ч': 'c', 'џ': 'dz', 'ш': 's', 'щ': 'sc', 'ъ': '',
+    'ы': 'y', 'ь': '', 'э': 'e', 'ю': 'ju', 'я': 'ja', 'đ': 'dj',
+})
+
+# Сокращения в названиях (уже в латинице): «Бул. Ослобођења» == «Булевар ослобођења»
+STREET_ABBREVIATIONS = {'ul': 'ulica', 'bul': 'bulevar', 'blvd': 'bulevar'}
+
+
+@functools.lru_cache(maxsize=65536)
+def normalize_street_name(name: str) -> str:
+    """
+    Ключ для сравнения названий: без регистра, диакритики и знаков препинания,
+    кириллица переведена в латиницу
+
+    «Адмирала Вуковића», «admirala vukovica» и «Admirala Vukovića» дают
+    один ключ 'admirala vukovica'; сокращения из STREET_ABBREVIATIONS
+    раскрываются («Бул.» -> 'bulevar').
+    """
+    decomposed = unicodedata.normalize('NFKD', name.casefold())
+    stripped = ''.join(ch for ch in decomposed if not unicodedata.combining(ch))
+    latin = stripped.translate(CYRILLIC_TO_LATIN)
+    words = ''.join(ch if ch.isalnum() else ' ' for ch in latin).split()
+    return ' '.join(STREET_ABBREVIATIONS.get(word, word) for word in words)
+
+
+def bounded_levenshtein(a: str, b: str, limit: int) -> int:
+    """Расстояние Левенштейна, если оно не больше limit, иначе limit + 1"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i] + [0] * len(b)
+        for j, cb in enumerate(b, 1):
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb))
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return min(previous[-1], limit + 1)
+
+
+class StreetIndex:
+    """
+    Индекс названий улиц графа: нормализованный ключ -> названия, дуги и вершины
+
+    keys — отсортированный массив ключей (префиксный поиск через bisect),
+    keys_by_length — те же ключи по длине (кандидаты для поиска с опечатками);
+    дуги каждого названия лежат подряд в name_arcs[name_offsets[i]:name_offsets[i + 1]],
+    как рёбра вершины в CSRGraph.
+    """
+
+    def __init__(self, graph: CSRGraph):
+        self.graph = graph
+        name_count = len(graph.names)
+        self.name_offsets = array('q', [0]) * (name_count + 1)
+        for name_id in graph.edge_names:
+            if name_id >= 0:
+                self.name_offsets[name_id + 1] += 1
+        for i in range(name_count):
+            self.name_offsets[i + 1] += self.name_offsets[i]
+        self.name_arcs = array('i', [0]) * self.name_offsets[name_count]
+        self.arc_sources = array('i', [0]) * graph.edge_count
+        fill = self.name_offsets[:-1]
+        for u in range(graph.node_count):
+            for k in range(graph.offsets[u], graph.offsets[u + 1]):
+                self.arc_sources[k] = u
+                name_id = graph.edge_names[k]
+                if name_id >= 0:
+                    self.name_arcs[fill[name_id]] = k
+                    fill[name_id] += 1
+
+        self.by_key: Dict[str, List[int]] = {}
+        for name_id, name in enumerate(graph.names):
+            self.by_key.setdefault(normalize_street_name(name), []).append(name_id)
+        self.keys = sorted(self.by_key)
+        self.keys_by_length: Dict[int, List[str]] = {}
+        for key in self.keys:
+            self.keys_by_length.setdefault(len(key), []).append(key)
+
+    def name_ids(self, query: str) -> List[int]:
+        """Индексы названий в graph.names, совпадающих с запросом после нормализации"""
+        return self.by_key.get(normalize_street_name(query), [])
+
+    def arcs(self, query: str) -> List[int]:
+        """Позиции дуг (в graph.targets) улицы с таким названием"""
+        return [k for name_id in self.name_ids(query)
+                for k in self.name_arcs[self.name_offsets[name_id]:self.name_offsets[name_id + 1]]]
+
+    def nodes(self, query: str) -> List[int]:
+        """Индексы вершин, через которые проходит улица, по возрастанию"""
+        nodes = set()
+        for k in self.arcs(query):
+            nodes.add(self.arc_sources[k])
+            nodes.add(self.graph.targets[k])
+        return sorted(nodes)
+
+    def prefix(self, query: str, limit: int = 10) -> List[str]:
+        """Названия, нормализованный ключ которых начинается с нормализованного запроса"""
+        key = normalize_street_name(query)
+        result = []
+        for i in range(bisect_left(self.keys, key), len(self.keys)):
+            if not self.keys[i].startswith(key) or len(result) >= limit:
+                break
+            result.append(self.graph.names[self.by_key[self.keys[i]][0]])
+        return result
+
+    def fuzzy(self, query: str, max_distance: int = 2, limit: int = 10) -> List[Tuple[int, str]]:
+        """
+        Названия с опечатками: (расстояние Левенштейна между ключами, название), ближайшие первыми
+
+        Расстояние не меньше разницы длин, поэтому сравниваются только ключи
+        длиной len(key) ± max_distance, а не все названия города.
+        """
+        key = normalize_street_name(query)
+        matches = []
+        for length in range(len(key) - max_distance, len(key) + max_distance + 1):
+            for candidate in self.keys_by_length.get(length, ()):
+                distance = bounded_levenshtein(key, candidate, max_distance)
+                if distance <= max_distance:
+                    matches.append((distance, self.graph.names[self.by_key[candidate][0]]))
+        matches.sort()
+        return matches[:limit]
+
+    def find(self, query: str, max_distance: int = 2) -> Optional[str]:
+        """Лучшее название для запроса: точное совпадение, затем префикс, затем с опечатками"""
+        name_ids = self.name_ids(query)
+        if name_ids:
+            return self.graph.names[name_ids[0]]
+        for candidates in (self.prefix(query, 1), [name for _, name in self.fuzzy(query, max_distance, 1)]):
+            if candidates:
+                return candidates[0]
+        return None
 
 
 def find_street_index(edges: List[Tuple[Tuple[float, float], Tuple[float, float], str]],
@@ -153,6 +1247,10 @@ def find_street_index(edges: List[Tuple[Tuple[float, float], Tuple[float, float]
     """
     Возвращает индекс (номер) и название улицы по заданному имени
 
+    Названия сравниваются после normalize_street_name: запрос нормализуется
+    один раз, а ключи названий кэшируются. Для многократного поиска по
+    графу дешевле find_street_arc.
+
     Args:
         edges: список рёбер с названиями улиц
         street_name_query: название улицы для поиска
@@ -160,16 +1258,39 @@ def find_street_index(edges: List[Tuple[Tuple[float, float], Tuple[float, float]
     Returns:
         Кортеж (индекс, название_улицы), если найдено, иначе (-1, None)
     """
+    query = normalize_street_name(street_name_query)
     for i, (_, _, name) in enumerate(edges):
-        if name and name.lower() == street_name_query.lower():
+        if name and normalize_street_name(name) == query:
             return i, name
     return -1, None
 
 
-def visualize_path_with_network(nodes, edges, path, street_names=None, figsize=(20, 20)):
+def find_street_arc(graph: CSRGraph, street_name_query: str) -> Tuple[int, str]:
+    """
+    Возвращает позицию первой дуги улицы и её название
+
+    Тонкая обёртка над graph.street_index(): названия сравниваются после
+    normalize_street_name, индекс строится один раз на граф.
+
+    Args:
+        graph: граф с названиями улиц
+        street_name_query: название улицы для поиска
+
+    Returns:
+        Кортеж (позиция дуги в graph.targets, название_улицы), если найдено, иначе (-1, None)
+    """
+    arcs = graph.street_index().arcs(street_name_query)
+    if not arcs:
+        return -1, None
+    return arcs[0], graph.names[graph.edge_names[arcs[0]]]
+
+
+def visualize_path_with_network(nodes, edges, path, street_names=None, figsize=(20, 20), segments=None):
     """
     Визуализация всей дорожной сети + маршрута красным.
-    Если передан список street_names, то названия улиц выводятся вдоль маршрута.
+    Если передан список street_names (по названию на каждый отрезок пути), то
+    названия улиц выводятся вдоль маршрута; segments из street_segments
+    подписывает каждый участок один раз, посередине.
     """
     plt.figure(figsize=figsize)
     ax = plt.gca()
@@ -186,7 +1307,13 @@ def visualize_path_with_network(nodes, edges, path, street_names=None, figsize=(
         ax.add_collection(lc_path)
 
         # Отображаем названия улиц, если они заданы
-        if street_names:
+        if segments:
+            for name, first, last in segments:
+                if name:
+                    i = (first + last - 1) // 2
+                    mid_point = ((path[i][0] + path[i + 1][0]) / 2, (path[i][1] + path[i + 1][1]) / 2)
+                    plt.text(mid_point[0], mid_point[1], name, fontsize=8, color='blue', ha='center')
+        elif street_names and len(street_names) == len(path) - 1:
             for i in range(len(path) - 1):
                 mid_point = ((path[i][0] + path[i + 1][0]) / 2, (path[i][1] + path[i + 1][1]) / 2)
                 if i < len(street_names) and street_names[i]:
@@ -240,32 +1367,557 @@ def visualize_only_path(path, figsize=(10, 10)):
     plt.show()
 
 
+def write_synthetic_graphml(file_path: str, size: int = 10, seed: int = 0) -> None:
+    """
+    Пишет небольшой GraphML-город для тестов: сетка size × size улиц
+
+    Вершины слегка сдвинуты случайно, часть рёбер пропущена, посередине река
+    с двумя мостами, а в стороне — остров из двух вершин, недостижимый из
+    остального города. Улицы называются «Улица i» (по строкам) и «Булевар j»
+    (по столбцам); идентификаторы ключей не совпадают с DEFAULT_GRAPHML_KEYS.
+    """
+    rng = random.Random(seed)
+    lines = ['<?xml version="1.0" encoding="utf-8"?>',
+             '<graphml xmlns="http://graphml.graphdrawing.org/xmlns">',
+             '<key id="kx" for="node" attr.name="x" attr.type="string" />',
+             '<key id="ky" for="node" attr.name="y" attr.type="string" />',
+             '<key id="kn" for="edge" attr.name="name" attr.type="string" />',
+             '<graph edgedefault="directed">']
+
+    def node(node_id, x, y):
+        lines.append(f'<node id="{node_id}"><data key="kx">{x!r}</data><data key="ky">{y!r}</data></node>')
+
+    def edge(a, b, name):
+        data = f'<data key="kn">{name}</data>' if name else ''
+        for u, v in ((a, b), (b, a)):
+            lines.append(f'<edge source="{u}" target="{v}">{data}</edge>')
+
+    for i in range(size):
+        for j in range(size):
+            node(f'n{i}_{j}', 20.40 + j * 0.002 + rng.uniform(-4e-4, 4e-4),
+                 44.78 + i * 0.0015 + rng.uniform(-3e-4, 3e-4))
+    bridges = (1, size - 2)
+    for i in range(size):
+        for j in range(size):
+            if j + 1 < size and rng.random() > 0.05:
+                edge(f'n{i}_{j}', f'n{i}_{j + 1}', f'Улица {i}')
+            if i + 1 < size and (i != size // 2 or j in bridges) and rng.random() > 0.05:
+                edge(f'n{i}_{j}', f'n{i + 1}_{j}', f'Булевар {j}' if rng.random() > 0.1 else None)
+    node('island_a', 20.30, 44.70)
+    node('island_b', 20.301, 44.701)
+    edge('island_a', 'island_b', 'Острвска')
+    lines.append('</graph></graphml>')
+    with open(file_path, 'w', encoding='utf-8') as f:
+        f.write('\n'.join(lines))
+
+
+class TestRouting(unittest.TestCase):
+    """
+    Маршруты на синтетическом GraphML сверяются с dijkstra_csr.
+    Запуск из папки dz5: python -m unittest main
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.mkdtemp()
+        cls.graphml = os.path.join(cls.tmp, 'city.graphml')
+        cls.cache = os.path.join(cls.tmp, 'city.graphcache')
+        write_synthetic_graphml(cls.graphml)
+        cls.graph = load_graph(cls.graphml, cls.cache)
+        rng = random.Random(1)
+        n = cls.graph.node_count
+        cls.pairs = [(rng.randrange(n), rng.randrange(n)) for _ in range(60)] + [(0, 0), (0, n - 1)]
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.graph = None
+        shutil.rmtree(cls.tmp, ignore_errors=True)  # Windows не даёт удалить файл, открытый через mmap
+
+    def assertPath(self, graph, path, distance, expected):
+        """Путь совпадает по длине с эталоном и действительно проходит по дугам графа"""
+        if expected == float('inf'):
+            self.assertEqual((path, distance), ([], float('inf')))
+            return
+        self.assertAlmostEqual(distance, expected, places=9)
+        offsets, targets, weights = graph.offsets, graph.targets, graph.weights
+        length = sum(min(weights[k] for k in range(offsets[u], offsets[u + 1]) if targets[k] == v)
+                     for u, v in zip(path, path[1:]))
+        self.assertAlmostEqual(length, expected, places=9)
+
+    def test_dijkstra_csr(self):
+        graph = self.graph
+        as_dict = graph.to_dict()
+        for source, target in self.pairs:
+            path, expected = dijkstra_csr(graph, source, target)
+            self.assertPath(graph, path, expected, expected)
+            if expected == float('inf'):
+                continue
+            start, end = graph.coord(source), graph.coord(target)
+            for route in (dijkstra(as_dict, start, end), dijkstra(graph, start, end)):
+                self.assertAlmostEqual(route[1], expected, places=9)
+                self.assertEqual(route[0], [graph.coord(node) for node in path])
+        self.assertEqual(dijkstra_csr(graph, 0, graph.node_count - 1), ([], float('inf')))
+
+    def test_graphml_key_ids(self):
+        names = set(self.graph.names)
+        self.assertIn('Улица 0', names)
+        self.assertIn('Острвска', names)
+        self.assertEqual(self.graph.node_count, 102)
+        edge = next(item for item in iter_graphml(self.graphml) if item[0] == 'edge')
+        self.assertEqual(edge, ('edge', 'n0_0', 'n0_1', 'Улица 0'))
+
+    def test_haversine_kernels(self):
+        global np
+        rng = random.Random(4)
+        starts = [(rng.uniform(-180, 180), rng.uniform(-90, 90)) for _ in range(300)]
+        starts[200] = (-175.0, -61.25)  # без ограничения a <= 1 здесь был math domain error
+        ends = [(rng.uniform(-180, 180), rng.uniform(-90, 90)) for _ in range(200)]
+        ends += [(lon - 180 if lon > 0 else lon + 180, -lat) for lon, lat in starts[200:250]]  # антиподы
+        ends += starts[250:]  # нулевая длина
+        expected = [haversine(a, b) for a, b in zip(starts, ends)]
+        self.assertTrue(all(abs(d - math.pi * 6371) < 1e-3 for d in expected[200:250]))
+        self.assertEqual(expected[250:], [0.0] * 50)
+        lon = [p[0] for p in starts + ends]
+        lat = [p[1] for p in starts + ends]
+        sources, targets = range(len(starts)), range(len(starts), len(starts) + len(ends))
+        saved = np
+        try:
+            for np in ((saved, None) if saved is not None else (None,)):
+                kernels = {
+                    'arrays': haversine_arrays([p[0] for p in starts], [p[1] for p in starts],
+                                               [p[0] for p in ends], [p[1] for p in ends]),
+                    'edges': edge_lengths(lon, lat, sources, targets),
+                    'edges_f': edge_lengths(lon, lat, sources, targets, 'f'),
+                }
+                for kernel, distances in kernels.items():
+                    self.assertEqual(len(distances), len(expected))
+                    tolerance = 1e-3 if kernel == 'edges_f' else 1e-9
+                    for d, e in zip(distances, expected):
+                        self.assertLessEqual(abs(d - e), tolerance * max(e, 1.0), (kernel, np))
+                for point in ends[::40]:
+                    distances = haversine_many(starts, point)
+                    for d, start in zip(distances, starts):
+                        self.assertAlmostEqual(d, haversine(start, point), places=6)
+        finally:
+            np = saved
+
+    def test_street_names(self):
+        for name in ('Адмирала Вуковића', 'admirala vukovica', 'ADMIRALA  Vukovića!'):
+            self.assertEqual(normalize_street_name(name), 'admirala vukovica')
+        self.assertEqual(normalize_street_name('Ђуре Јакшића'), normalize_street_name('Djure Jakšića'))
+        self.assertEqual(normalize_street_name('Бул. Ослобођења'), normalize_street_name('Булевар ослобођења'))
+        self.assertEqual(normalize_street_name('ул. Кумодрашка'), 'ulica kumodraska')
+
+        streets = self.graph.street_index()
+        self.assertEqual(streets.prefix('бул', limit=3), ['Булевар 0', 'Булевар 1', 'Булевар 2'])
+        self.assertEqual(streets.prefix('ulica 7'), ['Улица 7'])
+        self.assertEqual(streets.prefix('трг'), [])
+        self.assertEqual(streets.fuzzy('Ostrvskaa'), [(1, 'Острвска')])
+        self.assertEqual(streets.fuzzy('Улиза 3', max_distance=1), [(1, 'Улица 3')])
+        self.assertEqual(streets.fuzzy('Острвска', max_distance=0), [(0, 'Острвска')])
+        self.assertEqual(streets.fuzzy('Кумодрашка'), [])
+        self.assertEqual(streets.find('острвска'), 'Острвска')
+        self.assertEqual(streets.find('Bulevar 4'), 'Булевар 4')
+        self.assertEqual(streets.find('Ostrvsk'), 'Острвска')
+        self.assertIsNone(streets.find('Кумодрашка'))
+
+        arc, name = find_street_arc(self.graph, 'ostrvska')
+        self.assertEqual(name, 'Острвска')
+        self.assertIn(self.graph.targets[arc], streets.nodes(name))
+        self.assertEqual(find_street_arc(self.graph, 'Кумодрашка'), (-1, None))
+        edges = list(self.graph.edges())
+        i, name = find_street_index(edges, 'ОСТРВСКА')
+        self.assertEqual((edges[i][2], name), ('Острвска', 'Острвска'))
+        self.assertEqual(find_street_index(edges, 'Кумодрашка'), (-1, None))
+
+    def test_graph_cache_round_trip(self):
+        built = build_csr_graph(iter_graphml_edges(self.graphml))
+        cached = load_graph_cache(self.cache)
+        self.assertIsInstance(cached.weights, memoryview)
+        for name in ('lon', 'lat', 'offsets', 'targets', 'weights', 'edge_names'):
+            self.assertEqual(list(getattr(cached, name)), list(getattr(built, name)), name)
+        self.assertEqual(cached.names, built.names)
+        self.assertEqual(read_graph_cache_header(self.cache)['source_sha256'], file_sha256(self.graphml))
+        self.assertEqual(list(load_graph(self.graphml, self.cache, verify=True).weights), list(built.weights))
+
+    def test_search_methods(self):
+        graph = self.graph
+        for source, target in self.pairs:
+            _, expected = dijkstra_csr(graph, source, target)
+            for method, search in SEARCH_METHODS.items():
+                with self.subTest(method=method, source=source, target=target):
+                    self.assertPath(graph, *search(graph, source, target), expected)
+        as_dict = graph.to_dict()
+        start, end = graph.coord(self.pairs[0][0]), graph.coord(self.pairs[0][1])
+        expected = dijkstra_csr(graph, *self.pairs[0])[1]
+        for method in SEARCH_METHODS:
+            self.assertAlmostEqual(dijkstra(as_dict, start, end, method)[1], expected, places=9)
+
+    def test_heuristic_scale(self):
+        # Веса в метрах: эвристика должна считать в тех же единицах, иначе она сильно недооценивает
+        graph = build_csr_graph(iter_graphml_edges(self.graphml))
+        for k in range(graph.edge_count):
+            graph.weights[k] *= 1000
+        start, end = graph.coord(self.pairs[0][0]), graph.coord(self.pairs[0][1])
+        expected = dijkstra_csr(graph, *self.pairs[0])[1]
+        for method in SEARCH_METHODS:
+            stats = {}
+            self.assertAlmostEqual(shortest_path_csr(graph, start, end, method, stats, scale=1000.0)[1], expected,
+                                   places=6)
+            self.assertGreater(stats['settled'], 0)
+        for source, target in self.pairs:
+            _, expected = dijkstra_csr(graph, source, target)
+            for use_heuristic in (False, True):
+                distance = bidirectional_csr(graph, source, target, use_heuristic, scale=1000.0)[1]
+                self.assertAlmostEqual(distance, expected, places=6)
+
+    def test_contraction_hierarchy(self):
+        from ch import build_contraction_hierarchy, load_contraction_hierarchy
+        hierarchy = build_contraction_hierarchy(self.graph)
+        path = os.path.join(self.tmp, 'city.ch')
+        hierarchy.save(path)
+        loaded = load_contraction_hierarchy(path, self.graph)
+        for source, target in self.pairs:
+            _, expected = dijkstra_csr(self.graph, source, target)
+            for index in (hierarchy, loaded):
+                self.assertPath(self.graph, *index.query(source, target), expected)
+
+    def test_landmarks(self):
+        from alt import build_landmarks, load_landmarks
+        landmarks = build_landmarks(self.graph, k=4)
+        path = os.path.join(self.tmp, 'city.alt')
+        landmarks.save(path)
+        loaded = load_landmarks(path, self.graph)
+        for source, target in self.pairs:
+            _, expected = dijkstra_csr(self.graph, source, target)
+            for index in (landmarks, loaded):
+                self.assertPath(self.graph, *index.query(source, target), expected)
+
+    def test_distance_matrix(self):
+        from matrix import distance_matrix
+        origins = [source for source, _ in self.pairs[:8]]
+        destinations = [target for _, target in self.pairs[:12]]
+        for workers in (1, 2):
+            matrix = distance_matrix(self.graph, origins, destinations, workers=workers, cache_path=self.cache)
+            for i, origin in enumerate(origins):
+                for j, destination in enumerate(destinations):
+                    self.assertEqual(matrix[i][j], dijkstra_csr(self.graph, origin, destination)[1])
+
+    def test_spatial_index(self):
+        from spatial import SpatialIndex
+        graph = self.graph
+        index = SpatialIndex(graph)
+        xs, ys = index.x, index.y
+        segments = [(u, graph.targets[k]) for u in range(graph.node_count)
+                    for k in range(graph.offsets[u], graph.offsets[u + 1]) if u < graph.targets[k]]
+
+        def segment_distance(x, y, u, v):
+            dx, dy = xs[v] - xs[u], ys[v] - ys[u]
+            length2 = dx * dx + dy * dy
+            t = min(max(((x - xs[u]) * dx + (y - ys[u]) * dy) / length2, 0.0), 1.0) if length2 > 0 else 0.0
+            return math.hypot(xs[u] + t * dx - x, ys[u] + t * dy - y)
+
+        rng = random.Random(2)
+        lons, lats = list(graph.lon), list(graph.lat)
+        for _ in range(500):
+            lon = rng.uniform(min(lons) - 0.02, max(lons) + 0.02)
+            lat = rng.uniform(min(lats) - 0.02, max(lats) + 0.02)
+            x, y = lon * index.kx, lat * index.ky
+            brute = sorted(math.hypot(xs[v] - x, ys[v] - y) for v in range(graph.node_count))
+            k = rng.randint(1, 8)
+            found = index.k_nearest(lon, lat, k)
+            self.assertEqual([round(d, 9) for _, d in found], [round(d, 9) for d in brute[:k]])
+            for v, d in found:
+                self.assertAlmostEqual(math.hypot(xs[v] - x, ys[v] - y), d, places=12)
+            radius = rng.uniform(0.0, 0.5)
+            found = index.within(lon, lat, radius)
+            self.assertEqual([round(d, 9) for _, d in found], [round(d, 9) for d in brute if d <= radius])
+            snap = index.snap_to_edge(lon, lat)
+            self.assertAlmostEqual(snap.distance, min(segment_distance(x, y, u, v) for u, v in segments), places=9)
+            self.assertAlmostEqual(segment_distance(x, y, snap.u, snap.v), snap.distance, places=9)
+
+        lon, lat = graph.coord(0)
+        self.assertEqual(index.k_nearest(lon, lat, 0), [])
+        self.assertEqual(index.k_nearest(lon, lat, -1), [])
+        self.assertEqual(len(index.within(lon, lat, float('inf'))), graph.node_count)
+        self.assertEqual(index.within(lon, lat, -1.0), [])
+        self.assertEqual(index.nearest_node(179.9, -89.9)[0], index.k_nearest(179.9, -89.9, 1)[0][0])
+        for bad in ((float('inf'), 0.0), (0.0, float('nan')), (-181.0, 0.0), (0.0, 91.0)):
+            with self.assertRaises(ValueError):
+                index.nearest_node(*bad)
+            with self.assertRaises(ValueError):
+                index.snap_to_edge(*bad)
+        with self.assertRaises(ValueError):
+            index.within(lon, lat, float('nan'))
+        self.assertEqual(list(index.nearest_nodes([(lon, lat)])), [0])
+
+    def test_render(self):
+        try:
+            import render
+        except ImportError:
+            self.skipTest("render требует NumPy")
+        graph = build_csr_graph(iter_graphml_edges(self.graphml))
+        paths = [[graph.coord(v) for v in dijkstra_csr(graph, s, t)[0]] for s, t in self.pairs[:4]]
+        paths = [path for path in paths if len(path) > 1][:3]
+        output = os.path.join(self.tmp, 'route.png')
+        window, zoom = render._route_window(graph, paths[0], render.OUTPUT_SIZE)
+        self.assertEqual(render.render_route(graph, paths[0], output), output)
+        with open(output, 'rb') as f:
+            self.assertEqual(f.read(8), b'\x89PNG\r\n\x1a\n')
+        layer = render._base_layers[graph][(graph.version, zoom)]
+        render.render_route(graph, paths[0], output)
+        self.assertIs(render.base_layer(graph, zoom), layer)
+
+        u = graph.node_id(paths[0][0])
+        graph.update_edge(u, graph.targets[graph.offsets[u]], 1.0)
+        render.render_route(graph, paths[0], output)
+        self.assertEqual(list(render._base_layers[graph]), [(graph.version, zoom)])
+        self.assertIsNot(render.base_layer(graph, zoom), layer)
+        with self.assertRaises(ValueError):
+            render.render_route(graph, [], output)
+
+        jobs = [(os.path.join(self.tmp, f'route{i}.png'), path, None) for i, path in enumerate(paths)]
+        render._base_layers.pop(graph, None)
+        self.assertEqual(render.render_routes(graph, jobs, workers=2), [job[0] for job in jobs])
+        zooms = {render._route_window(graph, path, render.OUTPUT_SIZE)[1] for _, path, _ in jobs}
+        self.assertEqual(set(render._base_layers[graph]), {(graph.version, z) for z in zooms})
+        for output_path, _, _ in jobs:
+            self.assertGreater(os.path.getsize(output_path), 0)
+
+        # Путь spawn: рабочий процесс открывает кэш и растрирует те же уровни
+        try:
+            render._init_worker(self.cache, sorted(zooms))
+            self.assertEqual({z for _, z in render._base_layers[render._worker_graph]}, zooms)
+        finally:
+            render._worker_graph = None
+
+    def test_routing_service(self):
+        graph = self.graph
+        service = RoutingService(graph)
+        for source, target in self.pairs:
+            _, expected = dijkstra_csr(graph, source, target)
+            for method in ('dijkstra', 'astar'):
+                self.assertPath(graph, *service.search(source, target, method), expected)
+        start, end = graph.coord(self.pairs[0][0]), graph.coord(self.pairs[0][1])
+        expected = dijkstra_csr(graph, *self.pairs[0])[1]
+        stats = {}
+        self.assertAlmostEqual(service.route(start, end, 'astar')[1], expected, places=9)
+        self.assertAlmostEqual(service.route(start, end, 'astar', stats)[1], expected, places=9)
+        self.assertTrue(stats['cached'])
+
+    def test_dynamic_repair(self):
+        from dynamic import DynamicShortestPaths
+        graph = build_csr_graph(iter_graphml_edges(self.graphml))
+        paths = DynamicShortestPaths(graph)
+        origins = [0, graph.node_count // 2, graph.node_count - 3]
+        for origin in origins:
+            paths.register(origin)
+        route, _ = dijkstra_csr(graph, origins[0], origins[2])
+        u, v = route[len(route) // 2], route[len(route) // 2 + 1]
+        length = graph.weights[graph.arc(u, v)]
+        for update in (lambda: paths.close_edge(u, v), lambda: paths.reopen_edge(u, v),
+                       lambda: paths.update_edge(u, v, length * 5), lambda: paths.update_edge(u, v, length)):
+            update()
+            for origin in origins:
+                expected, _ = dijkstra_tree(graph, origin)
+                self.assertEqual(list(paths.trees[origin][0]), expected)
+
+    def test_heuristic_fallback_after_update(self):
+        graph = build_csr_graph(iter_graphml_edges(self.graphml))
+        route, _ = dijkstra_csr(graph, 0, graph.node_count - 3)
+        u, v = route[len(route) // 2], route[len(route) // 2 + 1]
+        self.assertTrue(graph.heuristic_safe)
+        graph.update_edge(u, v, graph.weights[graph.arc(u, v)] / 100)
+        self.assertFalse(graph.heuristic_safe)
+        for source, target in self.pairs:
+            _, expected = dijkstra_csr(graph, source, target)
+            self.assertPath(graph, *astar_csr(graph, source, target), expected)
+            self.assertPath(graph, *bidirectional_csr(graph, source, target, use_heuristic=True), expected)
+
+
+class TestRoutingServer(unittest.TestCase):
+    """
+    server.RoutingServer на 127.0.0.1 и свободном порту поверх синтетического графа
+    Запуск из папки dz5: python -m unittest main
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        from server import RoutingServer
+        cls.tmp = tempfile.mkdtemp()
+        graphml = os.path.join(cls.tmp, 'city.graphml')
+        write_synthetic_graphml(graphml)
+        cls.graph = load_graph(graphml, os.path.join(cls.tmp, 'city.graphcache'))
+        cls.server = RoutingServer(cls.graph, workers=2, batch_window=0.05)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.pool.shutdown(wait=True)
+        cls.graph = cls.server = None
+        shutil.rmtree(cls.tmp, ignore_errors=True)
+
+    def serve(self, scenario):
+        """Запускает сервер и выполняет scenario(port) в том же цикле событий"""
+        async def run():
+            listener = await self.server.start('127.0.0.1', 0)
+            try:
+                return await scenario(listener.sockets[0].getsockname()[1])
+            finally:
+                listener.close()
+                await listener.wait_closed()
+        return asyncio.run(run())
+
+    @staticmethod
+    async def send(port: int, raw: bytes) -> Tuple[int, dict]:
+        """Отправляет сырой HTTP-запрос и возвращает (статус, JSON-ответ)"""
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        try:
+            writer.write(raw)
+            await writer.drain()
+            status = int((await reader.readline()).split()[1])
+            length = 0
+            while True:
+                line = await reader.readline()
+                if line in (b'\r\n', b''):
+                    break
+                name, _, value = line.decode('latin-1').partition(':')
+                if name.lower() == 'content-length':
+                    length = int(value)
+            return status, json.loads(await reader.readexactly(length))
+        finally:
+            writer.close()
+
+    @classmethod
+    async def get(cls, port: int, target: str) -> Tuple[int, dict]:
+        return await cls.send(port, f'GET {target} HTTP/1.1\r\nConnection: close\r\n\r\n'.encode())
+
+    @classmethod
+    async def post(cls, port: int, target: str, payload) -> Tuple[int, dict]:
+        body = json.dumps(payload).encode()
+        head = f'POST {target} HTTP/1.1\r\nContent-Length: {len(body)}\r\nConnection: close\r\n\r\n'
+        return await cls.send(port, head.encode() + body)
+
+    def point(self, node: int) -> str:
+        return '%r,%r' % self.graph.coord(node)
+
+    def test_route_batching(self):
+        graph = self.graph
+        n = graph.node_count
+        targets = [5, n // 2, n - 3, n - 1]
+
+        async def scenario(port):
+            _, before = await self.get(port, '/metrics')
+            responses = await asyncio.gather(*(self.get(port, f'/route?from={self.point(0)}&to={self.point(t)}')
+                                               for t in targets))
+            _, after = await self.get(port, '/metrics')
+            return before, responses, after
+
+        before, responses, after = self.serve(scenario)
+        for target, (status, response) in zip(targets, responses):
+            self.assertEqual(status, 200)
+            self.assertEqual((response['from_node'], response['to_node']), (0, target))
+            path, expected = dijkstra_csr(graph, 0, target)
+            if expected == float('inf'):
+                self.assertFalse(response['found'])
+                continue
+            self.assertTrue(response['found'])
+            self.assertAlmostEqual(response['distance_km'], expected, places=9)
+            self.assertEqual([tuple(p) for p in response['path']], [graph.coord(v) for v in path])
+        batches = after['batches'] - before['batches']
+        self.assertEqual(after['batched_requests'] - before['batched_requests'], len(targets))
+        self.assertGreater(len(targets) / batches, 1)
+        self.assertGreater(after['requests_per_batch'], 1)
+        self.assertGreaterEqual(after['latency']['/route']['count'], len(targets))
+        self.assertEqual(after['queue_depth'], 0)
+        self.assertEqual(after['graph']['nodes'], graph.node_count)
+
+    def test_snap_and_matrix(self):
+        graph = self.graph
+        n = graph.node_count
+        origins, destinations = [0, 17, n - 2], [3, 40, n - 1]
+
+        async def scenario(port):
+            lon, lat = graph.coord(17)
+            return await asyncio.gather(
+                self.get(port, f'/snap?lon={lon!r}&lat={lat!r}'),
+                self.get(port, f'/snap?point={self.point(17)}'),
+                self.post(port, '/matrix', {'origins': [graph.coord(v) for v in origins],
+                                            'destinations': [graph.coord(v) for v in destinations]}))
+
+        (status, snap), (_, snap_point), (matrix_status, matrix) = self.serve(scenario)
+        self.assertEqual(status, 200)
+        self.assertEqual(snap, snap_point)
+        self.assertEqual((snap['node'], snap['node_distance_km']), (17, 0.0))
+        self.assertAlmostEqual(snap['edge']['distance_km'], 0.0, places=9)
+        self.assertIn(17, (snap['edge']['u'], snap['edge']['v']))
+        self.assertEqual(matrix_status, 200)
+        self.assertEqual((matrix['origins'], matrix['destinations']), (origins, destinations))
+        for origin, row in zip(origins, matrix['distances_km']):
+            for destination, distance in zip(destinations, row):
+                expected = dijkstra_csr(graph, origin, destination)[1]
+                if expected == float('inf'):
+                    self.assertIsNone(distance)
+                else:
+                    self.assertAlmostEqual(distance, expected, places=9)
+
+    def test_bad_requests(self):
+        point = self.point(0)
+
+        async def scenario(port):
+            requests = [
+                b'GET /route HTTP/1.1\r\nContent-Length: abc\r\n\r\n',
+                b'POST /matrix HTTP/1.1\r\nContent-Length: -5\r\n\r\n',
+                b'GET /metrics HTTP/1.1\r\nX-Long: ' + b'a' * 70000 + b'\r\n\r\n',
+                b'GET /metrics HTTP/1.1\r\n' + b'X-Header: 1\r\n' * 150 + b'\r\n',
+                b'GET /metrics?' + b'a' * 70000 + b' HTTP/1.1\r\n\r\n',
+            ]
+            raw = [await self.send(port, request) for request in requests]
+            queries = [await self.get(port, target) for target in (
+                '/snap?lon=nan&lat=44.8', '/snap?lon=inf&lat=44.8', '/snap?lon=20.4&lat=95',
+                f'/route?from=nan,nan&to={point}', f'/route?from={point}', '/nowhere')]
+            queries.append(await self.post(port, '/matrix', {'origins': [[float('inf'), 0]], 'destinations': []}))
+            return raw, queries
+
+        raw, queries = self.serve(scenario)
+        self.assertEqual([status for status, _ in raw], [400, 400, 431, 431, 414])
+        self.assertEqual([status for status, _ in queries], [400, 400, 400, 400, 400, 404, 400])
+        for _, response in raw + queries:
+            self.assertIn('error', response)
+
+
 # Пример использования для графа из запроса
 if __name__ == "__main__":
-    # 1. Загрузка данных
-    nodes, edges = read_graphml("belgrad_serbia.graphml")
+    # 1. Загрузка данных (из бинарного кэша, если он актуален) — один раз на все запросы
+    service = RoutingService.from_graphml("belgrad_serbia.graphml")
+    graph = service.graph
+    streets = graph.street_index()
+    edges = list(graph.edges())
+    nodes = {i: graph.coord(i) for i in range(graph.node_count)}
 
     # 2. Задаём названия улиц для начала и конца маршрута
     start_street_query = ["Сутјеска улица 1.", "Кумодрашка", "Адмирала Вуковића"]  # Название улицы для старта (пример)
     end_street_query = ["Саве Ковачевића улица 1.", "Адмирала Вуковића", "Матошева"]  # Название улицы для финиша (пример)
 
     for i in range(len(start_street_query)):
-    # 3. Используем find_street_index для определения нужных рёбер
-        start_index, start_street = find_street_index(edges, start_street_query[i])
-        end_index, end_street = find_street_index(edges, end_street_query[i])
+    # 3. Находим улицы по индексу названий (точно, по префиксу или с опечатками)
+        start_street = streets.find(start_street_query[i])
+        end_street = streets.find(end_street_query[i])
 
-        if start_index == -1 or end_index == -1:
+        if start_street is None or end_street is None:
             print("Не удалось найти заданную улицу для начала или конца маршрута")
         else:
             # 4. Определяем стартовый и конечный узлы:
-            # Используем первую точку ребра для старта и вторую точку ребра для финиша.
-            start_node = edges[start_index][0]
-            end_node = edges[end_index][1]
+            # первая вершина улицы старта и последняя вершина улицы финиша.
+            start_nodes, end_nodes = streets.nodes(start_street), streets.nodes(end_street)
+            if not start_nodes or not end_nodes:
+                print("У найденной улицы нет рёбер в графе")
+                continue
+            start_node = graph.coord(start_nodes[0])
+            end_node = graph.coord(end_nodes[-1])
 
-            # 5. Строим граф и ищем кратчайший путь
-            graph = build_graph(edges)
+            # 5. Ищем кратчайший путь
             time_start = time.perf_counter()
-            path, distance, street_names = dijkstra(graph, start_node, end_node)
+            path, distance, street_names = service.route(start_node, end_node)
             time_end = time.perf_counter()
             
             print(f"Время работы алгоритма: {round((time_end - time_start) * 1000, 2)} мс")
@@ -276,4 +1928,7 @@ if __name__ == "__main__":
                 print("Улицы на пути:", ", ".join(filter(None, street_names)))
 
                 # 6. Визуализация маршрута
-                visualize_path_with_network(nodes, edges, path, street_names)
+                segments = street_segments(graph, [graph.node_id(point) for point in path])
+                visualize_path_with_network(nodes, edges, path, segments=segments)
+
+    print("Кэш маршрутов:", service.metrics())
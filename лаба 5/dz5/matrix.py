@@ -0,0 +1,137 @@
+"""
+Матрицы расстояний N×M для графа из main.build_csr_graph.
+
+Вместо N·M вызовов dijkstra на каждый источник запускается один поиск,
+который останавливается, как только обработаны все пункты назначения.
+Источники делятся на пачки между процессами; граф не пересылается с каждой
+задачей: при старте через fork процессы наследуют его страницы, а при
+cache_path каждый процесс открывает один и тот же бинарный кэш через mmap.
+
+    stats = {}
+    matrix = distance_matrix(graph, origins, destinations, workers=4, stats=stats)
+    print(matrix[0][1], stats['searches_per_second'])
+"""
+import multiprocessing
+import os
+import time
+from array import array
+from typing import List, Optional, Sequence
+
+from main import CSRGraph, dijkstra_tree, load_graph_cache
+
+try:
+    import numpy as np
+except ImportError:  # NumPy необязателен: без него матрица — список строк array('d')
+    np = None
+
+# Граф и пункты назначения рабочего процесса: задаются до запуска пула (fork)
+# или в инициализаторе (spawn + кэш), чтобы задачи несли только индексы источников.
+_worker_graph: Optional[CSRGraph] = None
+_worker_destinations: List[int] = []
+
+
+def _node_indices(graph: CSRGraph, points: Sequence) -> List[int]:
+    """Индексы вершин: координаты (пары) ищутся в графе, остальное приводится к int"""
+    return [graph.node_id(tuple(p)) if isinstance(p, (tuple, list)) else int(p) for p in points]
+
+
+def distance_row(graph: CSRGraph, origin: int, destinations: Sequence[int],
+                 stats: Optional[dict] = None) -> array:
+    """
+    Расстояния от origin до каждого из destinations (inf — недостижимо)
+
+    Один поиск Дейкстры с остановкой после обработки всех целей.
+    """
+    distances, _ = dijkstra_tree(graph, origin, destinations, stats)
+    return array('d', [distances[d] for d in destinations])
+
+
+def _init_worker(cache_path: Optional[str], destinations: List[int]) -> None:
+    global _worker_graph, _worker_destinations
+    if cache_path is not None:
+        _worker_graph = load_graph_cache(cache_path)
+    _worker_destinations = destinations
+
+
+def _rows_chunk(chunk):
+    """Считает строки матрицы для пачки (позиция, источник); возвращает их вместе с settled"""
+    rows, settled = [], 0
+    stats = {}
+    for position, origin in chunk:
+        row = distance_row(_worker_graph, origin, _worker_destinations, stats)
+        settled += stats['settled']
+        rows.append((position, row))
+    return rows, settled
+
+
+def distance_matrix(graph: CSRGraph, origins: Sequence, destinations: Sequence,
+                    workers: Optional[int] = None, cache_path: Optional[str] = None,
+                    chunksize: Optional[int] = None, stats: Optional[dict] = None):
+    """
+    Матрица кратчайших расстояний origins × destinations
+
+    origins и destinations — индексы вершин или координаты (lon, lat).
+    Результат — numpy.ndarray формы (N, M) с float64, а без NumPy — список
+    строк array('d'); в обоих случаях matrix[i][j] — расстояние в километрах.
+
+    workers=1 считает в текущем процессе. Для нескольких процессов нужен либо
+    старт через fork (Linux), либо cache_path — файл из main.compile_graph,
+    который каждый процесс откроет через mmap. В stats записываются число
+    поисков, суммарное число обработанных вершин, время и searches_per_second.
+    """
+    global _worker_graph, _worker_destinations
+    origin_ids = _node_indices(graph, origins)
+    destination_ids = _node_indices(graph, destinations)
+    workers = workers or os.cpu_count() or 1
+    workers = max(1, min(workers, len(origin_ids)))
+    tasks = list(enumerate(origin_ids))
+    rows: List[Optional[array]] = [None] * len(tasks)
+
+    started = time.perf_counter()
+    settled = 0
+    if workers == 1:
+        search_stats = {}
+        for position, origin in tasks:
+            rows[position] = distance_row(graph, origin, destination_ids, search_stats)
+            settled += search_stats['settled']
+    else:
+        if 'fork' in multiprocessing.get_all_start_methods():
+            context = multiprocessing.get_context('fork')
+            _worker_graph, _worker_destinations = graph, destination_ids
+            initargs = (None, destination_ids)
+        elif cache_path is not None:
+            context = multiprocessing.get_context('spawn')
+            initargs = (cache_path, destination_ids)
+        else:
+            raise ValueError("Без fork рабочим процессам нужен cache_path с бинарным кэшем графа")
+        chunksize = chunksize or max(1, len(tasks) // (workers * 4))
+        chunks = [tasks[i:i + chunksize] for i in range(0, len(tasks), chunksize)]
+        try:
+            with context.Pool(workers, initializer=_init_worker, initargs=initargs) as pool:
+                for chunk_rows, chunk_settled in pool.imap_unordered(_rows_chunk, chunks):
+                    settled += chunk_settled
+                    for position, row in chunk_rows:
+                        rows[position] = row
+        finally:
+            _worker_graph, _worker_destinations = None, []
+    elapsed = time.perf_counter() - started
+
+    if stats is not None:
+        stats['searches'] = len(tasks)
+        stats['settled'] = settled
+        stats['workers'] = workers
+        stats['seconds'] = elapsed
+        stats['searches_per_second'] = len(tasks) / elapsed if elapsed > 0 else float('inf')
+
+    if np is not None:
+        matrix = np.empty((len(rows), len(destination_ids)), dtype=np.float64)
+        for i, row in enumerate(rows):
+            matrix[i] = np.frombuffer(row, dtype=np.float64)
+        return matrix
+    return rows
+
+
+def one_to_many(graph: CSRGraph, origin, destinations: Sequence,
+                stats: Optional[dict] = None) -> array:
+    """Строка матрицы для одного источника: array('d') расстояний до destinations"""
+    return distance_row(graph, _node_indices(graph, [origin])[0], _node_indices(graph, destinations), stats)
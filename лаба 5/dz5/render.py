@@ -0,0 +1,208 @@
+"""
+Пакетная отрисовка маршрутов в PNG без дисплея: Figure + FigureCanvasAgg, без pyplot и смены его backend.
+
+Серая дорожная сеть растрируется один раз на граф и уровень масштаба и
+кэшируется; для каждого маршрута из этого растра вырезается окно вокруг
+маршрута, поверх рисуются только красная линия и подписи улиц. Много
+маршрутов рендерятся параллельно в процессах, которые получают граф и
+готовые растры через fork (или открывают бинарный кэш графа через mmap).
+
+    render_route(graph, path, 'route.png', segments=street_segments(graph, ids))
+    render_routes(graph, [('a.png', path_a, None), ('b.png', path_b, None)], workers=4)
+"""
+import math
+import multiprocessing
+import os
+import weakref
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.collections import LineCollection
+from matplotlib.figure import Figure
+
+from main import CSRGraph, load_graph_cache
+
+BASE_SIZE = 1024  # длинная сторона растра сети на уровне 0, пикселей
+MAX_ZOOM = 2  # на уровне z растр в 2**z раз крупнее; 2 — до 4096 px (64 МБ RGBA)
+OUTPUT_SIZE = (800, 800)
+OUTPUT_DPI = 100
+ROUTE_PADDING = 0.1  # поля вокруг маршрута, доля его размера
+
+# Растры сети по графу: {graph: {(version, zoom): BaseLayer}}; уходят вместе с графом
+_base_layers: 'weakref.WeakKeyDictionary' = weakref.WeakKeyDictionary()
+_worker_graph: Optional[CSRGraph] = None
+
+
+class BaseLayer:
+    """Растр всей сети: RGBA-массив image и его охват (lon0, lon1, lat0, lat1)"""
+
+    def __init__(self, image: np.ndarray, extent: Tuple[float, float, float, float]):
+        self.image = image
+        self.extent = extent
+
+    def window(self, lon0: float, lon1: float, lat0: float, lat1: float) -> Tuple[np.ndarray, tuple]:
+        """Часть растра, покрывающая прямоугольник, и её точный охват в координатах"""
+        x0, x1, y0, y1 = self.extent
+        height, width = self.image.shape[:2]
+        c0 = max(0, int(math.floor((lon0 - x0) / (x1 - x0) * width)))
+        c1 = min(width, int(math.ceil((lon1 - x0) / (x1 - x0) * width)))
+        r0 = max(0, int(math.floor((y1 - lat1) / (y1 - y0) * height)))
+        r1 = min(height, int(math.ceil((y1 - lat0) / (y1 - y0) * height)))
+        c1, r1 = max(c1, c0 + 1), max(r1, r0 + 1)
+        extent = (x0 + c0 / width * (x1 - x0), x0 + c1 / width * (x1 - x0),
+                  y1 - r1 / height * (y1 - y0), y1 - r0 / height * (y1 - y0))
+        return self.image[r0:r1, c0:c1], extent
+
+
+def _graph_extent(graph: CSRGraph) -> Tuple[float, float, float, float]:
+    lon0, lon1 = min(graph.lon), max(graph.lon)
+    lat0, lat1 = min(graph.lat), max(graph.lat)
+    return lon0, max(lon1, lon0 + 1e-9), lat0, max(lat1, lat0 + 1e-9)
+
+
+def _segments(graph: CSRGraph) -> np.ndarray:
+    """Все рёбра графа (по одному на пару вершин) как массив отрезков формы (m, 2, 2)"""
+    lon, lat = np.asarray(graph.lon, dtype=np.float64), np.asarray(graph.lat, dtype=np.float64)
+    offsets = np.asarray(graph.offsets, dtype=np.int64)
+    targets = np.asarray(graph.targets, dtype=np.int64)
+    sources = np.repeat(np.arange(graph.node_count), np.diff(offsets))
+    once = sources < targets
+    sources, targets = sources[once], targets[once]
+    return np.stack([np.column_stack([lon[sources], lat[sources]]),
+                     np.column_stack([lon[targets], lat[targets]])], axis=1)
+
+
+def base_layer(graph: CSRGraph, zoom: int = 0) -> BaseLayer:
+    """
+    Растр серой сети для уровня zoom, из кэша или отрисованный заново
+
+    Пиксели квадратные в градусах (как plt.axis('equal') в
+    visualize_path_with_network); длинная сторона — BASE_SIZE * 2**zoom.
+    """
+    zoom = min(max(zoom, 0), MAX_ZOOM)
+    layers = _base_layers.setdefault(graph, {})
+    key = (graph.version, zoom)
+    layer = layers.get(key)
+    if layer is not None:
+        return layer
+
+    extent = _graph_extent(graph)
+    span_x, span_y = extent[1] - extent[0], extent[3] - extent[2]
+    longest = BASE_SIZE * 2 ** zoom
+    width = max(1, round(longest * span_x / max(span_x, span_y)))
+    height = max(1, round(longest * span_y / max(span_x, span_y)))
+    figure = Figure(figsize=(width / OUTPUT_DPI, height / OUTPUT_DPI), dpi=OUTPUT_DPI)
+    canvas = FigureCanvasAgg(figure)
+    ax = figure.add_axes((0, 0, 1, 1))
+    ax.set_axis_off()
+    ax.set_xlim(extent[0], extent[1])
+    ax.set_ylim(extent[2], extent[3])
+    ax.add_collection(LineCollection(_segments(graph), linewidths=0.3 * 2 ** zoom, colors='gray', alpha=0.4))
+    canvas.draw()
+    layer = BaseLayer(np.asarray(canvas.buffer_rgba()).copy(), extent)
+    for stale in [k for k in layers if k[0] != graph.version]:
+        del layers[stale]
+    layers[key] = layer
+    return layer
+
+
+def _route_window(graph: CSRGraph, path: Sequence[Tuple[float, float]],
+                  size: Tuple[int, int]) -> Tuple[Tuple[float, float, float, float], int]:
+    """Окно вокруг маршрута с соотношением сторон size и уровень масштаба для него"""
+    xs = [x for x, _ in path]
+    ys = [y for _, y in path]
+    span_x = max(max(xs) - min(xs), 1e-6) * (1 + 2 * ROUTE_PADDING)
+    span_y = max(max(ys) - min(ys), 1e-6) * (1 + 2 * ROUTE_PADDING)
+    aspect = size[0] / size[1]
+    span_x, span_y = max(span_x, span_y * aspect), max(span_y, span_x / aspect)
+    cx, cy = (max(xs) + min(xs)) / 2, (max(ys) + min(ys)) / 2
+    window = (cx - span_x / 2, cx + span_x / 2, cy - span_y / 2, cy + span_y / 2)
+
+    x0, x1, y0, y1 = _graph_extent(graph)
+    pixels_per_degree = BASE_SIZE / max(x1 - x0, y1 - y0)
+    needed = size[0] / span_x
+    zoom = math.ceil(math.log2(needed / pixels_per_degree)) if needed > pixels_per_degree else 0
+    return window, min(zoom, MAX_ZOOM)
+
+
+def render_route(graph: CSRGraph, path: Sequence[Tuple[float, float]], output_path: str,
+                 segments: Optional[List[Tuple[Optional[str], int, int]]] = None,
+                 size: Tuple[int, int] = OUTPUT_SIZE, zoom: Optional[int] = None) -> str:
+    """
+    Рисует маршрут поверх кэшированного растра сети и сохраняет PNG
+
+    path — координаты из dijkstra/RoutingService.route, segments — из
+    main.street_segments (подписи улиц). zoom по умолчанию выбирается так,
+    чтобы растр в окне маршрута был не грубее выходного изображения.
+    """
+    if not path:
+        raise ValueError("Пустой маршрут")
+    window, auto_zoom = _route_window(graph, path, size)
+    image, extent = base_layer(graph, auto_zoom if zoom is None else zoom).window(*window)
+
+    figure = Figure(figsize=(size[0] / OUTPUT_DPI, size[1] / OUTPUT_DPI), dpi=OUTPUT_DPI)
+    FigureCanvasAgg(figure)
+    ax = figure.add_axes((0, 0, 1, 1))
+    ax.set_axis_off()
+    ax.imshow(image, extent=extent, origin='upper', interpolation='bilinear', aspect='auto')
+    ax.set_xlim(window[0], window[1])
+    ax.set_ylim(window[2], window[3])
+    if len(path) > 1:
+        ax.add_collection(LineCollection([(path[i], path[i + 1]) for i in range(len(path) - 1)],
+                                         linewidths=2.0, colors='red', alpha=0.9))
+    for name, first, last in segments or []:
+        if name:
+            i = (first + last - 1) // 2
+            ax.text((path[i][0] + path[i + 1][0]) / 2, (path[i][1] + path[i + 1][1]) / 2, name,
+                    fontsize=8, color='blue', ha='center')
+    figure.savefig(output_path, format='png')
+    return output_path
+
+
+def _init_worker(cache_path: Optional[str], zooms: Sequence[int]) -> None:
+    global _worker_graph
+    if cache_path is not None:
+        _worker_graph = load_graph_cache(cache_path)
+        for zoom in zooms:
+            base_layer(_worker_graph, zoom)
+
+
+def _render_job(job) -> str:
+    output_path, path, segments = job
+    return render_route(_worker_graph, path, output_path, segments)
+
+
+def render_routes(graph: CSRGraph, jobs: Sequence[Tuple[str, Sequence[Tuple[float, float]], Optional[list]]],
+                  workers: Optional[int] = None, cache_path: Optional[str] = None) -> List[str]:
+    """
+    Рендерит много маршрутов в PNG параллельно: jobs — (файл, path, segments или None)
+
+    Родитель заранее растрирует ровно те уровни масштаба, которые выберет
+    render_route для маршрутов из jobs: при fork процессы получают растры
+    вместе с графом без копирования, при spawn каждый процесс один раз
+    открывает cache_path и растрирует те же уровни сам. Возвращает пути
+    файлов в порядке jobs.
+    """
+    global _worker_graph
+    workers = max(1, min(workers or os.cpu_count() or 1, len(jobs)))
+    zooms = sorted({_route_window(graph, path, OUTPUT_SIZE)[1] for _, path, _ in jobs if path})
+    for zoom in zooms:
+        base_layer(graph, zoom)
+    if workers == 1:
+        return [render_route(graph, path, output_path, segments) for output_path, path, segments in jobs]
+
+    if 'fork' in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context('fork')
+        _worker_graph = graph
+        initargs = (None, ())
+    elif cache_path is not None:
+        context = multiprocessing.get_context('spawn')
+        initargs = (cache_path, tuple(zooms))
+    else:
+        raise ValueError("Без fork рабочим процессам нужен cache_path с бинарным кэшем графа")
+    try:
+        with context.Pool(workers, initializer=_init_worker, initargs=initargs) as pool:
+            return pool.map(_render_job, jobs)
+    finally:
+        _worker_graph = None
@@ -0,0 +1,427 @@
+"""
+Локальный HTTP/JSON-сервер маршрутов на asyncio (только стандартная библиотека).
+
+Граф, пространственный индекс и пул процессов живут всё время работы
+сервера. Запросы маршрутов, пришедшие в течение batch_window секунд с общей
+начальной вершиной, склеиваются в один поиск Дейкстры до нескольких целей;
+поиски выполняются в пуле процессов, чтобы цикл событий не блокировался.
+
+    python server.py belgrad_serbia.graphml --port 8080 --workers 4
+
+    GET  /route?from=20.46,44.81&to=20.41,44.80
+    GET  /snap?lon=20.46&lat=44.81
+    POST /matrix   {"origins": [[lon, lat], ...], "destinations": [[lon, lat], ...]}
+    GET  /metrics
+"""
+import argparse
+import asyncio
+import functools
+import json
+import math
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from main import CSRGraph, _reconstruct, dijkstra_tree, load_graph, load_graph_cache, path_street_names
+from spatial import SpatialIndex
+
+BATCH_WINDOW = 0.002  # секунды ожидания попутных запросов с той же начальной вершиной
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, float('inf'))
+MAX_BODY_SIZE = 1 << 20
+MAX_HEADERS = 100  # длина каждой строки и так ограничена буфером StreamReader (64 КиБ)
+REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+           413: 'Payload Too Large', 414: 'URI Too Long', 431: 'Request Header Fields Too Large',
+           500: 'Internal Server Error'}
+
+# Граф рабочего процесса: наследуется через fork или открывается из кэша в инициализаторе
+_worker_graph: Optional[CSRGraph] = None
+
+
+class BadRequest(ValueError):
+    """Ошибка в параметрах запроса — отдаётся клиенту как 400"""
+
+
+class LatencyHistogram:
+    """Гистограмма задержек с фиксированными границами корзин (мс)"""
+
+    def __init__(self, buckets=LATENCY_BUCKETS_MS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def observe(self, ms: float) -> None:
+        for i, bound in enumerate(self.buckets):
+            if ms <= bound:
+                self.counts[i] += 1
+                break
+        self.count += 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+
+    def quantile(self, q: float) -> float:
+        """Верхняя граница корзины, в которую попадает квантиль q (оценка сверху)"""
+        if not self.count:
+            return 0.0
+        rank, seen = q * self.count, 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max_ms)
+        return self.max_ms
+
+    def snapshot(self) -> dict:
+        return {
+            'count': self.count,
+            'mean_ms': self.total_ms / self.count if self.count else 0.0,
+            'max_ms': self.max_ms,
+            'p50_ms': self.quantile(0.5),
+            'p95_ms': self.quantile(0.95),
+            'p99_ms': self.quantile(0.99),
+            'buckets': {('+Inf' if bound == float('inf') else f'le_{bound}ms'): count
+                        for bound, count in zip(self.buckets, self.counts)},
+        }
+
+
+def _init_worker(cache_path: Optional[str]) -> None:
+    global _worker_graph
+    if cache_path is not None:
+        _worker_graph = load_graph_cache(cache_path)
+
+
+def _warm_up() -> int:
+    return os.getpid()
+
+
+def _route_batch(source: int, targets: List[int]) -> Dict[int, Optional[tuple]]:
+    """Один поиск от source до всех targets: {цель: (path, distance, street_names) или None}"""
+    graph = _worker_graph
+    distances, predecessors = dijkstra_tree(graph, source, targets)
+    result = {}
+    for target in targets:
+        if distances[target] == float('inf'):
+            result[target] = None
+        else:
+            ids = _reconstruct(predecessors, target)
+            result[target] = ([graph.coord(node) for node in ids], distances[target],
+                              path_street_names(graph, ids))
+    return result
+
+
+def _matrix_row(source: int, destinations: List[int]) -> List[Optional[float]]:
+    distances, _ = dijkstra_tree(_worker_graph, source, destinations)
+    return [distances[d] if distances[d] != float('inf') else None for d in destinations]
+
+
+def _point(value) -> Tuple[float, float]:
+    """'lon,lat' или [lon, lat] -> (lon, lat); nan, inf и точки вне [-180, 180] × [-90, 90] отклоняются"""
+    if isinstance(value, str):
+        value = value.split(',')
+    try:
+        lon, lat = (float(v) for v in value)
+    except (TypeError, ValueError):
+        raise BadRequest(f"ожидались координаты 'lon,lat', получено {value!r}") from None
+    if not (math.isfinite(lon) and math.isfinite(lat) and -180 <= lon <= 180 and -90 <= lat <= 90):
+        raise BadRequest(f"координаты вне допустимого диапазона: {value!r}")
+    return lon, lat
+
+
+class RoutingServer:
+    """
+    HTTP-сервер маршрутов поверх одного CSR-графа
+
+    workers — размер пула процессов. Процессы получают граф через fork; если
+    fork недоступен, нужен cache_path (файл main.compile_graph), который каждый
+    процесс откроет через mmap.
+    """
+
+    def __init__(self, graph: CSRGraph, workers: Optional[int] = None, cache_path: Optional[str] = None,
+                 batch_window: float = BATCH_WINDOW):
+        global _worker_graph
+        self.graph = graph
+        self.spatial = SpatialIndex(graph)
+        self.batch_window = batch_window
+        self.workers = workers or os.cpu_count() or 1
+        if 'fork' in multiprocessing.get_all_start_methods():
+            _worker_graph = graph
+            self.pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context('fork'))
+        elif cache_path is not None:
+            self.pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context('spawn'),
+                                            initializer=_init_worker, initargs=(cache_path,))
+        else:
+            raise ValueError("Без fork рабочим процессам нужен cache_path с бинарным кэшем графа")
+        # Процессы запускаются сразу, пока нет сокетов: иначе fork унаследует
+        # принятые соединения, и клиент не увидит их закрытия.
+        for future in [self.pool.submit(_warm_up) for _ in range(self.workers)]:
+            future.result()
+
+        self.latency: Dict[str, LatencyHistogram] = {}
+        self._pending: Dict[int, List[Tuple[int, asyncio.Future]]] = {}
+        self._pending_count = 0
+        self._flush_handle = None
+        self.in_flight = 0
+        self.max_queue_depth = 0
+        self.batches = 0
+        self.batched_requests = 0
+        self.errors = 0
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    @property
+    def queue_depth(self) -> int:
+        """Запросы маршрутов, ждущие склейки или результата из пула"""
+        return self._pending_count + self.in_flight
+
+    async def start(self, host: str = '127.0.0.1', port: int = 8080) -> asyncio.AbstractServer:
+        self._server = await asyncio.start_server(self._handle_connection, host, port)
+        return self._server
+
+    async def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        self.pool.shutdown(wait=True)
+
+    # --- Маршруты с микро-пакетами ---
+
+    def _snap(self, point: Tuple[float, float]) -> int:
+        node, _ = self.spatial.nearest_node(*point)
+        if node < 0:
+            raise BadRequest("граф пуст")
+        return node
+
+    async def route(self, source: int, target: int) -> Optional[tuple]:
+        """Ставит запрос в пакет своей начальной вершины и ждёт результата"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.setdefault(source, []).append((target, future))
+        self._pending_count += 1
+        self.max_queue_depth = max(self.max_queue_depth, self.queue_depth)
+        if self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.batch_window, self._flush)
+        return await future
+
+    def _flush(self) -> None:
+        loop = asyncio.get_running_loop()
+        self._flush_handle = None
+        pending, self._pending = self._pending, {}
+        for source, waiters in pending.items():
+            self._pending_count -= len(waiters)
+            self.in_flight += len(waiters)
+            self.batches += 1
+            self.batched_requests += len(waiters)
+            targets = sorted({target for target, _ in waiters})
+            try:
+                task = loop.run_in_executor(self.pool, _route_batch, source, targets)
+            except Exception as e:  # пул сломан или закрыт: ожидающие получат ошибку, а не зависнут
+                task = loop.create_future()
+                task.set_exception(e)
+            task.add_done_callback(functools.partial(self._resolve, waiters))
+
+    def _resolve(self, waiters, task: asyncio.Future) -> None:
+        self.in_flight -= len(waiters)
+        error = asyncio.CancelledError() if task.cancelled() else task.exception()
+        for target, future in waiters:
+            if future.done():
+                continue
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(task.result()[target])
+
+    # --- Обработчики ---
+
+    async def handle_route(self, params: dict) -> dict:
+        if 'from' not in params or 'to' not in params:
+            raise BadRequest("нужны параметры from и to")
+        source, target = self._snap(_point(params['from'])), self._snap(_point(params['to']))
+        result = await self.route(source, target)
+        if result is None:
+            return {'found': False, 'from_node': source, 'to_node': target}
+        path, distance, street_names = result
+        return {'found': True, 'from_node': source, 'to_node': target, 'distance_km': distance,
+                'path': path, 'street_names': street_names}
+
+    async def handle_snap(self, params: dict) -> dict:
+        if 'lon' in params and 'lat' in params:
+            point = _point((params['lon'], params['lat']))
+        elif 'point' in params:
+            point = _point(params['point'])
+        else:
+            raise BadRequest("нужны параметры lon и lat")
+        node, distance = self.spatial.nearest_node(*point)
+        snap = self.spatial.snap_to_edge(*point)
+        response = {'node': node, 'node_coord': self.graph.coord(node) if node >= 0 else None,
+                    'node_distance_km': distance}
+        if snap is not None:
+            response['edge'] = {'u': snap.u, 'v': snap.v, 't': snap.t, 'point': (snap.lon, snap.lat),
+                                'distance_km': snap.distance}
+        return response
+
+    async def handle_matrix(self, params: dict) -> dict:
+        origins, destinations = params.get('origins'), params.get('destinations')
+        if not isinstance(origins, list) or not isinstance(destinations, list):
+            raise BadRequest("нужны списки origins и destinations")
+        origin_ids = [self._snap(_point(p)) for p in origins]
+        destination_ids = [self._snap(_point(p)) for p in destinations]
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        self.in_flight += len(origin_ids)
+        try:
+            rows = await asyncio.gather(*(loop.run_in_executor(self.pool, _matrix_row, origin, destination_ids)
+                                          for origin in origin_ids))
+        finally:
+            self.in_flight -= len(origin_ids)
+        elapsed = time.perf_counter() - started
+        return {'distances_km': rows, 'origins': origin_ids, 'destinations': destination_ids,
+                'searches_per_second': len(origin_ids) / elapsed if elapsed > 0 else None}
+
+    async def handle_metrics(self, params: dict) -> dict:
+        return {
+            'latency': {path: histogram.snapshot() for path, histogram in self.latency.items()},
+            'queue_depth': self.queue_depth,
+            'max_queue_depth': self.max_queue_depth,
+            'in_flight': self.in_flight,
+            'batches': self.batches,
+            'batched_requests': self.batched_requests,
+            'requests_per_batch': self.batched_requests / self.batches if self.batches else 0.0,
+            'errors': self.errors,
+            'workers': self.workers,
+            'graph': {'nodes': self.graph.node_count, 'edges': self.graph.edge_count,
+                      'version': self.graph.version},
+        }
+
+    ROUTES = {
+        '/route': 'handle_route',
+        '/snap': 'handle_snap',
+        '/matrix': 'handle_matrix',
+        '/metrics': 'handle_metrics',
+    }
+
+    # --- HTTP ---
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                try:
+                    request_line = await reader.readline()
+                except ValueError:  # строка длиннее буфера StreamReader (LimitOverrunError)
+                    await self._respond(writer, 414, {'error': 'слишком длинная строка запроса'}, False)
+                    break
+                if not request_line:
+                    break
+                headers = await self._read_headers(reader)
+                if headers is None:
+                    await self._respond(writer, 431, {'error': 'слишком длинные или многочисленные заголовки'},
+                                        False)
+                    break
+                try:
+                    method, target, version = request_line.decode('latin-1').split()
+                except ValueError:
+                    await self._respond(writer, 400, {'error': 'некорректная строка запроса'}, False)
+                    break
+                length = headers.get('content-length', '0')
+                if not (length.isascii() and length.isdigit()):
+                    await self._respond(writer, 400, {'error': 'некорректный Content-Length'}, False)
+                    break
+                length = int(length)
+                if length > MAX_BODY_SIZE:
+                    await self._respond(writer, 413, {'error': 'слишком большое тело запроса'}, False)
+                    break
+                body = await reader.readexactly(length) if length else b''
+                keep_alive = (headers.get('connection', '').lower() != 'close'
+                              and (version == 'HTTP/1.1' or headers.get('connection', '').lower() == 'keep-alive'))
+                status, payload = await self._dispatch(method, target, body)
+                if status != 200:
+                    self.errors += 1
+                await self._respond(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _read_headers(reader: asyncio.StreamReader) -> Optional[Dict[str, str]]:
+        """Заголовки до пустой строки; None, если строка длиннее буфера или их больше MAX_HEADERS"""
+        headers = {}
+        for _ in range(MAX_HEADERS + 1):
+            try:
+                line = await reader.readline()
+            except ValueError:
+                return None
+            if line in (b'\r\n', b'\n', b''):
+                return headers
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+        return None
+
+    async def _dispatch(self, method: str, target: str, body: bytes) -> Tuple[int, dict]:
+        started = time.perf_counter()
+        url = urlsplit(target)
+        handler_name = self.ROUTES.get(url.path)
+        try:
+            if handler_name is None:
+                return 404, {'error': f'неизвестный путь {url.path}'}
+            if method not in ('GET', 'POST'):
+                return 405, {'error': 'поддерживаются GET и POST'}
+            params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+            if body:
+                try:
+                    data = json.loads(body)
+                except ValueError:
+                    raise BadRequest("тело запроса — не JSON") from None
+                if not isinstance(data, dict):
+                    raise BadRequest("тело запроса должно быть JSON-объектом")
+                params.update(data)
+            return 200, await getattr(self, handler_name)(params)
+        except BadRequest as e:
+            return 400, {'error': str(e)}
+        except Exception as e:  # ошибка обработчика не должна ронять соединение
+            return 500, {'error': f'{type(e).__name__}: {e}'}
+        finally:
+            self.latency.setdefault(url.path if handler_name else 'other', LatencyHistogram()).observe(
+                (time.perf_counter() - started) * 1000)
+
+    @staticmethod
+    async def _respond(writer: asyncio.StreamWriter, status: int, payload: dict, keep_alive: bool) -> None:
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        head = (f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+                f"Content-Type: application/json; charset=utf-8\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+        writer.write(head.encode('latin-1') + body)
+        await writer.drain()
+
+
+async def serve(graphml_path: str, host: str = '127.0.0.1', port: int = 8080, workers: Optional[int] = None,
+                cache_path: Optional[str] = None, batch_window: float = BATCH_WINDOW) -> None:
+    """Загружает граф (через бинарный кэш) и обслуживает запросы до остановки"""
+    graph = load_graph(graphml_path, cache_path)
+    cache_path = cache_path or os.path.splitext(graphml_path)[0] + '.graphcache'
+    server = RoutingServer(graph, workers, cache_path, batch_window)
+    listener = await server.start(host, port)
+    print(f"Сервер маршрутов слушает {', '.join(str(s.getsockname()) for s in listener.sockets)}")
+    try:
+        await listener.serve_forever()
+    finally:
+        await server.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='HTTP/JSON-сервер маршрутов dz5')
+    parser.add_argument('graphml')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--cache', default=None, help='путь к бинарному кэшу графа')
+    parser.add_argument('--batch-window', type=float, default=BATCH_WINDOW, help='секунды склейки запросов')
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.graphml, args.host, args.port, args.workers, args.cache, args.batch_window))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,222 @@
+"""
+Пространственный индекс для привязки GPS-координат к дорожному графу.
+
+Вершины графа проецируются на плоскость (равнопромежуточная проекция вокруг
+средней широты, километры) и раскладываются по равномерной сетке ячеек в
+формате CSR: вершины ячейки c лежат в cell_nodes[cell_offsets[c]:cell_offsets[c + 1]].
+Рёбра раскладываются так же — в каждую ячейку, которую задевает их
+ограничивающий прямоугольник. Поиск обходит кольца ячеек вокруг точки и
+останавливается, когда следующее кольцо заведомо дальше лучшего найденного.
+
+    index = SpatialIndex(graph)
+    node, distance = index.nearest_node(20.46, 44.81)
+    snap = index.snap_to_edge(20.46, 44.81)
+"""
+import math
+from array import array
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+from main import CSRGraph
+
+EARTH_RADIUS_KM = 6371.0
+NODES_PER_CELL = 2.0
+
+
+class EdgeSnap:
+    """Ближайшая точка на ребре u - v: доля t от u к v, координаты точки и расстояние в км"""
+    __slots__ = ('u', 'v', 't', 'lon', 'lat', 'distance')
+
+    def __init__(self, u: int, v: int, t: float, lon: float, lat: float, distance: float):
+        self.u = u
+        self.v = v
+        self.t = t
+        self.lon = lon
+        self.lat = lat
+        self.distance = distance
+
+    def __repr__(self) -> str:
+        return (f"EdgeSnap(u={self.u}, v={self.v}, t={self.t:.3f}, "
+                f"lon={self.lon:.6f}, lat={self.lat:.6f}, distance={self.distance:.4f})")
+
+
+def _bucket(keys: List[Tuple[int, int]], cell_count: int) -> Tuple[array, array]:
+    """Раскладывает пары (ячейка, значение) в CSR: (offsets, values)"""
+    offsets = array('q', [0]) * (cell_count + 1)
+    for cell, _ in keys:
+        offsets[cell + 1] += 1
+    for i in range(cell_count):
+        offsets[i + 1] += offsets[i]
+    values = array('i', [0]) * len(keys)
+    fill = offsets[:-1]
+    for cell, value in keys:
+        values[fill[cell]] = value
+        fill[cell] += 1
+    return offsets, values
+
+
+class SpatialIndex:
+    """
+    Равномерная сетка над вершинами и рёбрами графа
+
+    Расстояния считаются в проекции (км); на масштабе города расхождение с
+    haversine — доли процента. cell_size_km по умолчанию подбирается так,
+    чтобы на ячейку приходилось около NODES_PER_CELL вершин.
+    """
+
+    def __init__(self, graph: CSRGraph, cell_size_km: Optional[float] = None):
+        self.graph = graph
+        n = graph.node_count
+        lat0 = math.radians(sum(graph.lat) / n) if n else 0.0
+        self.kx = math.radians(1.0) * EARTH_RADIUS_KM * math.cos(lat0)
+        self.ky = math.radians(1.0) * EARTH_RADIUS_KM
+        self.x = array('d', (lon * self.kx for lon in graph.lon))
+        self.y = array('d', (lat * self.ky for lat in graph.lat))
+        self.x0 = min(self.x, default=0.0)
+        self.y0 = min(self.y, default=0.0)
+        width = max(self.x, default=0.0) - self.x0
+        height = max(self.y, default=0.0) - self.y0
+        if cell_size_km is None:
+            cell_size_km = math.sqrt(max(width * height, 1e-12) * NODES_PER_CELL / max(n, 1))
+        self.cell = max(cell_size_km, 1e-6)
+        self.cols = int(width / self.cell) + 1
+        self.rows = int(height / self.cell) + 1
+
+        self.cell_offsets, self.cell_nodes = _bucket(
+            [(self._cell_of(self.x[v], self.y[v]), v) for v in range(n)], self.cols * self.rows)
+
+        # Рёбра храним по одному разу (u < v) как позиции дуг в graph.targets
+        edge_keys = []
+        for u in range(n):
+            for k in range(graph.offsets[u], graph.offsets[u + 1]):
+                v = graph.targets[k]
+                if u < v:
+                    c0, r0 = self._col_row(min(self.x[u], self.x[v]), min(self.y[u], self.y[v]))
+                    c1, r1 = self._col_row(max(self.x[u], self.x[v]), max(self.y[u], self.y[v]))
+                    for r in range(r0, r1 + 1):
+                        for c in range(c0, c1 + 1):
+                            edge_keys.append((r * self.cols + c, k))
+        self.arc_sources = array('i', [0]) * graph.edge_count
+        for u in range(n):
+            for k in range(graph.offsets[u], graph.offsets[u + 1]):
+                self.arc_sources[k] = u
+        self.cell_edge_offsets, self.cell_edges = _bucket(edge_keys, self.cols * self.rows)
+
+    def _col_row(self, x: float, y: float) -> Tuple[int, int]:
+        # Зажимаем до int(): радиус within может быть бесконечным
+        col = int(min(max((x - self.x0) / self.cell, 0.0), self.cols - 1))
+        row = int(min(max((y - self.y0) / self.cell, 0.0), self.rows - 1))
+        return col, row
+
+    def _cell_of(self, x: float, y: float) -> int:
+        col, row = self._col_row(x, y)
+        return row * self.cols + col
+
+    def _rings(self, x: float, y: float) -> Iterator[Tuple[int, List[int]]]:
+        """
+        Кольца ячеек вокруг точки: (r, ячейки на расстоянии Чебышёва r)
+
+        Все точки вне колец 0..r дальше r * cell от запроса. Для точки за
+        пределами сетки кольца считаются от её «виртуальной» ячейки.
+        """
+        col = math.floor((x - self.x0) / self.cell)
+        row = math.floor((y - self.y0) / self.cell)
+        first = max(0, -col, col - self.cols + 1, -row, row - self.rows + 1)
+        last = max(col, self.cols - 1 - col, row, self.rows - 1 - row)
+        for r in range(first, last + 1):
+            cells = []
+            for rr in range(max(row - r, 0), min(row + r, self.rows - 1) + 1):
+                if abs(rr - row) == r:
+                    columns = range(max(col - r, 0), min(col + r, self.cols - 1) + 1)
+                else:
+                    columns = [c for c in (col - r, col + r) if 0 <= c < self.cols]
+                cells.extend(rr * self.cols + c for c in columns)
+            yield r, cells
+
+    def _project(self, lon: float, lat: float) -> Tuple[float, float]:
+        """Координаты точки в км; ValueError для nan, inf и точек вне [-180, 180] × [-90, 90]"""
+        if not (-180.0 <= lon <= 180.0 and -90.0 <= lat <= 90.0):
+            raise ValueError(f"некорректные координаты: lon={lon}, lat={lat}")
+        return lon * self.kx, lat * self.ky
+
+    def nearest_node(self, lon: float, lat: float) -> Tuple[int, float]:
+        """Ближайшая вершина: (индекс, расстояние в км); (-1, inf) для пустого графа"""
+        found = self.k_nearest(lon, lat, 1)
+        return found[0] if found else (-1, float('inf'))
+
+    def k_nearest(self, lon: float, lat: float, k: int) -> List[Tuple[int, float]]:
+        """k ближайших вершин по возрастанию расстояния: [(индекс, км), ...]; [] при k <= 0"""
+        x, y = self._project(lon, lat)
+        if k <= 0:
+            return []
+        xs, ys, offsets, nodes = self.x, self.y, self.cell_offsets, self.cell_nodes
+        best: List[Tuple[float, int]] = []
+        for r, cells in self._rings(x, y):
+            if len(best) >= k and best[k - 1][0] <= (r - 1) * self.cell:
+                break
+            for c in cells:
+                for v in nodes[offsets[c]:offsets[c + 1]]:
+                    best.append((math.hypot(xs[v] - x, ys[v] - y), v))
+            if len(best) > k:
+                best.sort()
+                del best[k:]
+        best.sort()
+        return [(v, d) for d, v in best[:k]]
+
+    def within(self, lon: float, lat: float, radius_km: float) -> List[Tuple[int, float]]:
+        """Вершины не дальше radius_km по возрастанию расстояния: [(индекс, км), ...]"""
+        x, y = self._project(lon, lat)
+        if math.isnan(radius_km):
+            raise ValueError("radius_km не может быть nan")
+        c0, r0 = self._col_row(x - radius_km, y - radius_km)
+        c1, r1 = self._col_row(x + radius_km, y + radius_km)
+        xs, ys, offsets, nodes = self.x, self.y, self.cell_offsets, self.cell_nodes
+        found = []
+        for row in range(r0, r1 + 1):
+            for c in range(row * self.cols + c0, row * self.cols + c1 + 1):
+                for v in nodes[offsets[c]:offsets[c + 1]]:
+                    d = math.hypot(xs[v] - x, ys[v] - y)
+                    if d <= radius_km:
+                        found.append((d, v))
+        found.sort()
+        return [(v, d) for d, v in found]
+
+    def snap_to_edge(self, lon: float, lat: float) -> Optional[EdgeSnap]:
+        """Ближайшая точка на рёбрах графа или None, если рёбер нет"""
+        x, y = self._project(lon, lat)
+        xs, ys = self.x, self.y
+        offsets, arcs, sources, targets = self.cell_edge_offsets, self.cell_edges, self.arc_sources, self.graph.targets
+        best_d, best = float('inf'), None
+        for r, cells in self._rings(x, y):
+            if best_d <= (r - 1) * self.cell:
+                break
+            for c in cells:
+                for k in arcs[offsets[c]:offsets[c + 1]]:
+                    u, v = sources[k], targets[k]
+                    dx, dy = xs[v] - xs[u], ys[v] - ys[u]
+                    length2 = dx * dx + dy * dy
+                    t = ((x - xs[u]) * dx + (y - ys[u]) * dy) / length2 if length2 > 0 else 0.0
+                    t = 0.0 if t < 0.0 else 1.0 if t > 1.0 else t
+                    d = math.hypot(xs[u] + t * dx - x, ys[u] + t * dy - y)
+                    if d < best_d:
+                        best_d, best = d, (u, v, t)
+        if best is None:
+            return None
+        u, v, t = best
+        return EdgeSnap(u, v, t, (xs[u] + t * (xs[v] - xs[u])) / self.kx,
+                        (ys[u] + t * (ys[v] - ys[u])) / self.ky, best_d)
+
+    def nearest_nodes(self, points: Sequence[Tuple[float, float]]) -> array:
+        """
+        Пакетный nearest_node: array('i') индексов вершин для последовательности (lon, lat)
+
+        Это цикл по точкам на Python, а не векторный расчёт: время растёт
+        линейно с числом точек, экономится только разбор аргументов на стороне
+        вызывающего. Некорректная точка прерывает весь пакет с ValueError.
+        """
+        nearest = self.nearest_node
+        return array('i', (nearest(lon, lat)[0] for lon, lat in points))
+
+    def snap_many(self, points: Sequence[Tuple[float, float]]) -> List[Optional[EdgeSnap]]:
+        """Пакетный snap_to_edge для последовательности (lon, lat); как и nearest_nodes — цикл по точкам"""
+        snap = self.snap_to_edge
+        return [snap(lon, lat) for lon, lat in points]